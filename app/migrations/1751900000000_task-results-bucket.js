@@ -0,0 +1,45 @@
+/**
+ * @type {import('node-pg-migrate').ColumnDefinitions | undefined}
+ */
+export const shorthands = undefined;
+
+/**
+ * Results too large for the tasks row are uploaded in chunks to the
+ * task-results bucket under <user_id>/<task uuid>/, see
+ * planqtn_jobs/result_storage.py.
+ *
+ * @param pgm {import('node-pg-migrate').MigrationBuilder}
+ * @param run {() => void | undefined}
+ * @returns {Promise<void> | void}
+ */
+export const up = (pgm) => {
+  pgm.sql(`
+    INSERT INTO storage.buckets (id, name, public)
+    VALUES ('task-results', 'task-results', false)
+    ON CONFLICT (id) DO NOTHING
+  `);
+
+  for (const command of ["SELECT", "INSERT", "UPDATE"]) {
+    const check =
+      "bucket_id = 'task-results' AND (storage.foldername(name))[1] = auth.uid()::text";
+    pgm.sql(`
+      CREATE POLICY "${command} user's own task results"
+      ON storage.objects FOR ${command} TO authenticated
+      ${command === "INSERT" ? `WITH CHECK (${check})` : `USING (${check})`}
+    `);
+  }
+};
+
+/**
+ * @param pgm {import('node-pg-migrate').MigrationBuilder}
+ * @param run {() => void | undefined}
+ * @returns {Promise<void> | void}
+ */
+export const down = (pgm) => {
+  for (const command of ["SELECT", "INSERT", "UPDATE"]) {
+    pgm.sql(
+      `DROP POLICY IF EXISTS "${command} user's own task results" ON storage.objects`
+    );
+  }
+  pgm.sql("DELETE FROM storage.buckets WHERE id = 'task-results'");
+};
@@ -0,0 +1,45 @@
+import os
+from typing import Sequence
+
+from planqtn.cost_estimate import ContractionCostEstimate
+from planqtn.stabilizer_tensor_enumerator import TensorLeg
+from planqtn.tensor_network import TensorNetwork
+
+# networks larger than this are not estimated at all, conjoining their parity
+# check matrices is already too slow for a request
+INLINE_MAX_LEGOS = int(os.getenv("PLANQTN_INLINE_MAX_LEGOS", 200))
+# calculations estimated to cost less than this many stabilizer operations run
+# inline in the API server, the rest are submitted as jobs
+INLINE_MAX_COST = float(os.getenv("PLANQTN_INLINE_MAX_COST", 2**20))
+# the cotengra search of the /estimate endpoint is bounded, so that estimating
+# a large network doesn't take as long as the calculation it predicts
+ESTIMATE_MAX_REPEATS = int(os.getenv("PLANQTN_ESTIMATE_MAX_REPEATS", 16))
+ESTIMATE_MAX_SECONDS = float(os.getenv("PLANQTN_ESTIMATE_MAX_SECONDS", 5))
+# the memory limit of the weight enumerator jobs, see jobs_config.ts
+MAX_JOB_MEMORY_BYTES = int(os.getenv("PLANQTN_MAX_JOB_MEMORY_BYTES", 4 * 2**30))
+# memory of a job process before the first tensor: python, numpy, galois, cotengra
+JOB_BASE_MEMORY_BYTES = int(os.getenv("PLANQTN_JOB_BASE_MEMORY_BYTES", 512 * 2**20))
+
+
+def should_run_inline(
+    tn: TensorNetwork,
+    open_legs: Sequence[TensorLeg] = (),
+    max_legos: int | None = None,
+    max_cost: float | None = None,
+) -> tuple[bool, ContractionCostEstimate | None]:
+    """Decides whether a calculation is cheap enough to run inline.
+
+    The estimate uses the order of the traces instead of a cotengra search, to
+    keep the decision fast, so inline calculations have to run in that order.
+    """
+    max_legos = INLINE_MAX_LEGOS if max_legos is None else max_legos
+    max_cost = INLINE_MAX_COST if max_cost is None else max_cost
+    if len(tn.nodes) > max_legos:
+        return False, None
+    estimate = tn.estimate_contraction_cost(open_legs, cotengra=False)
+    return estimate.flops <= max_cost, estimate
+
+
+def recommended_memory_bytes(estimate: ContractionCostEstimate) -> int:
+    """Memory to request for a job, with headroom for the estimate's error."""
+    return JOB_BASE_MEMORY_BYTES + 2 * estimate.peak_memory_bytes
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from planqtn_types.api_types import TannerRequest
+
+# total size of the cached responses, as serialized JSON
+NETWORK_CACHE_MAX_BYTES = int(os.getenv("PLANQTN_NETWORK_CACHE_MAX_BYTES", 64 * 2**20))
+
+
+class NetworkCache:
+    """LRU cache of the responses of the network construction endpoints.
+
+    The responses are cached as the JSON they are sent as, serialized once by
+    the worker that built them. They are cached with a start node index of 0
+    and offset on the way out, so requests for the same matrix at different
+    start node indices share an entry. Only used from the event loop, so it is
+    not locked.
+    """
+
+    def __init__(self, max_bytes: int = NETWORK_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._responses: OrderedDict[str, bytes] = OrderedDict()
+
+    @staticmethod
+    def key(endpoint: str, request: TannerRequest) -> str:
+        """Canonical hash of a request, independent of its start node index."""
+        digest = hashlib.sha256(endpoint.encode())
+        if request.sparse_matrix is not None:
+            # sorted and deduplicated, so the order of the columns doesn't matter
+            csr = request.sparse_matrix.to_csr()
+            digest.update(f"sparse{csr.shape}".encode())
+            digest.update(csr.indptr.astype(np.int64).tobytes())
+            digest.update(csr.indices.astype(np.int64).tobytes())
+        else:
+            array = np.asarray(request.matrix, dtype=np.int64)
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str, start_node_index: int) -> Optional[bytes]:
+        cached = self._responses.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._responses.move_to_end(key)
+        return offset_network(cached, start_node_index)
+
+    def put(self, key: str, response: bytes) -> None:
+        """Caches the JSON of a response built with a start node index of 0."""
+        if len(response) > self.max_bytes:
+            return
+        if key in self._responses:
+            self.size_bytes -= len(self._responses.pop(key))
+        self._responses[key] = response
+        self.size_bytes += len(response)
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._responses.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._responses),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# the lego ids in the compact JSON of a TensorNetworkResponse, quotes within
+# strings are escaped, so these only match the keys
+_LEGO_ID = re.compile(rb'"(instance_id|legoId)":"(\d+)"')
+
+
+def offset_network(response: bytes, start_node_index: int) -> bytes:
+    """Shifts the lego ids in the JSON of a response built with a start node index of 0.
+
+    The ids are rewritten in the JSON, without parsing and serializing the
+    response again.
+    """
+    if start_node_index == 0:
+        return response
+    return _LEGO_ID.sub(
+        lambda match: b'"%s":"%d"'
+        % (match.group(1), int(match.group(2)) + start_node_index),
+        response,
+    )
@@ -2,17 +2,25 @@ import logging
 import os
 import pathlib
 import sys
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from planqtn_api.web_endpoints import router
+from planqtn_api.web_endpoints import router, warm_up
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import argparse
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up()
+    yield
+
+
 app = FastAPI(
     title="PlanqTN API",
     description="API for the PlanqTN application",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -1,67 +1,310 @@
+import asyncio
+import multiprocessing
 import os
+import threading
+import time
 import traceback
-from fastapi import APIRouter, HTTPException
-from galois import GF2
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import APIRouter, HTTPException, Response
 import numpy as np
+import scipy.sparse
 
+from planqtn_api import cost_estimator
+from planqtn_api.cost_estimator import recommended_memory_bytes, should_run_inline
+from planqtn_api.network_cache import NetworkCache, offset_network
 from planqtn_types.api_types import *
+from planqtn_types.weight_enumerator import calculate_weight_enumerator
+from planqtn.cost_estimate import ContractionCostEstimate
 from planqtn.networks.css_tanner_code import CssTannerCodeTN
 from planqtn.networks.stabilizer_measurement_state_prep import (
     StabilizerMeasurementStatePrepTN,
 )
 from planqtn.networks.stabilizer_tanner_code import StabilizerTannerCodeTN
+from planqtn.parity_check import nonzero_entries
+from planqtn.progress_reporter import DummyProgressReporter
+from planqtn.warmup import warmup
 
 router = APIRouter()
 
+# network construction, cost estimates and cheap weight enumerator calculations
+# are CPU-bound, they run in worker processes so that a large matrix doesn't
+# block the event loop for every other request
+NETWORK_WORKERS = int(os.getenv("PLANQTN_NETWORK_WORKERS", 2))
+# requests waiting for a worker beyond this many are turned away with a 503
+NETWORK_QUEUE_SIZE = int(os.getenv("PLANQTN_NETWORK_QUEUE_SIZE", 8))
+NETWORK_TIMEOUT_SECONDS = float(os.getenv("PLANQTN_NETWORK_TIMEOUT_SECONDS", 30))
+# inline weight enumerator calculations that take longer than this, because
+# their estimate was wrong, are given up and have to be submitted as jobs
+INLINE_TIMEOUT_SECONDS = float(os.getenv("PLANQTN_INLINE_TIMEOUT_SECONDS", 10))
 
-@router.post("/tannernetwork", response_model=TensorNetworkResponse)
-async def create_tanner_network(request: TannerRequest):
+
+def _new_network_pool() -> ProcessPoolExecutor:
+    # spawned instead of forked, the server process has threads of its own
+    return ProcessPoolExecutor(
+        max_workers=NETWORK_WORKERS, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+_network_pool = _new_network_pool()
+# released when the work is done, not when the request gives up on it, so that
+# timed out work still counts until its worker is free again
+_network_slots = threading.BoundedSemaphore(NETWORK_WORKERS + NETWORK_QUEUE_SIZE)
+# the same standard codes are requested over and over
+_network_cache = NetworkCache()
+
+
+def warm_up():
+    """Pays the cold start costs at startup instead of on the first requests.
+
+    Starts the network workers and warms up planqtn in them, without waiting
+    for it.
+    """
+    for _ in range(NETWORK_WORKERS):
+        _network_pool.submit(warmup)
+
+
+async def _build_network(endpoint: str, build, request: TannerRequest) -> Response:
+    cache = _network_cache
     try:
-        matrix = GF2(request.matrix)
-        tn = StabilizerTannerCodeTN(matrix)
-        return TensorNetworkResponse.from_tensor_network(tn, request.start_node_index)
+        key = NetworkCache.key(endpoint, request)
     except Exception as e:
-        traceback.print_exc()
+        # e.g. a ragged matrix, the builders would reject it too
         raise HTTPException(status_code=400, detail=str(e))
+    content = cache.get(key, request.start_node_index)
+    if content is None:
+        built = await _run_in_network_pool(
+            _serialized_network,
+            build,
+            request.model_copy(update={"start_node_index": 0}),
+        )
+        cache.put(key, built)
+        content = offset_network(built, request.start_node_index)
+    # already serialized, returning the model would make FastAPI validate and
+    # serialize all the legos again
+    return Response(content=content, media_type="application/json")
 
 
-@router.post("/csstannernetwork", response_model=TensorNetworkResponse)
-async def create_css_tanner_network(request: TannerRequest):
+def _serialized_network(build, request: TannerRequest) -> bytes:
+    # serialized in the worker, once for both the cache and the response
+    return build(request).model_dump_json().encode()
+
+
+def _worker_died() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The worker of the request died, try again later.",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _replace_broken_network_pool(pool: ProcessPoolExecutor):
+    # a worker that dies, e.g. out of memory, breaks the whole pool
+    global _network_pool
+    if _network_pool is pool:
+        _network_pool = _new_network_pool()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_in_network_pool(fn, *args, timeout: float | None = None):
+    timeout = NETWORK_TIMEOUT_SECONDS if timeout is None else timeout
+    pool = _network_pool
+    slots = _network_slots
+    if not slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many requests for the workers, try again later.",
+            headers={"Retry-After": "1"},
+        )
     try:
-        matrix = np.array(request.matrix)
-
-        # Sort rows and separate into hx and hz
-        sorted_rows = np.lexsort([matrix[:, i] for i in range(matrix.shape[1])])
-        sorted_matrix = matrix[sorted_rows]
-        # Find the split point between X and Z stabilizers
-        n = matrix.shape[1] // 2
-        split_point = 0
-        for i in range(sorted_matrix.shape[0]):
-            if np.any(sorted_matrix[i, n:]):  # If any Z part is non-zero
-                split_point = i
-                break
-
-        hz = sorted_matrix[split_point:, n:]  # Z stabilizer part
-        hx = sorted_matrix[:split_point, :n]  # X  stabilizer part
-
-        # Create the tensor network
-        tn = CssTannerCodeTN(hx=hx, hz=hz)
-
-        return TensorNetworkResponse.from_tensor_network(tn, request.start_node_index)
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        slots.release()
+        _replace_broken_network_pool(pool)
+        raise _worker_died()
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"The request took longer than {timeout}s.",
+        )
+    except BrokenProcessPool:
+        traceback.print_exc()
+        _replace_broken_network_pool(pool)
+        raise _worker_died()
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=400, detail=str(e))
 
 
+class _DeadlineProgressReporter(DummyProgressReporter):
+    """Gives up on a calculation once it runs past its deadline."""
+
+    def __init__(self, timeout_seconds: float):
+        super().__init__()
+        self.deadline = time.monotonic() + timeout_seconds
+
+    def on_progress(self, num_items: int) -> None:
+        if time.monotonic() > self.deadline:
+            raise TimeoutError("The calculation ran past its deadline.")
+
+
+def _weight_enumerator_inline(
+    request: WeightEnumeratorCalculationArgs,
+    max_legos: int,
+    max_cost: float,
+    timeout_seconds: float,
+) -> InlineWeightEnumeratorResponse:
+    # runs in a network worker, the limits are passed from the server process
+    tn = request.to_tensor_network(truncate_length=request.truncate_length)
+    inline, estimate = should_run_inline(
+        tn, request.tensor_network_open_legs(), max_legos, max_cost
+    )
+    estimated_cost = estimate.flops if estimate is not None else None
+    if not inline:
+        return InlineWeightEnumeratorResponse(
+            inline=False, estimated_cost=estimated_cost
+        )
+    try:
+        # in the order of the traces, which is the one the estimate is for
+        result = calculate_weight_enumerator(
+            request,
+            progress_reporter=_DeadlineProgressReporter(timeout_seconds),
+            tn=tn,
+            cotengra=False,
+        )
+    except TimeoutError:
+        return InlineWeightEnumeratorResponse(
+            inline=False, estimated_cost=estimated_cost
+        )
+    return InlineWeightEnumeratorResponse(
+        inline=True, estimated_cost=estimated_cost, result=result
+    )
+
+
+def _tanner_network(request: TannerRequest) -> TensorNetworkResponse:
+    tn = StabilizerTannerCodeTN(request.parity_check_matrix())
+    return TensorNetworkResponse.from_tensor_network(tn, request.start_node_index)
+
+
+def _css_tanner_network(request: TannerRequest) -> TensorNetworkResponse:
+    matrix = request.parity_check_matrix()
+    if not scipy.sparse.issparse(matrix):
+        matrix = scipy.sparse.csr_array(matrix.view(np.ndarray))
+    n = matrix.shape[1] // 2
+
+    supports = [[] for _ in range(matrix.shape[0])]
+    for row, col in zip(*(a.tolist() for a in nonzero_entries(matrix))):
+        supports[row].append(col)
+    # Sort rows as binary numbers with the last column as the most significant
+    # bit, the same order as np.lexsort over the columns of the dense matrix
+    sorted_rows = sorted(range(len(supports)), key=lambda i: supports[i][::-1])
+    # Rows without a Z part are X stabilizers, the rest are Z stabilizers
+    x_rows = [i for i in sorted_rows if not supports[i] or supports[i][-1] < n]
+    z_rows = [i for i in sorted_rows if supports[i] and supports[i][-1] >= n]
+
+    hx = matrix[x_rows, :][:, :n]  # X stabilizer part
+    hz = matrix[z_rows, :][:, n:]  # Z stabilizer part
+
+    # Create the tensor network
+    tn = CssTannerCodeTN(hx=hx, hz=hz)
+
+    return TensorNetworkResponse.from_tensor_network(tn, request.start_node_index)
+
+
+def _msp_network(request: TannerRequest) -> TensorNetworkResponse:
+    tn = StabilizerMeasurementStatePrepTN(request.parity_check_matrix())
+    return TensorNetworkResponse.from_tensor_network(tn, request.start_node_index)
+
+
+@router.post("/tannernetwork", response_model=TensorNetworkResponse)
+async def create_tanner_network(request: TannerRequest):
+    return await _build_network("tannernetwork", _tanner_network, request)
+
+
+@router.post("/csstannernetwork", response_model=TensorNetworkResponse)
+async def create_css_tanner_network(request: TannerRequest):
+    return await _build_network("csstannernetwork", _css_tanner_network, request)
+
+
 @router.post("/mspnetwork", response_model=TensorNetworkResponse)
-def create_msp_network(request: TannerRequest):
+async def create_msp_network(request: TannerRequest):
+    return await _build_network("mspnetwork", _msp_network, request)
+
+
+@router.get("/networkcache")
+async def get_network_cache_stats():
+    """Hits, misses and size of the network construction response cache."""
+    return _network_cache.stats()
+
+
+def _estimate_cost(
+    request: WeightEnumeratorCalculationArgs, cotengra_opts: dict
+) -> ContractionCostEstimate:
+    tn = request.to_tensor_network(truncate_length=request.truncate_length)
+    # same contraction ordering as the weight enumerator jobs, with a bounded
+    # search
+    return tn.estimate_contraction_cost(
+        request.tensor_network_open_legs(),
+        cotengra=len(tn.nodes) > 5,
+        cotengra_opts=cotengra_opts,
+    )
+
+
+@router.post("/estimate", response_model=CostEstimateResponse)
+async def estimate_weight_enumerator_cost(request: WeightEnumeratorCalculationArgs):
+    """Estimates the cost and memory of a weight enumerator job before it runs.
+
+    The contraction order is searched for at most ESTIMATE_MAX_REPEATS trials
+    and ESTIMATE_MAX_SECONDS, the longer search of the job usually finds a
+    cheaper order.
+    """
+    estimate = await _run_in_network_pool(
+        _estimate_cost,
+        request,
+        {
+            "max_repeats": cost_estimator.ESTIMATE_MAX_REPEATS,
+            "max_time": cost_estimator.ESTIMATE_MAX_SECONDS,
+        },
+    )
+    memory = recommended_memory_bytes(estimate)
+    return CostEstimateResponse(
+        flops=estimate.flops,
+        upper_bound=estimate.upper_bound,
+        max_tensor_entries=estimate.max_tensor_entries,
+        peak_memory_bytes=estimate.peak_memory_bytes,
+        recommended_memory_bytes=memory,
+        feasible=memory <= cost_estimator.MAX_JOB_MEMORY_BYTES,
+    )
+
+
+@router.post("/weightenumerator", response_model=InlineWeightEnumeratorResponse)
+async def calculate_weight_enumerator_inline(request: WeightEnumeratorCalculationArgs):
+    """Calculates the weight enumerator right away if it is cheap enough.
+
+    Otherwise, or if it takes longer than INLINE_TIMEOUT_SECONDS, `inline` is
+    false in the response and the calculation has to be submitted as a job.
+    """
     try:
-        matrix = GF2(request.matrix)
-        tn = StabilizerMeasurementStatePrepTN(matrix)
-        return TensorNetworkResponse.from_tensor_network(tn, request.start_node_index)
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=400, detail=str(e))
+        return await _run_in_network_pool(
+            _weight_enumerator_inline,
+            request,
+            cost_estimator.INLINE_MAX_LEGOS,
+            cost_estimator.INLINE_MAX_COST,
+            INLINE_TIMEOUT_SECONDS,
+            # building the network and the estimate come on top of the calculation
+            timeout=NETWORK_TIMEOUT_SECONDS + INLINE_TIMEOUT_SECONDS,
+        )
+    except HTTPException as e:
+        if e.status_code != 504:
+            raise
+        # the worker didn't get to give up on its own
+        return InlineWeightEnumeratorResponse(inline=False)
 
 
 @router.get("/version")
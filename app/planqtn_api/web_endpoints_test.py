@@ -0,0 +1,247 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from galois import GF2
+
+from planqtn.networks.stabilizer_tanner_code import StabilizerTannerCodeTN
+from planqtn_api import web_endpoints
+from planqtn_api.network_cache import NetworkCache
+from planqtn_api.planqtn_server import app
+from planqtn_types.api_types import TannerRequest, TensorNetworkResponse
+
+client = TestClient(app)
+
+STEANE = [
+    [1, 0, 1, 0, 1, 0, 1, 0, 0, 0, 0, 0, 0, 0],
+    [0, 1, 1, 0, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 1, 0, 1],
+    [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 0, 1, 1],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1],
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_network_cache(monkeypatch):
+    monkeypatch.setattr(web_endpoints, "_network_cache", NetworkCache())
+
+
+def css_matrix(num_checks, num_qubits, seed=0):
+    # half X, half Z checks on random qubits, each check on at least one qubit
+    rng = np.random.default_rng(seed)
+    checks = rng.random((num_checks, num_qubits)) < 0.05
+    checks[np.arange(num_checks), rng.integers(num_qubits, size=num_checks)] = True
+    matrix = np.zeros((num_checks, 2 * num_qubits), dtype=int)
+    matrix[: num_checks // 2, :num_qubits] = checks[: num_checks // 2]
+    matrix[num_checks // 2 :, num_qubits:] = checks[num_checks // 2 :]
+    return matrix.tolist()
+
+
+def test_small_requests_are_not_blocked_by_large_networks():
+    # start the workers, so that the spawn doesn't count against the requests
+    assert client.post("/tannernetwork", json={"matrix": [[1, 0]]}).status_code == 200
+
+    # matrices that are slow to build but quick to send, parsing the request and
+    # serializing the response still happen on the event loop
+    async def load_test():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as async_client:
+
+            async def timed(method, url, **kwargs):
+                start = time.perf_counter()
+                response = await async_client.request(method, url, **kwargs)
+                assert response.status_code == 200, response.text
+                return time.perf_counter() - start
+
+            async def small_requests(count=100, interval=0.01):
+                # latencies from the time each request is due, so that the
+                # requests that couldn't even be sent count as well
+                first = time.perf_counter()
+
+                async def small_request(due):
+                    await asyncio.sleep(due - time.perf_counter())
+                    await timed("GET", "/version")
+                    return time.perf_counter() - due
+
+                return await asyncio.gather(
+                    *(small_request(first + i * interval) for i in range(count))
+                )
+
+            async def large_request(url, matrix):
+                # while the small requests are going on
+                await asyncio.sleep(0.1)
+                return await timed("POST", url, json={"matrix": matrix})
+
+            small, *large = await asyncio.gather(
+                small_requests(),
+                large_request("/tannernetwork", css_matrix(100, 200, seed=1)),
+                large_request("/tannernetwork", css_matrix(100, 200, seed=2)),
+            )
+            return large, small
+
+    large, small = asyncio.run(load_test())
+
+    p99 = np.percentile(small, 99)
+    assert min(large) > 10 * p99, (large, p99)
+    assert p99 < 0.1, p99
+
+
+def _slow_network(request):
+    time.sleep(1)
+
+
+def test_network_construction_timeout(monkeypatch):
+    monkeypatch.setattr(web_endpoints, "NETWORK_TIMEOUT_SECONDS", 0.01)
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(
+            web_endpoints._run_in_network_pool(
+                _slow_network, TannerRequest(matrix=[[1, 0]])
+            )
+        )
+
+    assert e.value.status_code == 504
+
+
+def test_network_construction_backpressure(monkeypatch):
+    monkeypatch.setattr(web_endpoints, "_network_slots", threading.BoundedSemaphore(1))
+    web_endpoints._network_slots.acquire()
+
+    response = client.post("/tannernetwork", json={"matrix": [[1, 0]]})
+
+    assert response.status_code == 503, response.text
+    assert response.headers["Retry-After"] == "1"
+
+
+def _kill_worker(request):
+    os._exit(1)
+
+
+def test_network_pool_is_replaced_when_a_worker_dies():
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(
+            web_endpoints._run_in_network_pool(
+                _kill_worker, TannerRequest(matrix=[[1, 0]])
+            )
+        )
+    assert e.value.status_code == 503
+
+    response = client.post("/tannernetwork", json={"matrix": [[1, 0]]})
+
+    assert response.status_code == 200, response.text
+
+
+def test_startup_warms_up_the_network_workers(monkeypatch):
+    pool = web_endpoints._new_network_pool()
+    monkeypatch.setattr(web_endpoints, "_network_pool", pool)
+
+    with TestClient(app):
+        pass
+
+    assert len(pool._processes) == web_endpoints.NETWORK_WORKERS
+    pool.shutdown()
+
+
+def test_network_construction_errors_are_bad_requests():
+    response = client.post("/tannernetwork", json={"matrix": [[1, 1, 1]]})
+
+    assert response.status_code == 400, response.text
+
+
+def test_ragged_matrices_are_bad_requests():
+    response = client.post("/tannernetwork", json={"matrix": [[1, 1, 0, 0], [1, 0]]})
+
+    assert response.status_code == 400, response.text
+
+
+def sparse_steane(order=1):
+    return {
+        "num_cols": 14,
+        "rows": [np.flatnonzero(row)[::order].tolist() for row in STEANE],
+    }
+
+
+@pytest.mark.parametrize("url", ["/tannernetwork", "/csstannernetwork", "/mspnetwork"])
+def test_sparse_matrices_build_the_same_networks(url):
+    dense = client.post(url, json={"matrix": STEANE, "start_node_index": 3})
+    sparse = client.post(
+        url, json={"sparse_matrix": sparse_steane(), "start_node_index": 3}
+    )
+
+    assert dense.status_code == 200, dense.text
+    assert sparse.status_code == 200, sparse.text
+    assert sparse.json() == dense.json()
+
+
+def test_sparse_matrices_are_validated():
+    for body in [
+        {},
+        {"matrix": STEANE, "sparse_matrix": sparse_steane()},
+        {"sparse_matrix": {"num_cols": 2, "rows": [[0, 2]]}},
+        {"sparse_matrix": {"num_cols": 2, "rows": [[-1]]}},
+    ]:
+        response = client.post("/tannernetwork", json=body)
+        assert response.status_code == 422, (body, response.text)
+
+
+def test_network_responses_are_cached_across_start_node_indices():
+    first = client.post("/tannernetwork", json={"matrix": STEANE})
+    second = client.post(
+        "/tannernetwork", json={"matrix": STEANE, "start_node_index": 100}
+    )
+
+    assert first.status_code == 200, first.text
+    assert second.status_code == 200, second.text
+    tn = StabilizerTannerCodeTN(GF2(STEANE))
+    assert first.json() == TensorNetworkResponse.from_tensor_network(tn, 0).model_dump(
+        mode="json"
+    )
+    assert second.json() == TensorNetworkResponse.from_tensor_network(
+        tn, 100
+    ).model_dump(mode="json")
+    stats = client.get("/networkcache").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_network_cache_is_keyed_by_endpoint_and_matrix():
+    client.post("/tannernetwork", json={"matrix": STEANE})
+    client.post("/csstannernetwork", json={"matrix": STEANE})
+    client.post("/tannernetwork", json={"matrix": STEANE[:3] + STEANE[4:]})
+    client.post("/tannernetwork", json={"sparse_matrix": sparse_steane()})
+    # the order of the columns in the rows of a sparse matrix doesn't matter
+    client.post("/tannernetwork", json={"sparse_matrix": sparse_steane(order=-1)})
+
+    stats = client.get("/networkcache").json()
+    assert stats["misses"] == 4
+    assert stats["hits"] == 1
+
+
+def test_network_cache_evicts_least_recently_used():
+    response = (
+        TensorNetworkResponse.from_tensor_network(StabilizerTannerCodeTN(GF2([[1, 0]])))
+        .model_dump_json()
+        .encode()
+    )
+    cache = NetworkCache(max_bytes=2 * len(response))
+
+    cache.put("a", response)
+    cache.put("b", response)
+    assert cache.get("a", 0) is not None
+    cache.put("c", response)
+
+    assert cache.get("b", 0) is None
+    assert json.loads(cache.get("a", 5))["legos"][0]["instance_id"] == "5"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,132 @@
+from fastapi.testclient import TestClient
+from galois import GF2
+
+from planqtn.networks.css_tanner_code import CssTannerCodeTN
+from planqtn.tensor_network import TensorNetwork
+from planqtn_api import cost_estimator, web_endpoints
+from planqtn_api.planqtn_server import app
+from planqtn_types.api_types import (
+    TensorNetworkResponse,
+    WeightEnumeratorCalculationArgs,
+)
+
+client = TestClient(app)
+
+
+HX_422 = GF2([[1, 1, 1, 1]])
+HZ_422 = GF2([[1, 1, 1, 1]])
+HAMMING = GF2([[1, 0, 1, 0, 1, 0, 1], [0, 1, 1, 0, 0, 1, 1], [0, 0, 0, 1, 1, 1, 1]])
+
+
+def css_tanner_code_request(hx=HAMMING, hz=HAMMING):
+    network = TensorNetworkResponse.from_tensor_network(
+        CssTannerCodeTN(hx=hx, hz=hz)
+    ).model_dump(mode="json")
+    return {
+        "legos": {lego["instance_id"]: lego for lego in network["legos"]},
+        "connections": network["connections"],
+    }
+
+
+def test_small_weight_enumerator_runs_inline():
+    response = client.post("/weightenumerator", json=css_tanner_code_request())
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["inline"] is True
+    assert body["estimated_cost"] == 15981.0
+    assert body["result"]["stabilizer_polynomial"] == "{0:1, 4:21, 6:42}"
+
+
+def test_expensive_weight_enumerator_is_not_run_inline(monkeypatch):
+    monkeypatch.setattr(cost_estimator, "INLINE_MAX_COST", 1000)
+
+    response = client.post("/weightenumerator", json=css_tanner_code_request())
+
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        "inline": False,
+        "estimated_cost": 15981.0,
+        "result": None,
+    }
+
+
+def test_inline_weight_enumerator_past_its_timeout_is_not_run_inline(monkeypatch):
+    monkeypatch.setattr(web_endpoints, "INLINE_TIMEOUT_SECONDS", 0)
+
+    response = client.post("/weightenumerator", json=css_tanner_code_request())
+
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        "inline": False,
+        "estimated_cost": 15981.0,
+        "result": None,
+    }
+
+
+def test_inline_weight_enumerator_builds_the_network_once(monkeypatch):
+    built = []
+    to_tensor_network = WeightEnumeratorCalculationArgs.to_tensor_network
+
+    def counting_to_tensor_network(self, *args, **kwargs):
+        built.append(self)
+        return to_tensor_network(self, *args, **kwargs)
+
+    monkeypatch.setattr(
+        WeightEnumeratorCalculationArgs,
+        "to_tensor_network",
+        counting_to_tensor_network,
+    )
+    args = WeightEnumeratorCalculationArgs(**css_tanner_code_request())
+
+    response = web_endpoints._weight_enumerator_inline(args, 200, 2**20, 10)
+
+    assert response.inline
+    assert response.result.stabilizer_polynomial == "{0:1, 4:21, 6:42}"
+    assert len(built) == 1
+
+
+def test_networks_with_too_many_legos_are_not_estimated():
+    args = WeightEnumeratorCalculationArgs(**css_tanner_code_request())
+    inline, estimate = cost_estimator.should_run_inline(
+        args.to_tensor_network(), max_legos=40
+    )
+    assert not inline
+    assert estimate is None
+
+
+def test_estimate_endpoint():
+    response = client.post("/estimate", json=css_tanner_code_request(HX_422, HZ_422))
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["flops"] > 0
+    assert body["max_tensor_entries"] > 0
+    assert 0 < body["peak_memory_bytes"] < body["recommended_memory_bytes"]
+    assert body["feasible"] is True
+
+
+def test_estimate_search_is_bounded(monkeypatch):
+    searches = []
+    estimate_contraction_cost = TensorNetwork.estimate_contraction_cost
+
+    def recording_estimate(self, *args, **kwargs):
+        searches.append((kwargs["cotengra"], kwargs["cotengra_opts"]))
+        return estimate_contraction_cost(self, *args, **kwargs)
+
+    monkeypatch.setattr(TensorNetwork, "estimate_contraction_cost", recording_estimate)
+    args = WeightEnumeratorCalculationArgs(**css_tanner_code_request())
+
+    estimate = web_endpoints._estimate_cost(args, {"max_repeats": 2, "max_time": 1})
+
+    assert estimate.flops > 0
+    assert searches == [(True, {"max_repeats": 2, "max_time": 1})]
+
+
+def test_estimate_endpoint_rejects_jobs_over_the_memory_limit(monkeypatch):
+    monkeypatch.setattr(cost_estimator, "MAX_JOB_MEMORY_BYTES", 2**20)
+
+    response = client.post("/estimate", json=css_tanner_code_request(HX_422, HZ_422))
+
+    assert response.status_code == 200, response.text
+    assert response.json()["feasible"] is False
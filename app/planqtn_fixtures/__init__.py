@@ -2,3 +2,4 @@ from planqtn_fixtures.files import *
 from planqtn_fixtures.env import *
 from planqtn_fixtures.supabase import *
 from planqtn_fixtures.k8s import *
+from planqtn_fixtures.supabase_stub import *
@@ -0,0 +1,132 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl, urlparse
+
+import pytest
+
+
+class SupabaseStub:
+    """In-process stand-in for the PostgREST API of a local Supabase.
+
+    It serves filtered, ordered and limited selects and filtered updates of
+    the `tasks` and `task_updates` tables, which is all the task store needs,
+    and counts the TCP connections it accepts. Setting `drop_next_requests` makes it close the connection
+    without responding, like a flaky network would. Setting `drop_next_update_responses` does the same
+    after applying an update, like a response lost on the way back.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {
+            "tasks": [],
+            "task_updates": [],
+        }
+        self.requests: List[str] = []
+        self.connections = 0
+        self.drop_next_requests = 0
+        self.drop_next_update_responses = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def get_request(self):
+                request = super().get_request()
+                with stub.lock:
+                    stub.connections += 1
+                return request
+
+        self.server = Server(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _rows(self):
+                url = urlparse(self.path)
+                table = url.path.rsplit("/", 1)[-1]
+                params = parse_qsl(url.query)
+                filters = {k: v[len("eq.") :] for k, v in params if v.startswith("eq.")}
+                rows = [
+                    row
+                    for row in stub.tables.get(table, [])
+                    if all(str(row.get(k)) == v for k, v in filters.items())
+                ]
+                for k, v in params:
+                    if k == "order":
+                        column, _, direction = v.partition(".")
+                        rows.sort(
+                            key=lambda row: str(row.get(column)),
+                            reverse=direction == "desc",
+                        )
+                    elif k == "limit":
+                        rows = rows[: int(v)]
+                return rows
+
+            def _handle(self, update: bool):
+                with stub.lock:
+                    stub.requests.append(f"{self.command} {self.path}")
+                    drop = stub.drop_next_requests > 0
+                    if drop:
+                        stub.drop_next_requests -= 1
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                if drop:
+                    self.close_connection = True
+                    return
+
+                with stub.lock:
+                    rows = self._rows()
+                    if update:
+                        for row in rows:
+                            row.update(json.loads(body))
+                    payload = json.dumps(rows).encode()
+                    drop = update and stub.drop_next_update_responses > 0
+                    if drop:
+                        stub.drop_next_update_responses -= 1
+                if drop:
+                    self.close_connection = True
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header(
+                    "Content-Range",
+                    f"0-{len(rows) - 1}/{len(rows)}" if rows else "*/0",
+                )
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._handle(update=False)
+
+            def do_PATCH(self):
+                self._handle(update=True)
+
+        return Handler
+
+
+@pytest.fixture
+def supabase_stub():
+    stub = SupabaseStub().start()
+    yield stub
+    stub.stop()
@@ -7,8 +7,15 @@ import sys
 import traceback
 from typing import Optional
 from planqtn_jobs.monitor import JobMonitor
+from planqtn_jobs.result_storage import SupabaseResultStorage
 from planqtn_jobs.task import SupabaseCredentials, SupabaseTaskStore, TaskDetails
 from planqtn_jobs.weight_enum_task import WeightEnumeratorTask
+from planqtn_jobs.worker import (
+    LocalTaskQueue,
+    TaskStoreQueue,
+    Worker,
+    task_store_worker_kwargs,
+)
 
 
 def main():
@@ -16,7 +23,10 @@ def main():
         description="Calculate weight enumerator from various sources"
     )
     parser.add_argument(
-        "--action", help="Action to perform", default="run", choices=["run", "monitor"]
+        "--action",
+        help="Action to perform",
+        default="run",
+        choices=["run", "monitor", "worker"],
     )
     parser.add_argument(
         "--job-type",
@@ -61,8 +71,51 @@ def main():
         help="Path to file to save the result, if not specified, the result will be printed to the console",
     )
     parser.add_argument("--debug", action="store_true", help="Enable debug mode")
+    parser.add_argument(
+        "--task-store-service-key",
+        help="Supabase service role key, worker mode pulls the pending tasks of all users with it",
+    )
+    parser.add_argument(
+        "--results-bucket",
+        help="Storage bucket for results larger than PLANQTN_RESULT_STORAGE_THRESHOLD_BYTES, the tasks row only gets a pointer to them",
+    )
+    parser.add_argument(
+        "--queue-dir",
+        help="Worker mode: run the request JSON files dropped into this directory instead of pending tasks from the task store",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        help="Worker mode: number of tasks run concurrently, defaults to the number of CPUs",
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=int,
+        help="Worker mode: address space each task can map beyond the warmed up "
+        "worker process in MB, with some headroom over the memory it uses",
+    )
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        help="Worker mode: restart worker processes after this many tasks",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Worker mode: seconds between checks for new tasks",
+    )
+    parser.add_argument(
+        "--exit-when-idle",
+        action="store_true",
+        help="Worker mode: exit when there are no more tasks",
+    )
     args = parser.parse_args()
 
+    if args.action == "worker":
+        run_worker(args)
+        return
+
     if args.task_uuid and args.input_file:
         print("Error: Cannot specify both task-uuid and input-file")
         sys.exit(1)
@@ -118,13 +171,14 @@ def main():
         logger.info(f"Starting task with args {args}")
 
     try:
+        task_db_credentials = SupabaseCredentials(
+            url=args.task_store_url,
+            user_key=args.task_store_user_key,
+            anon_key=args.task_store_anon_key,
+        )
         task_store = (
             SupabaseTaskStore(
-                task_db_credentials=SupabaseCredentials(
-                    url=args.task_store_url,
-                    user_key=args.task_store_user_key,
-                    anon_key=args.task_store_anon_key,
-                ),
+                task_db_credentials=task_db_credentials,
                 task_updates_db_credentials=(
                     SupabaseCredentials(
                         url=runtime_supabase_url, service_role_key=runtime_supabase_key
@@ -132,6 +186,12 @@ def main():
                     if args.realtime
                     else None
                 ),
+                task_update_interval=args.realtime_update_frequency,
+                result_storage=(
+                    SupabaseResultStorage(task_db_credentials, args.results_bucket)
+                    if args.results_bucket
+                    else None
+                ),
             )
             if args.task_uuid
             else None
@@ -170,5 +230,43 @@ def main():
         sys.exit(1)
 
 
+def run_worker(args: argparse.Namespace):
+    runtime_supabase_url = os.environ.get("RUNTIME_SUPABASE_URL")
+    runtime_supabase_key = os.environ.get("RUNTIME_SUPABASE_KEY")
+
+    if args.queue_dir:
+        queue = LocalTaskQueue(args.queue_dir)
+        task_store_kwargs = None
+    elif args.task_store_url and args.task_store_service_key:
+        task_store_kwargs = task_store_worker_kwargs(
+            task_store_url=args.task_store_url,
+            task_store_service_key=args.task_store_service_key,
+            runtime_supabase_url=runtime_supabase_url if args.realtime else None,
+            runtime_supabase_key=runtime_supabase_key if args.realtime else None,
+            task_update_interval=args.realtime_update_frequency,
+            results_bucket=args.results_bucket,
+        )
+        queue = TaskStoreQueue(SupabaseTaskStore(**task_store_kwargs), args.job_type)
+    else:
+        print(
+            "Error: Worker mode requires either queue-dir or task-store-url and task-store-service-key"
+        )
+        sys.exit(1)
+
+    Worker(
+        queue=queue,
+        job_type=args.job_type,
+        task_store_kwargs=task_store_kwargs,
+        max_workers=args.max_workers,
+        memory_limit_mb=args.memory_limit_mb,
+        max_tasks_per_worker=args.max_tasks_per_worker,
+        poll_interval=args.poll_interval,
+        exit_when_idle=args.exit_when_idle,
+        realtime_updates_enabled=args.realtime and task_store_kwargs is not None,
+        realtime_update_frequency=args.realtime_update_frequency,
+        debug=args.debug,
+    ).run()
+
+
 if __name__ == "__main__":
     main()
@@ -6,8 +6,9 @@ import time
 import traceback
 from typing import List, Optional, Tuple
 from kubernetes import client, config
-from supabase import create_client, Client
+from kubernetes.client.exceptions import ApiException
 import logging
+import urllib3
 
 from planqtn_jobs.task import (
     SupabaseCredentials,
@@ -15,6 +16,7 @@ from planqtn_jobs.task import (
     TaskDetails,
     TaskState,
 )
+from planqtn_jobs.retry import retry_with_backoff
 
 # Set up logging
 logging.basicConfig(
@@ -23,6 +25,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def is_transient_k8s_error(e: Exception) -> bool:
+    if isinstance(e, ApiException):
+        return e.status == 429 or (e.status is not None and e.status >= 500)
+    return isinstance(e, urllib3.exceptions.HTTPError)
+
+
 class JobMonitor:
     def __init__(
         self,
@@ -42,18 +50,25 @@ class JobMonitor:
             logger.error("Failed to load in-cluster configuration")
             sys.exit(1)
 
-        # Initialize Kubernetes clients
-        self.batch_api = client.BatchV1Api()
-        self.core_api = client.CoreV1Api()
+        # Initialize Kubernetes clients, sharing a single connection pool
+        self.api_client = client.ApiClient()
+        self.batch_api = client.BatchV1Api(self.api_client)
+        self.core_api = client.CoreV1Api(self.api_client)
 
         # Track the last known state
         self.last_state: Optional[TaskState] = None
 
+    def _call_k8s(self, fn):
+        # a flaky API server must not be mistaken for a failed job
+        return retry_with_backoff(fn, should_retry=is_transient_k8s_error)
+
     def get_job_status(self) -> Tuple[TaskState, Optional[List[str]]]:
         """Get the current status of the monitored job."""
         try:
-            job = self.batch_api.read_namespaced_job(
-                self.task_details.execution_id, self.namespace
+            job = self._call_k8s(
+                lambda: self.batch_api.read_namespaced_job(
+                    self.task_details.execution_id, self.namespace
+                )
             )
             print("Job details:")
             print(job)
@@ -66,18 +81,22 @@ class JobMonitor:
             if job.status.failed and job.status.failed > 0:
                 print("Job failed...")
                 # Check pod events for OOM
-                pods = self.core_api.list_namespaced_pod(
-                    self.namespace,
-                    label_selector=f"job-name={self.task_details.execution_id}",
+                pods = self._call_k8s(
+                    lambda: self.core_api.list_namespaced_pod(
+                        self.namespace,
+                        label_selector=f"job-name={self.task_details.execution_id}",
+                    )
                 )
 
                 pod = pods.items[0]
                 print("Pod:")
                 print(pod)
                 print("Events:")
-                events = self.core_api.list_namespaced_event(
-                    self.namespace,
-                    field_selector=f"involvedObject.name={pod.metadata.name}",
+                events = self._call_k8s(
+                    lambda: self.core_api.list_namespaced_event(
+                        self.namespace,
+                        field_selector=f"involvedObject.name={pod.metadata.name}",
+                    )
                 )
                 print(events)
                 print("Pod status:")
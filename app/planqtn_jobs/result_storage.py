@@ -0,0 +1,162 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from planqtn_jobs.retry import retry_with_backoff
+
+# results larger than this are uploaded to the results bucket and the tasks
+# row only holds a pointer to them and a summary
+RESULT_STORAGE_THRESHOLD_BYTES = int(
+    os.getenv("PLANQTN_RESULT_STORAGE_THRESHOLD_BYTES", 256 * 1024)
+)
+RESULT_CHUNK_BYTES = int(os.getenv("PLANQTN_RESULT_CHUNK_BYTES", 4 * 2**20))
+# result fields up to this size are kept in the summary in the tasks row
+SUMMARY_FIELD_MAX_BYTES = 1024
+RESULTS_BUCKET = "task-results"
+
+
+class ResultStorage(ABC):
+    """Object storage for task results that are too large for the tasks row."""
+
+    bucket: str = RESULTS_BUCKET
+
+    @abstractmethod
+    def upload_chunk(self, path: str, data: bytes):
+        pass
+
+    @abstractmethod
+    def download_chunk(self, path: str) -> bytes:
+        pass
+
+
+class LocalResultStorage(ResultStorage):
+    """Stores the result chunks as files, a stand-in for the bucket in tests."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _file(self, path: str) -> str:
+        return os.path.join(self.directory, self.bucket, path)
+
+    def upload_chunk(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(self._file(path)), exist_ok=True)
+        with open(self._file(path), "wb") as f:
+            f.write(data)
+
+    def download_chunk(self, path: str) -> bytes:
+        with open(self._file(path), "rb") as f:
+            return f.read()
+
+
+class SupabaseResultStorage(ResultStorage):
+    """Stores the result chunks in a Supabase storage bucket.
+
+    The client is created on first use, so that the storage can be passed to
+    worker processes.
+    """
+
+    def __init__(self, credentials, bucket: str = RESULTS_BUCKET):
+        self.credentials = credentials
+        self.bucket = bucket
+        self._client = None
+
+    def _bucket(self):
+        if self._client is None:
+            self._client = self.credentials.createClient()
+        return self._client.storage.from_(self.bucket)
+
+    def __getstate__(self):
+        return {**self.__dict__, "_client": None}
+
+    def upload_chunk(self, path: str, data: bytes):
+        self._bucket().upload(
+            path,
+            data,
+            {"content-type": "application/octet-stream", "upsert": "true"},
+        )
+
+    def download_chunk(self, path: str) -> bytes:
+        return self._bucket().download(path)
+
+
+def _chunk_path(prefix: str, index: int) -> str:
+    return f"{prefix}/part-{index:05d}"
+
+
+def _summary(result: str) -> Dict[str, Any]:
+    try:
+        parsed = json.loads(result)
+    except ValueError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {
+        key: value
+        for key, value in parsed.items()
+        if len(json.dumps(value)) <= SUMMARY_FIELD_MAX_BYTES
+    }
+
+
+def offload_result(
+    storage: ResultStorage,
+    prefix: str,
+    result: str,
+    should_retry,
+    chunk_size: int = RESULT_CHUNK_BYTES,
+) -> str:
+    """Uploads a result to the storage in chunks.
+
+    Returns the JSON to store in the tasks row instead of the result: the small
+    fields of the result as a summary, and a `result_storage` pointer to the
+    chunks. Each chunk upload is retried on its own, and uploads overwrite, so
+    a retried task replaces its earlier result.
+    """
+    data = result.encode()
+    num_chunks = 0
+    for start in range(0, len(data), chunk_size):
+        path = _chunk_path(prefix, num_chunks)
+        chunk = data[start : start + chunk_size]
+        retry_with_backoff(
+            lambda: storage.upload_chunk(path, chunk), should_retry=should_retry
+        )
+        num_chunks += 1
+    return json.dumps(
+        {
+            **_summary(result),
+            "result_storage": {
+                "bucket": storage.bucket,
+                "path": prefix,
+                "chunks": num_chunks,
+                "size": len(data),
+            },
+        }
+    )
+
+
+def result_pointer(row_result: Any) -> Optional[Dict[str, Any]]:
+    """The `result_storage` pointer of a tasks row result, if it was offloaded."""
+    if isinstance(row_result, str):
+        try:
+            row_result = json.loads(row_result)
+        except ValueError:
+            return None
+    if isinstance(row_result, dict):
+        return row_result.get("result_storage")
+    return None
+
+
+def load_result(storage: ResultStorage, row_result: Any) -> Any:
+    """Returns the full result of a tasks row, downloading it if it was offloaded."""
+    pointer = result_pointer(row_result)
+    if pointer is None:
+        return row_result
+    data = b"".join(
+        storage.download_chunk(_chunk_path(pointer["path"], index))
+        for index in range(pointer["chunks"])
+    )
+    if len(data) != pointer["size"]:
+        raise ValueError(
+            f"Result of {pointer['path']} is {len(data)} bytes, expected {pointer['size']}"
+        )
+    return data.decode()
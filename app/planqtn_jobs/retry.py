@@ -0,0 +1,43 @@
+import logging
+import time
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+def retry_with_backoff(
+    fn: Callable[[], T],
+    should_retry: Callable[[Exception], bool],
+    attempts: int = 4,
+    initial_delay: float = 0.5,
+    max_delay: float = 8.0,
+) -> T:
+    """Calls `fn`, retrying with exponential backoff on transient errors.
+
+    Only use this for idempotent calls, e.g. filtered updates or reads.
+
+    Args:
+        fn: The call to make.
+        should_retry: Decides whether an exception is transient.
+        attempts: Maximum number of calls.
+        initial_delay: Delay before the first retry in seconds, doubled after every retry.
+        max_delay: Maximum delay between retries in seconds.
+
+    Returns:
+        The result of the first successful call.
+    """
+    delay = initial_delay
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts or not should_retry(e):
+                raise
+            logger.warning(
+                f"Transient error (attempt {attempt}/{attempts}), retrying in {delay:.2f}s: {e}"
+            )
+            time.sleep(delay)
+            delay = min(2 * delay, max_delay)
+    raise AssertionError("unreachable")
@@ -4,9 +4,13 @@ from enum import Enum
 import json
 import logging
 import sys
+import threading
 import time
-from typing import Any, Dict, Optional
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import httpx
 from pydantic import BaseModel
 import supabase
 import supabase.client
@@ -17,6 +21,43 @@ from planqtn.progress_reporter import (
     ProgressReporter,
     TqdmProgressReporter,
 )
+from planqtn_jobs.result_storage import (
+    RESULT_CHUNK_BYTES,
+    RESULT_STORAGE_THRESHOLD_BYTES,
+    ResultStorage,
+    load_result,
+    offload_result,
+    result_pointer,
+)
+from planqtn_jobs.retry import retry_with_backoff
+
+# clients are pooled per credentials, so that stores, monitors and consecutive
+# tasks in the same process share keep-alive connections
+MAX_POOLED_CLIENTS = 32
+HTTP_TIMEOUT = 120.0
+HTTP_CONNECT_RETRIES = 3
+
+# each client with the httpx client it was created with, closed when evicted
+_client_pool: "OrderedDict[Tuple[str, ...], Tuple[supabase.Client, httpx.Client]]" = (
+    OrderedDict()
+)
+_client_pool_lock = threading.Lock()
+
+
+def _create_http_client() -> httpx.Client:
+    return httpx.Client(
+        timeout=HTTP_TIMEOUT,
+        transport=httpx.HTTPTransport(
+            retries=HTTP_CONNECT_RETRIES,
+            limits=httpx.Limits(
+                max_connections=20, max_keepalive_connections=10, keepalive_expiry=60
+            ),
+        ),
+    )
+
+
+def is_transient_http_error(e: Exception) -> bool:
+    return isinstance(e, httpx.TransportError)
 
 
 @dataclass
@@ -27,23 +68,47 @@ class SupabaseCredentials:
     service_role_key: str = None
 
     def createClient(self):
+        """Returns a pooled client for these credentials, creating it if needed."""
+        key = (self.url, self.user_key, self.anon_key, self.service_role_key)
+        with _client_pool_lock:
+            if key in _client_pool:
+                _client_pool.move_to_end(key)
+                return _client_pool[key][0]
+            http_client = _create_http_client()
+            try:
+                client = self._create_client(http_client)
+            except Exception:
+                http_client.close()
+                raise
+            _client_pool[key] = (client, http_client)
+            while len(_client_pool) > MAX_POOLED_CLIENTS:
+                # frees its keep-alive connections, the pool is large enough
+                # for the clients of the tasks running in this process
+                _, (_, evicted_http_client) = _client_pool.popitem(last=False)
+                evicted_http_client.close()
+            return client
+
+    def _create_client(self, http_client: httpx.Client):
         if self.user_key and self.anon_key:
             return supabase.create_client(
                 self.url,
                 self.anon_key,
                 options=supabase.ClientOptions(
-                    headers={"Authorization": f"Bearer {self.user_key}"}
+                    headers={"Authorization": f"Bearer {self.user_key}"},
+                    httpx_client=http_client,
                 ),
             )
         elif self.service_role_key:
             return supabase.create_client(
                 self.url,
                 self.service_role_key,
+                options=supabase.ClientOptions(httpx_client=http_client),
             )
         elif self.anon_key:
             return supabase.create_client(
                 self.url,
                 self.anon_key,
+                options=supabase.ClientOptions(httpx_client=http_client),
             )
         else:
             raise ValueError(
@@ -75,6 +140,8 @@ class TaskStoreProgressReporter(ProgressReporter):
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.sub_reporter.__exit__(exc_type, exc_value, traceback)
+        self.task_store.flush_task_updates()
+        self.task_store.end_task_updates(self.task.task_details)
 
         if exc_type is not None:
             self.task_store.store_task_result(
@@ -84,9 +151,14 @@ class TaskStoreProgressReporter(ProgressReporter):
             )
 
     def handle_result(self, result: Dict[str, Any]):
-        self.task_store.send_task_update(
+        # the iteration states keep changing on the compute thread, so the
+        # background publisher gets a snapshot of them
+        self.task_store.publish_task_update(
             self.task.task_details,
-            {"state": 1, "iteration_status": self.iterator_stack},
+            {
+                "state": 1,
+                "iteration_status": [state.to_dict() for state in self.iterator_stack],
+            },
         )
 
 
@@ -197,27 +269,156 @@ class TaskState(Enum):
     CANCELLED = 4
 
 
+class TaskUpdatePublisher:
+    """Sends task updates from a background thread.
+
+    Updates are coalesced to the latest one per task and at most one request
+    per task is sent every `min_interval` seconds, so the compute thread never
+    waits on the network. Failed requests are logged and dropped.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[TaskDetails, Dict[str, Any]], Any],
+        min_interval: float = 1.0,
+    ):
+        self._send = send
+        self.min_interval = min_interval
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._cond = threading.Condition()
+        self._pending: Dict[Tuple[str, str], Tuple[TaskDetails, Dict[str, Any]]] = {}
+        self._last_sent: Dict[Tuple[str, str], float] = {}
+        self._in_flight: Optional[Tuple[str, str]] = None
+        self._flushing = False
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(task: TaskDetails) -> Tuple[str, str]:
+        return (task.uuid, task.user_id)
+
+    def publish(self, task: TaskDetails, updates: Dict[str, Any]):
+        with self._cond:
+            self._pending[self._key(task)] = (task, updates)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="task-update-publisher", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+
+    def discard(self, task: TaskDetails):
+        """Drops the pending update of the task and waits for its request in flight.
+
+        The time of the last request of the task is dropped too, so that a
+        long-running worker does not keep an entry for every task it ran.
+        """
+        key = self._key(task)
+        with self._cond:
+            self._pending.pop(key, None)
+            while self._in_flight == key:
+                self._cond.wait()
+            self._last_sent.pop(key, None)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Sends all pending updates right away, regardless of the interval."""
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            done = self._cond.wait_for(
+                lambda: not self._pending and self._in_flight is None, timeout
+            )
+            self._flushing = False
+            return done
+
+    def _next_update(self) -> Tuple[Tuple[str, str], TaskDetails, Dict[str, Any]]:
+        while True:
+            now = time.monotonic()
+            wait_time = None
+            for key, (task, updates) in self._pending.items():
+                due = self._last_sent.get(key, -self.min_interval) + self.min_interval
+                if self._flushing or due <= now:
+                    del self._pending[key]
+                    self._last_sent[key] = now
+                    return key, task, updates
+                wait_time = (
+                    due - now if wait_time is None else min(wait_time, due - now)
+                )
+            self._cond.wait(wait_time)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                key, task, updates = self._next_update()
+                self._in_flight = key
+            try:
+                self._send(task, updates)
+            except Exception:
+                self.logger.exception(f"Failed to send task update for {task.uuid}")
+            finally:
+                with self._cond:
+                    self._in_flight = None
+                    self._cond.notify_all()
+
+
 class SupabaseTaskStore:
     def __init__(
         self,
         task_db_credentials: SupabaseCredentials,
         task_updates_db_credentials: SupabaseCredentials = None,
+        task_update_interval: float = 1.0,
+        retry_attempts: int = 4,
+        retry_initial_delay: float = 0.5,
+        result_storage: Optional[ResultStorage] = None,
+        result_storage_threshold: int = RESULT_STORAGE_THRESHOLD_BYTES,
+        result_chunk_size: int = RESULT_CHUNK_BYTES,
     ):
         self.task_db = task_db_credentials.createClient()
+        self.retry_attempts = retry_attempts
+        self.retry_initial_delay = retry_initial_delay
+        self.result_storage = result_storage
+        self.result_storage_threshold = result_storage_threshold
+        self.result_chunk_size = result_chunk_size
 
         self.task_updates_db = None
         if task_updates_db_credentials:
             self.task_updates_db = task_updates_db_credentials.createClient()
 
+        self.task_update_publisher = TaskUpdatePublisher(
+            self._send_task_update, min_interval=task_update_interval
+        )
+
     def start_task_updates(self, task: TaskDetails):
         if not self.task_updates_db:
             return
 
         self.send_task_update(task, {"state": 1})
 
+    def _execute(self, query_fn: Callable[[], Any]) -> Any:
+        # filtered reads and updates that set the same values again are safe to
+        # retry, compare-and-set updates are not, see claim_pending_tasks
+        return retry_with_backoff(
+            query_fn,
+            should_retry=is_transient_http_error,
+            attempts=self.retry_attempts,
+            initial_delay=self.retry_initial_delay,
+        )
+
     def store_task_result(self, task: TaskDetails, result: Any, state: TaskState):
-        res = (
-            self.task_db.table("tasks")
+        if (
+            self.result_storage is not None
+            and isinstance(result, str)
+            and len(result) > self.result_storage_threshold
+        ):
+            result = offload_result(
+                self.result_storage,
+                f"{task.user_id}/{task.uuid}",
+                result,
+                should_retry=is_transient_http_error,
+                chunk_size=self.result_chunk_size,
+            )
+        res = self._execute(
+            lambda: self.task_db.table("tasks")
             .update({"result": result, "state": state.value}, count="exact")
             .eq("uuid", task.uuid)
             .eq("user_id", task.user_id)
@@ -226,19 +427,35 @@ class SupabaseTaskStore:
         if res.count != 1:
             raise Exception(f"Failed to store task result: {res}")
 
+    def publish_task_update(self, task: TaskDetails, updates: Dict[str, Any]):
+        """Queues a task update to be sent in the background, see TaskUpdatePublisher."""
+        if not self.task_updates_db:
+            return
+        self.task_update_publisher.publish(task, updates)
+
+    def flush_task_updates(self, timeout: Optional[float] = None) -> bool:
+        return self.task_update_publisher.flush(timeout)
+
+    def end_task_updates(self, task: TaskDetails):
+        """Forgets the task in the publisher, after its final update."""
+        self.task_update_publisher.discard(task)
+
     def send_task_update(self, task: TaskDetails, updates: Dict[str, Any]):
+        # a queued progress update must not overwrite this one
+        self.task_update_publisher.discard(task)
+        return self._send_task_update(task, updates)
+
+    def _send_task_update(self, task: TaskDetails, updates: Dict[str, Any]):
         if not self.task_updates_db:
             print("No task updates db, returning None")
             return None
         print(
             f"Sending task update: {updates} for task {task.uuid} with user {task.user_id}"
         )
-        res = (
-            self.task_updates_db.table("task_updates")
-            .update(
-                {"updates": json.dumps(updates, cls=IterationStateEncoder)},
-                count="exact",
-            )
+        encoded_updates = json.dumps(updates, cls=IterationStateEncoder)
+        res = self._execute(
+            lambda: self.task_updates_db.table("task_updates")
+            .update({"updates": encoded_updates}, count="exact")
             .eq("uuid", task.uuid)
             .eq("user_id", task.user_id)
             .execute()
@@ -247,9 +464,86 @@ class SupabaseTaskStore:
             raise Exception(f"Failed to send task update: {res}")
         return res
 
+    def claim_pending_tasks(self, job_type: str, limit: int) -> List[TaskDetails]:
+        """Claims up to `limit` pending tasks of `job_type`, oldest first.
+
+        A task is claimed by moving it from PENDING to RUNNING with an update
+        filtered on the PENDING state, so concurrent workers never claim the
+        same task twice. Requires service role credentials for the tasks table.
+
+        The claim is not retried, a retry of a claim that landed but whose
+        response was lost would find the task RUNNING and leave it to nobody.
+        Instead, the claim marks the task with a token in its execution_id, and
+        after a transient error the task is read back to see whether the claim
+        landed.
+        """
+        rows = self._execute(
+            lambda: self.task_db.table("tasks")
+            .select("uuid,user_id")
+            .eq("state", TaskState.PENDING.value)
+            .eq("job_type", job_type)
+            .order("sent_at")
+            .limit(limit)
+            .execute()
+            .data
+        )
+        claimed = []
+        for row in rows:
+            if self._claim_task(row["uuid"]):
+                claimed.append(TaskDetails(uuid=row["uuid"], user_id=row["user_id"]))
+        return claimed
+
+    def _claim_task(self, task_uuid: str) -> bool:
+        token = f"claim-{uuid.uuid4()}"
+        try:
+            res = (
+                self.task_db.table("tasks")
+                .update(
+                    {"state": TaskState.RUNNING.value, "execution_id": token},
+                    count="exact",
+                )
+                .eq("uuid", task_uuid)
+                .eq("state", TaskState.PENDING.value)
+                .execute()
+            )
+            return res.count == 1
+        except Exception as e:
+            if not is_transient_http_error(e):
+                raise
+            logging.getLogger(self.__class__.__name__).warning(
+                f"Claiming task {task_uuid} failed, checking whether it landed: {e}"
+            )
+        rows = self._execute(
+            lambda: self.task_db.table("tasks")
+            .select("state,execution_id")
+            .eq("uuid", task_uuid)
+            .execute()
+            .data
+        )
+        return bool(rows) and (
+            rows[0]["state"] == TaskState.RUNNING.value
+            and rows[0]["execution_id"] == token
+        )
+
+    def get_task_result(self, task: TaskDetails) -> Any:
+        """Returns the result of a task, downloading it if it was offloaded."""
+        rows = self._execute(
+            lambda: self.task_db.table("tasks")
+            .select("result")
+            .eq("uuid", task.uuid)
+            .eq("user_id", task.user_id)
+            .execute()
+            .data
+        )
+        if not rows:
+            return None
+        if result_pointer(rows[0]["result"]) is None or self.result_storage is None:
+            return rows[0]["result"]
+        return load_result(self.result_storage, rows[0]["result"])
+
     def get_task(self, task: TaskDetails) -> Dict[str, Any]:
-        task_data = (
-            self.task_db.table("tasks")
+        task_data = self._execute(
+            lambda: self.task_db.table("tasks")
             .select("*")
             .eq("uuid", task.uuid)
             .eq("user_id", task.user_id)
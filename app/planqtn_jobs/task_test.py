@@ -0,0 +1,238 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+
+from planqtn_fixtures.supabase_stub import supabase_stub
+from planqtn_jobs import task as task_module
+from planqtn_jobs.result_storage import LocalResultStorage
+from planqtn_jobs.task import (
+    SupabaseCredentials,
+    SupabaseTaskStore,
+    TaskDetails,
+    TaskState,
+    TaskUpdatePublisher,
+)
+
+
+class SlowSender:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def __call__(self, task, updates):
+        time.sleep(self.delay)
+        with self.lock:
+            self.sent.append((task.uuid, updates))
+
+
+def test_publish_does_not_block_on_slow_sends():
+    sender = SlowSender(delay=0.5)
+    publisher = TaskUpdatePublisher(sender, min_interval=0)
+    task = TaskDetails(uuid="t1", user_id="u1")
+
+    start = time.time()
+    for i in range(100):
+        publisher.publish(task, {"state": 1, "i": i})
+    assert time.time() - start < 0.25
+
+    assert publisher.flush(timeout=5)
+    # the first update went out right away, the rest were coalesced to the latest
+    assert sender.sent[-1] == ("t1", {"state": 1, "i": 99})
+    assert len(sender.sent) <= 3
+
+
+def test_at_most_one_update_per_interval():
+    sender = SlowSender()
+    publisher = TaskUpdatePublisher(sender, min_interval=0.3)
+    task = TaskDetails(uuid="t1", user_id="u1")
+
+    publisher.publish(task, {"i": 0})
+    time.sleep(0.1)
+    publisher.publish(task, {"i": 1})
+    publisher.publish(task, {"i": 2})
+    time.sleep(0.1)
+    assert sender.sent == [("t1", {"i": 0})]
+
+    time.sleep(0.3)
+    assert sender.sent == [("t1", {"i": 0}), ("t1", {"i": 2})]
+
+
+def test_updates_of_different_tasks_are_not_coalesced():
+    sender = SlowSender()
+    publisher = TaskUpdatePublisher(sender, min_interval=10)
+
+    publisher.publish(TaskDetails(uuid="t1", user_id="u1"), {"i": 1})
+    publisher.publish(TaskDetails(uuid="t2", user_id="u1"), {"i": 2})
+    assert publisher.flush(timeout=5)
+
+    assert sorted(sender.sent) == [("t1", {"i": 1}), ("t2", {"i": 2})]
+
+
+def test_discard_drops_pending_and_waits_for_in_flight_update():
+    sender = SlowSender(delay=0.3)
+    publisher = TaskUpdatePublisher(sender, min_interval=10)
+    task = TaskDetails(uuid="t1", user_id="u1")
+
+    publisher.publish(task, {"i": 0})
+    time.sleep(0.1)
+    publisher.publish(task, {"i": 1})
+    publisher.discard(task)
+
+    # the in flight update has landed, the pending one is never sent
+    assert sender.sent == [("t1", {"i": 0})]
+    assert publisher.flush(timeout=5)
+    assert sender.sent == [("t1", {"i": 0})]
+
+
+def test_discard_forgets_the_task():
+    sender = SlowSender()
+    publisher = TaskUpdatePublisher(sender, min_interval=10)
+
+    for i in range(100):
+        task = TaskDetails(uuid=f"t{i}", user_id="u1")
+        publisher.publish(task, {"i": i})
+        assert publisher.flush(timeout=5)
+        publisher.discard(task)
+
+    assert len(sender.sent) == 100
+    assert publisher._last_sent == {}
+
+
+def test_failed_sends_do_not_stop_the_publisher():
+    sent = []
+
+    def flaky_send(task, updates):
+        if updates["i"] == 0:
+            raise Exception("network is down")
+        sent.append(updates)
+
+    publisher = TaskUpdatePublisher(flaky_send, min_interval=0)
+    task = TaskDetails(uuid="t1", user_id="u1")
+    publisher.publish(task, {"i": 0})
+    assert publisher.flush(timeout=5)
+    publisher.publish(task, {"i": 1})
+    assert publisher.flush(timeout=5)
+
+    assert sent == [{"i": 1}]
+
+
+def _stub_task_store(stub, **kwargs):
+    return SupabaseTaskStore(
+        task_db_credentials=SupabaseCredentials(
+            url=stub.url, user_key="user-key", anon_key="anon-key"
+        ),
+        task_updates_db_credentials=SupabaseCredentials(
+            url=stub.url, service_role_key="service-key"
+        ),
+        **kwargs,
+    )
+
+
+def test_task_stores_reuse_pooled_clients_and_connections(supabase_stub):
+    supabase_stub.tables["tasks"].append({"uuid": "t1", "user_id": "u1", "state": 0})
+    supabase_stub.tables["task_updates"].append({"uuid": "t1", "user_id": "u1"})
+    task = TaskDetails(uuid="t1", user_id="u1")
+
+    stores = [_stub_task_store(supabase_stub) for _ in range(3)]
+    assert stores[0].task_db is stores[1].task_db
+    assert stores[0].task_updates_db is stores[2].task_updates_db
+
+    for store in stores:
+        for _ in range(5):
+            assert store.get_task(task)["uuid"] == "t1"
+            store.send_task_update(task, {"state": 1})
+        store.store_task_result(task, "result", TaskState.COMPLETED)
+
+    assert supabase_stub.tables["tasks"][0]["state"] == TaskState.COMPLETED.value
+    assert len(supabase_stub.requests) == 33
+    # one keep-alive connection per database client
+    assert supabase_stub.connections == 2
+
+
+def test_evicted_pooled_clients_are_closed(supabase_stub, monkeypatch):
+    http_clients = []
+
+    def create_http_client():
+        http_clients.append(httpx.Client())
+        return http_clients[-1]
+
+    monkeypatch.setattr(task_module, "_client_pool", OrderedDict())
+    monkeypatch.setattr(task_module, "MAX_POOLED_CLIENTS", 2)
+    monkeypatch.setattr(task_module, "_create_http_client", create_http_client)
+    credentials = [
+        SupabaseCredentials(url=supabase_stub.url, service_role_key=f"key{i}")
+        for i in range(3)
+    ]
+
+    clients = [c.createClient() for c in credentials]
+
+    assert [http_client.is_closed for http_client in http_clients] == [
+        True,
+        False,
+        False,
+    ]
+    assert credentials[1].createClient() is clients[1]
+    assert credentials[0].createClient() is not clients[0]
+    assert http_clients[2].is_closed
+
+
+def test_task_store_retries_dropped_connections(supabase_stub):
+    supabase_stub.tables["tasks"].append({"uuid": "t2", "user_id": "u1", "state": 1})
+    store = _stub_task_store(supabase_stub, retry_initial_delay=0.01)
+    task = TaskDetails(uuid="t2", user_id="u1")
+
+    supabase_stub.drop_next_requests = 2
+    store.store_task_result(task, "result", TaskState.COMPLETED)
+
+    assert supabase_stub.tables["tasks"][0]["result"] == "result"
+    assert len(supabase_stub.requests) == 3
+
+
+def test_large_results_are_offloaded_in_chunks(supabase_stub, tmp_path):
+    supabase_stub.tables["tasks"].append({"uuid": "t3", "user_id": "u1", "state": 1})
+    storage = LocalResultStorage(str(tmp_path))
+    store = _stub_task_store(
+        supabase_stub,
+        result_storage=storage,
+        result_storage_threshold=1000,
+        result_chunk_size=4096,
+    )
+    task = TaskDetails(uuid="t3", user_id="u1")
+    result = json.dumps({"stabilizer_polynomial": "XY: {1:2}\n" * 500, "time": 1.5})
+
+    store.store_task_result(task, result, TaskState.COMPLETED)
+
+    row_result = json.loads(supabase_stub.tables["tasks"][0]["result"])
+    assert row_result == {
+        "time": 1.5,
+        "result_storage": {
+            "bucket": "task-results",
+            "path": "u1/t3",
+            "chunks": 2,
+            "size": len(result),
+        },
+    }
+    assert sorted(os.listdir(tmp_path / "task-results" / "u1" / "t3")) == [
+        "part-00000",
+        "part-00001",
+    ]
+    assert store.get_task_result(task) == result
+
+
+def test_small_results_stay_in_the_tasks_row(supabase_stub, tmp_path):
+    supabase_stub.tables["tasks"].append({"uuid": "t4", "user_id": "u1", "state": 1})
+    store = _stub_task_store(
+        supabase_stub, result_storage=LocalResultStorage(str(tmp_path))
+    )
+    task = TaskDetails(uuid="t4", user_id="u1")
+
+    store.store_task_result(task, '{"time": 1.5}', TaskState.COMPLETED)
+
+    assert supabase_stub.tables["tasks"][0]["result"] == '{"time": 1.5}'
+    assert store.get_task_result(task) == '{"time": 1.5}'
+    assert list(tmp_path.iterdir()) == []
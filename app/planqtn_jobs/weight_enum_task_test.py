@@ -12,6 +12,7 @@ from planqtn_fixtures.job_debugger import JobDebugger
 from planqtn_fixtures.cloud_run import get_execution_details
 from planqtn_jobs.main import main
 from planqtn_types.api_types import WeightEnumeratorCalculationResult
+from planqtn_types.tensor_enumerator_encoding import decode_tensor_enumerator
 from supabase import ClientOptions, create_client, Client
 from supabase.client import AsyncClient
 from planqtn_fixtures import *
@@ -253,6 +254,12 @@ YY: {2:2, 3:2}""",
         ),
     )
 
+    with open(temp_output_file, "r") as f:
+        tensor = decode_tensor_enumerator(json.load(f)["tensor_enumerator"])
+    assert len(tensor) == 16
+    assert tensor[(0, 0)] == UnivariatePoly({0: 1, 3: 2, 4: 1})
+    assert tensor[(3, 3)] == UnivariatePoly({2: 2, 3: 2})
+
 
 def test_main_with_progress_bar(temp_output_file, monkeypatch):
     input_file = create_temp_file_with_data(TEST_JSON)
@@ -0,0 +1,307 @@
+import logging
+import multiprocessing
+import os
+import threading
+import traceback
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from planqtn_jobs.result_storage import SupabaseResultStorage
+from planqtn_jobs.task import (
+    SupabaseCredentials,
+    SupabaseTaskStore,
+    TaskDetails,
+    TaskState,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue(ABC):
+    """Where a worker gets its tasks from and reports their outcome to."""
+
+    @abstractmethod
+    def claim(self, limit: int) -> List[TaskDetails]:
+        """Claims up to `limit` tasks, no other worker will get them."""
+
+    def complete(self, task: TaskDetails):
+        """Called after a task ran successfully."""
+
+    @abstractmethod
+    def fail(self, task: TaskDetails, error: str):
+        """Called after a task failed or its worker process died."""
+
+
+class TaskStoreQueue(TaskQueue):
+    """Pulls pending tasks of a job type from the Supabase task store.
+
+    Results and task updates are sent by the tasks themselves, like in the one
+    process per job mode, only failures of worker processes are stored here.
+    """
+
+    def __init__(self, task_store: SupabaseTaskStore, job_type: str):
+        self.task_store = task_store
+        self.job_type = job_type
+
+    def claim(self, limit: int) -> List[TaskDetails]:
+        return self.task_store.claim_pending_tasks(self.job_type, limit)
+
+    def fail(self, task: TaskDetails, error: str):
+        self.task_store.store_task_result(task, error, TaskState.FAILED)
+        self.task_store.send_task_update(task, {"state": TaskState.FAILED.value})
+
+
+class LocalTaskQueue(TaskQueue):
+    """Runs the `*.json` request files dropped into a directory.
+
+    A file is claimed by renaming it to `<name>.json.running`, which is atomic,
+    so several workers can share the directory. The result is written to
+    `<name>.result.json` and the claimed file is renamed to `<name>.json.done`
+    or, with the error written to `<name>.error.txt`, to `<name>.json.failed`.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def claim(self, limit: int) -> List[TaskDetails]:
+        claimed = []
+        for name in sorted(os.listdir(self.directory)):
+            if len(claimed) == limit:
+                break
+            if not name.endswith(".json") or name.endswith(".result.json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                os.rename(path, path + ".running")
+            except FileNotFoundError:
+                # claimed by another worker
+                continue
+            claimed.append(
+                TaskDetails(
+                    input_file=path + ".running",
+                    output_file=path[: -len(".json")] + ".result.json",
+                )
+            )
+        return claimed
+
+    def _finish(self, task: TaskDetails, suffix: str):
+        os.rename(task.input_file, task.input_file[: -len(".running")] + suffix)
+
+    def complete(self, task: TaskDetails):
+        self._finish(task, ".done")
+
+    def fail(self, task: TaskDetails, error: str):
+        with open(task.output_file[: -len(".result.json")] + ".error.txt", "w") as f:
+            f.write(error)
+        self._finish(task, ".failed")
+
+
+# state of the worker processes, shared by the tasks they run
+_task_store: Optional[SupabaseTaskStore] = None
+
+
+def _address_space_bytes() -> int:
+    """The size of the virtual address space of this process, 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _set_memory_limit(memory_limit_mb: Optional[int]):
+    """Lets the process map at most `memory_limit_mb` more address space.
+
+    RLIMIT_AS caps the virtual address space, not the resident memory, and
+    numpy, numba and galois reserve far more address space than they use. The
+    limit is therefore set on top of what the process has mapped already, so
+    it applies to the task rather than to the imports. Threads the task starts
+    map their stacks and malloc arenas too, so size the limit with some
+    headroom over the memory the task uses.
+    """
+    if not memory_limit_mb:
+        return
+    import resource
+
+    limit = _address_space_bytes() + memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _init_worker_process(
+    task_store_kwargs: Optional[Dict[str, Any]], memory_limit_mb: Optional[int]
+):
+    global _task_store
+    # imported here, so that the worker can be used without planqtn
+    from planqtn.warmup import warmup
+
+    try:
+        warmup()
+    except Exception as e:
+        logger.warning(f"Worker warmup failed: {e}")
+    if task_store_kwargs is not None:
+        _task_store = SupabaseTaskStore(**task_store_kwargs)
+    # after the warmup, so that it does not count the imports
+    _set_memory_limit(memory_limit_mb)
+
+
+def _run_task(job_type: str, task_details: TaskDetails, task_kwargs: Dict[str, Any]):
+    # imported here, so that the worker can be used without the job types
+    from planqtn_jobs.weight_enum_task import WeightEnumeratorTask
+
+    task_types = {"weightenumerator": WeightEnumeratorTask}
+    if job_type not in task_types:
+        raise NotImplementedError(f"Job type {job_type} not implemented")
+    task_types[job_type](
+        task_details=task_details, task_store=_task_store, **task_kwargs
+    ).run()
+
+
+class Worker:
+    """Runs tasks from a queue concurrently in a pool of warm processes.
+
+    Each process runs one task at a time, so `memory_limit_mb` is the limit
+    per task, on the address space it maps beyond the warmed up process. Processes are reused across tasks, so imports, compiled kernels
+    and the leaf tensor enumerator cache of planqtn carry over from one task
+    to the next. If a process dies, e.g. it is killed for using too much
+    memory, its tasks are failed and the pool is restarted.
+    """
+
+    def __init__(
+        self,
+        queue: TaskQueue,
+        job_type: str = "weightenumerator",
+        task_store_kwargs: Optional[Dict[str, Any]] = None,
+        max_workers: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        max_tasks_per_worker: Optional[int] = None,
+        poll_interval: float = 1.0,
+        exit_when_idle: bool = False,
+        realtime_updates_enabled: bool = False,
+        realtime_update_frequency: float = 5,
+        debug: bool = False,
+    ):
+        self.queue = queue
+        self.job_type = job_type
+        self.task_store_kwargs = task_store_kwargs
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.poll_interval = poll_interval
+        self.exit_when_idle = exit_when_idle
+        self.task_kwargs = {
+            "local_progress_bar": False,
+            "realtime_updates_enabled": realtime_updates_enabled,
+            "realtime_update_frequency": realtime_update_frequency,
+            "debug": debug,
+        }
+        self.stopped = threading.Event()
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # the parent has network threads running, so it is not safe to fork
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker_process,
+            initargs=(self.task_store_kwargs, self.memory_limit_mb),
+            max_tasks_per_child=self.max_tasks_per_worker,
+        )
+
+    def _finish(self, future: Future, task: TaskDetails):
+        error = future.exception()
+        if error is None:
+            message = None
+        elif isinstance(error, BrokenProcessPool):
+            message = "Worker process died, it might have run out of memory"
+        elif isinstance(error, MemoryError):
+            message = f"Task exceeded the memory limit of {self.memory_limit_mb}MB"
+        else:
+            message = "".join(traceback.format_exception(error))
+        self._report(task, message)
+
+    def _report(self, task: TaskDetails, error: Optional[str]):
+        try:
+            if error is None:
+                self.queue.complete(task)
+            else:
+                logger.error(f"Task {task.uuid or task.input_file} failed: {error}")
+                self.queue.fail(task, error)
+        except Exception as e:
+            logger.error(f"Failed to report outcome of {task}: {e}")
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        pool = self._create_pool()
+        running: Dict[Future, TaskDetails] = {}
+        try:
+            while not self.stopped.is_set():
+                free = self.max_workers - len(running)
+                if free > 0:
+                    try:
+                        claimed = self.queue.claim(free)
+                    except Exception as e:
+                        logger.error(f"Failed to claim tasks: {e}")
+                        claimed = []
+                    for task in claimed:
+                        future = pool.submit(
+                            _run_task, self.job_type, task, self.task_kwargs
+                        )
+                        running[future] = task
+
+                if not running:
+                    if self.exit_when_idle:
+                        break
+                    self.stopped.wait(self.poll_interval)
+                    continue
+
+                done, _ = wait(
+                    running, timeout=self.poll_interval, return_when=FIRST_COMPLETED
+                )
+                broken = False
+                for future in done:
+                    self._finish(future, running.pop(future))
+                    broken |= isinstance(future.exception(), BrokenProcessPool)
+                if broken:
+                    # all remaining tasks of a broken pool fail with it
+                    for task in running.values():
+                        self._report(
+                            task, "Worker process died while running another task"
+                        )
+                    running.clear()
+                    pool.shutdown(wait=False)
+                    pool = self._create_pool()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def task_store_worker_kwargs(
+    task_store_url: str,
+    task_store_service_key: str,
+    runtime_supabase_url: Optional[str],
+    runtime_supabase_key: Optional[str],
+    task_update_interval: float,
+    results_bucket: Optional[str] = None,
+) -> Dict[str, Any]:
+    """The SupabaseTaskStore arguments for workers serving all users' tasks."""
+    task_db_credentials = SupabaseCredentials(
+        url=task_store_url, service_role_key=task_store_service_key
+    )
+    return {
+        "task_db_credentials": task_db_credentials,
+        "task_updates_db_credentials": (
+            SupabaseCredentials(
+                url=runtime_supabase_url, service_role_key=runtime_supabase_key
+            )
+            if runtime_supabase_url and runtime_supabase_key
+            else None
+        ),
+        "task_update_interval": task_update_interval,
+        "result_storage": (
+            SupabaseResultStorage(task_db_credentials, results_bucket)
+            if results_bucket
+            else None
+        ),
+    }
@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+import sys
+
+from planqtn_fixtures.supabase_stub import supabase_stub
+from planqtn_jobs.task import SupabaseCredentials, SupabaseTaskStore, TaskState
+from planqtn_jobs.weight_enum_task_test import TEST_JSON
+from planqtn_jobs.worker import LocalTaskQueue, TaskStoreQueue, Worker
+
+
+def test_worker_runs_local_queue_concurrently(tmp_path):
+    for i in range(3):
+        (tmp_path / f"job{i}.json").write_text(TEST_JSON)
+    (tmp_path / "broken.json").write_text('{"legos": "not legos"}')
+
+    Worker(LocalTaskQueue(str(tmp_path)), max_workers=2, exit_when_idle=True).run()
+
+    for i in range(3):
+        assert (tmp_path / f"job{i}.json.done").exists()
+        result = json.loads((tmp_path / f"job{i}.result.json").read_text())
+        assert result["stabilizer_polynomial"]
+    assert (tmp_path / "broken.json.failed").exists()
+    assert "ValidationError" in (tmp_path / "broken.error.txt").read_text()
+
+
+def test_memory_limit_applies_to_the_worker_process():
+    code = (
+        "from planqtn_jobs.worker import _set_memory_limit\n"
+        "_set_memory_limit(256)\n"
+        "try:\n"
+        "    bytearray(512 * 1024 * 1024)\n"
+        "except MemoryError:\n"
+        "    print('MemoryError')\n"
+    )
+    res = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert res.stdout.strip() == "MemoryError"
+
+
+def test_memory_limit_does_not_count_the_imports():
+    # numpy, numba and galois reserve far more address space than 256MB
+    code = (
+        "import planqtn.networks\n"
+        "from planqtn_jobs.worker import _address_space_bytes, _set_memory_limit\n"
+        "assert _address_space_bytes() > 256 * 1024 * 1024\n"
+        "_set_memory_limit(256)\n"
+        "bytearray(64 * 1024 * 1024)\n"
+        "print('allocated')\n"
+    )
+    res = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert res.stdout.strip() == "allocated"
+
+
+def test_task_store_queue_claims_each_pending_task_once(supabase_stub):
+    supabase_stub.tables["tasks"] = [
+        {
+            "uuid": f"t{i}",
+            "user_id": "u1",
+            "job_type": "weightenumerator",
+            "sent_at": f"2025-01-0{i + 1}",
+            "state": TaskState.RUNNING.value if i == 0 else TaskState.PENDING.value,
+        }
+        for i in range(5)
+    ]
+    store = SupabaseTaskStore(
+        SupabaseCredentials(url=supabase_stub.url, service_role_key="service-key")
+    )
+    queues = [TaskStoreQueue(store, "weightenumerator") for _ in range(2)]
+
+    claimed = queues[0].claim(2) + queues[1].claim(5) + queues[0].claim(5)
+
+    assert [task.uuid for task in claimed] == ["t1", "t2", "t3", "t4"]
+    assert all(
+        row["state"] == TaskState.RUNNING.value for row in supabase_stub.tables["tasks"]
+    )
+
+
+def test_task_store_queue_keeps_claims_whose_response_was_lost(supabase_stub):
+    supabase_stub.tables["tasks"] = [
+        {
+            "uuid": f"t{i}",
+            "user_id": "u1",
+            "job_type": "weightenumerator",
+            "sent_at": f"2025-01-0{i + 1}",
+            "state": TaskState.PENDING.value,
+        }
+        for i in range(2)
+    ]
+    store = SupabaseTaskStore(
+        SupabaseCredentials(url=supabase_stub.url, service_role_key="service-key"),
+        retry_initial_delay=0.01,
+    )
+    # the claim of t0 lands, but its response is lost
+    supabase_stub.drop_next_update_responses = 1
+
+    claimed = TaskStoreQueue(store, "weightenumerator").claim(5)
+
+    assert [task.uuid for task in claimed] == ["t0", "t1"]
+    # the claim was not sent again, t0 was read back instead
+    patches = [r for r in supabase_stub.requests if r.startswith("PATCH")]
+    assert len(patches) == 2
+    assert all(
+        row["state"] == TaskState.RUNNING.value for row in supabase_stub.tables["tasks"]
+    )
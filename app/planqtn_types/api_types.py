@@ -1,7 +1,9 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+import numpy as np
+import scipy.sparse
 from galois import GF2
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from planqtn.stabilizer_tensor_enumerator import StabilizerCodeTensorEnumerator
 from planqtn.tensor_network import TensorNetwork
 
@@ -23,6 +25,25 @@ class TensorNetworkRequest(BaseModel):
     legos: Dict[str, LegoPiece]
     connections: List[Dict[str, Any]]
 
+    def to_tensor_network(self, truncate_length: Optional[int] = None):
+        nodes = {
+            instance_id: StabilizerCodeTensorEnumerator(
+                h=GF2(lego.parity_check_matrix), tensor_id=instance_id
+            )
+            for instance_id, lego in self.legos.items()
+        }
+
+        tn = TensorNetwork(nodes, truncate_length=truncate_length)
+        for conn in self.connections:
+            tn.self_trace(
+                conn["from"]["legoId"],
+                conn["to"]["legoId"],
+                [conn["from"]["leg_index"]],
+                [conn["to"]["leg_index"]],
+            )
+
+        return tn
+
 
 class TensorNetworkLeg(BaseModel):
     instance_id: str
@@ -33,17 +54,89 @@ class WeightEnumeratorCalculationArgs(TensorNetworkRequest):
     truncate_length: int | None = None
     open_legs: List[TensorNetworkLeg] = Field(default_factory=list)
 
+    def tensor_network_open_legs(self):
+        return [(leg.instance_id, leg.leg_index) for leg in self.open_legs]
+
 
 class WeightEnumeratorCalculationResult(BaseModel):
     stabilizer_polynomial: str
     normalizer_polynomial: str
     time: float
+    # for open legs, the whole tensor enumerator in the compact encoding of
+    # planqtn_types.tensor_enumerator_encoding, stabilizer_polynomial only
+    # lists its first keys then
+    tensor_enumerator: Optional[str] = None
+
+
+class InlineWeightEnumeratorResponse(BaseModel):
+    # False if the calculation is too expensive to run inline and has to be
+    # submitted as a job instead
+    inline: bool
+    estimated_cost: Optional[float] = None
+    result: Optional[WeightEnumeratorCalculationResult] = None
+
+
+class CostEstimateResponse(BaseModel):
+    flops: float
+    upper_bound: float
+    max_tensor_entries: int
+    peak_memory_bytes: int
+    recommended_memory_bytes: int
+    # False if the job would need more memory than a job can get
+    feasible: bool
+
+
+class SparseMatrix(BaseModel):
+    """A binary matrix as the column indices of the ones in each row.
+
+    For large LDPC codes, where the dense matrix would be mostly zeros.
+    """
+
+    num_cols: int
+    rows: List[List[int]]
+
+    @model_validator(mode="after")
+    def _columns_in_range(self):
+        for row in self.rows:
+            if row and (min(row) < 0 or max(row) >= self.num_cols):
+                raise ValueError(
+                    f"Column indices have to be between 0 and {self.num_cols - 1}."
+                )
+        return self
+
+    def to_csr(self) -> scipy.sparse.csr_array:
+        lengths = [len(row) for row in self.rows]
+        indices = np.fromiter(
+            (col for row in self.rows for col in row),
+            dtype=np.int64,
+            count=sum(lengths),
+        )
+        indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        csr = scipy.sparse.csr_array(
+            (np.ones(len(indices), dtype=np.uint8), indices, indptr),
+            shape=(len(self.rows), self.num_cols),
+        )
+        csr.sum_duplicates()
+        return csr
 
 
 class TannerRequest(BaseModel):
-    matrix: List[List[int]]
+    # exactly one of the dense and the sparse form of the parity check matrix
+    matrix: Optional[List[List[int]]] = None
+    sparse_matrix: Optional[SparseMatrix] = None
     start_node_index: int = Field(default=0)
 
+    @model_validator(mode="after")
+    def _one_matrix(self):
+        if (self.matrix is None) == (self.sparse_matrix is None):
+            raise ValueError("Exactly one of matrix and sparse_matrix is required.")
+        return self
+
+    def parity_check_matrix(self) -> GF2 | scipy.sparse.csr_array:
+        if self.sparse_matrix is not None:
+            return self.sparse_matrix.to_csr()
+        return GF2(self.matrix)
+
 
 class TensorNetworkResponse(BaseModel):
     legos: List[Dict[str, Any]]
@@ -75,54 +168,67 @@ class TensorNetworkResponse(BaseModel):
         legos = []
         connections = []
 
-        instance_id_to_idx = {}
+        lego_ids = {}
+        leg_indices = {}
+        # identical legos share their parity check matrix list, most of a
+        # Tanner network is a few sizes of repetition codes
+        matrices: Dict[tuple, List[List[int]]] = {}
 
         # Add legos and track their instance IDs
         for i, (instance_id, piece) in enumerate(tn.nodes.items()):
-            if piece.annotation is not None:
-                lego_type = piece.annotation.type
+            annotation = piece.annotation
+            if annotation is not None:
+                lego_type = annotation.type
             elif instance_id.startswith("x"):
                 lego_type = "x_rep_code"
             elif instance_id.startswith("z") or instance_id.startswith("check"):
                 lego_type = "z_rep_code"
             else:
                 lego_type = "generic"
-            lego = {
-                "instance_id": str(i + start_node_index),
-                "type_id": lego_type,
-                "short_name": instance_id,
-                "description": instance_id,
-                "x": (
-                    piece.annotation.x
-                    if piece.annotation is not None and piece.annotation.x is not None
-                    else 0
-                ),
-                "y": (
-                    piece.annotation.y
-                    if piece.annotation is not None and piece.annotation.y is not None
-                    else 0
-                ),
-                "parity_check_matrix": piece.h.tolist(),
-                "logical_legs": [],
-                "gauge_legs": [],
-            }
-            # print("lego", lego["short_name"], "x", lego["x"], "y", lego["y"])
-            legos.append(lego)
-            instance_id_to_idx[instance_id] = i + start_node_index
+            h = piece.h.view(np.ndarray)
+            matrix_key = (h.shape, h.tobytes())
+            matrix = matrices.get(matrix_key)
+            if matrix is None:
+                matrix = matrices[matrix_key] = h.tolist()
+            lego_id = str(i + start_node_index)
+            legos.append(
+                {
+                    "instance_id": lego_id,
+                    "type_id": lego_type,
+                    "short_name": instance_id,
+                    "description": instance_id,
+                    "x": (
+                        annotation.x
+                        if annotation is not None and annotation.x is not None
+                        else 0
+                    ),
+                    "y": (
+                        annotation.y
+                        if annotation is not None and annotation.y is not None
+                        else 0
+                    ),
+                    "parity_check_matrix": matrix,
+                    "logical_legs": [],
+                    "gauge_legs": [],
+                }
+            )
+            lego_ids[instance_id] = lego_id
+            leg_indices[instance_id] = {leg: j for j, leg in enumerate(piece.legs)}
         # Add connections from the tensor network's traces
         for node1, node2, legs1, legs2 in tn._traces:
             for leg1, leg2 in zip(legs1, legs2):
                 connections.append(
                     {
                         "from": {
-                            "legoId": str(instance_id_to_idx[node1]),
-                            "leg_index": tn.nodes[node1].legs.index(leg1),
+                            "legoId": lego_ids[node1],
+                            "leg_index": leg_indices[node1][leg1],
                         },
                         "to": {
-                            "legoId": str(instance_id_to_idx[node2]),
-                            "leg_index": tn.nodes[node2].legs.index(leg2),
+                            "legoId": lego_ids[node2],
+                            "leg_index": leg_indices[node2][leg2],
                         },
                     }
                 )
 
-        return TensorNetworkResponse(legos=legos, connections=connections)
+        # built from trusted values, so not validated again
+        return cls.model_construct(legos=legos, connections=connections)
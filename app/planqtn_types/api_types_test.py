@@ -0,0 +1,56 @@
+import numpy as np
+from galois import GF2
+
+from planqtn.networks.css_tanner_code import CssTannerCodeTN
+from planqtn_types.api_types import TensorNetworkResponse
+
+
+def test_from_tensor_network():
+    tn = CssTannerCodeTN(
+        hx=GF2([[1, 1, 1, 1, 0, 0], [0, 0, 1, 1, 1, 1]]),
+        hz=GF2([[1, 1, 0, 0, 1, 1]]),
+    )
+
+    response = TensorNetworkResponse.from_tensor_network(tn, start_node_index=3)
+
+    assert [lego["instance_id"] for lego in response.legos] == [
+        str(i + 3) for i in range(len(tn.nodes))
+    ]
+    for lego, node in zip(response.legos, tn.nodes.values()):
+        assert lego["parity_check_matrix"] == node.h.tolist()
+    # valid as a response, although it was not validated
+    assert TensorNetworkResponse.model_validate_json(
+        response.model_dump_json()
+    ).model_dump(mode="json") == response.model_dump(mode="json")
+
+    lego_ids = {node: str(i + 3) for i, node in enumerate(tn.nodes)}
+    assert response.connections == [
+        {
+            "from": {
+                "legoId": lego_ids[node1],
+                "leg_index": tn.nodes[node1].legs.index(leg1),
+            },
+            "to": {
+                "legoId": lego_ids[node2],
+                "leg_index": tn.nodes[node2].legs.index(leg2),
+            },
+        }
+        for node1, node2, legs1, legs2 in tn._traces
+        for leg1, leg2 in zip(legs1, legs2)
+    ]
+
+
+def test_from_tensor_network_random_ldpc_code():
+    # its time is measured in benchmarks/response_benchmark.py
+    rng = np.random.default_rng(0)
+    tn = CssTannerCodeTN(
+        hx=(rng.random((50, 200)) < 0.03).astype(int),
+        hz=(rng.random((50, 200)) < 0.03).astype(int),
+    )
+
+    response = TensorNetworkResponse.from_tensor_network(tn)
+
+    assert len(response.legos) == len(tn.nodes)
+    for lego, node in zip(response.legos, tn.nodes.values()):
+        assert lego["parity_check_matrix"] == node.h.tolist()
+    assert len(response.connections) == sum(len(t[2]) for t in tn._traces)
@@ -0,0 +1,176 @@
+"""Compact binary encoding of tensor enumerators.
+
+Open-leg weight enumerator results have one polynomial per Pauli key, which
+is too big and too slow to parse as one line per key for tensors with 10^5+
+keys. The encoding is
+
+- the magic bytes `PQTE`, a version byte and the number of legs as a varint,
+- a zlib stream of entries: the key packed 4 Paulis per byte (2 bits each,
+  the first leg in the high bits of the first byte), the number of terms of
+  the polynomial and its (weight delta, coefficient) pairs, all as unsigned
+  LEB128 varints.
+
+The number of entries is not stored, so the writer can stream the entries
+as they come.
+"""
+
+import base64
+import zlib
+from typing import BinaryIO, Dict, Iterable, Iterator, Tuple
+
+from planqtn.poly import UnivariatePoly
+
+MAGIC = b"PQTE"
+VERSION = 1
+# compressed data is flushed to the sink in chunks of this many bytes
+CHUNK_SIZE = 1 << 16
+
+TensorEnumeratorEntries = Iterable[Tuple[Tuple[int, ...], UnivariatePoly]]
+
+
+def _varint(value: int) -> bytes:
+    if value < 0:
+        raise ValueError(f"Can't encode negative value {value} as a varint.")
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_varint(data: memoryview, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _pack_key(key: Tuple[int, ...]) -> bytes:
+    packed = bytearray((len(key) + 3) // 4)
+    for i, pauli in enumerate(key):
+        packed[i // 4] |= pauli << (6 - 2 * (i % 4))
+    return bytes(packed)
+
+
+def _unpack_key(data: memoryview, pos: int, num_legs: int) -> Tuple[int, ...]:
+    return tuple((data[pos + i // 4] >> (6 - 2 * (i % 4))) & 3 for i in range(num_legs))
+
+
+class TensorEnumeratorWriter:
+    """Streams the entries of a tensor enumerator to a binary sink."""
+
+    def __init__(self, sink: BinaryIO, num_legs: int):
+        self.sink = sink
+        self.num_legs = num_legs
+        self.entries = 0
+        self._compressor = zlib.compressobj()
+        self._buffer = bytearray()
+        sink.write(MAGIC + bytes([VERSION]) + _varint(num_legs))
+
+    def write(self, key: Tuple[int, ...], polynomial: UnivariatePoly) -> None:
+        if len(key) != self.num_legs:
+            raise ValueError(f"Expected a key of {self.num_legs} legs, got {key}.")
+        self._buffer += _pack_key(key)
+        terms = sorted(polynomial.dict.items())
+        self._buffer += _varint(len(terms))
+        previous_weight = 0
+        for weight, coefficient in terms:
+            self._buffer += _varint(weight - previous_weight)
+            self._buffer += _varint(int(coefficient))
+            previous_weight = weight
+        self.entries += 1
+        if len(self._buffer) >= CHUNK_SIZE:
+            self._flush_buffer()
+
+    def _flush_buffer(self) -> None:
+        self.sink.write(self._compressor.compress(bytes(self._buffer)))
+        self._buffer.clear()
+
+    def close(self) -> None:
+        """Writes the remaining entries and the end of the zlib stream."""
+        self._flush_buffer()
+        self.sink.write(self._compressor.flush())
+
+    def __enter__(self) -> "TensorEnumeratorWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+
+class _Base64Sink:
+    """Base64 encodes the bytes written to it, 3 bytes at a time."""
+
+    def __init__(self):
+        self.chunks = []
+        self._pending = b""
+
+    def write(self, data: bytes) -> None:
+        data = self._pending + data
+        cut = len(data) - len(data) % 3
+        self.chunks.append(base64.b64encode(data[:cut]).decode("ascii"))
+        self._pending = data[cut:]
+
+    def getvalue(self) -> str:
+        return "".join(self.chunks) + base64.b64encode(self._pending).decode("ascii")
+
+
+def encode_tensor_enumerator(entries: TensorEnumeratorEntries, num_legs: int) -> str:
+    """Encodes the entries of a tensor enumerator as a base64 string for JSON."""
+    sink = _Base64Sink()
+    with TensorEnumeratorWriter(sink, num_legs) as writer:
+        for key, polynomial in entries:
+            writer.write(key, polynomial)
+    return sink.getvalue()
+
+
+def iter_tensor_enumerator(
+    encoded: bytes | str,
+) -> Iterator[Tuple[Tuple[int, ...], UnivariatePoly]]:
+    """Iterates over the entries of an encoded tensor enumerator.
+
+    Accepts the raw bytes of the encoding or its base64 string.
+    """
+    if isinstance(encoded, str):
+        encoded = base64.b64decode(encoded)
+    if encoded[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not an encoded tensor enumerator.")
+    if encoded[len(MAGIC)] != VERSION:
+        raise ValueError(
+            f"Unsupported tensor enumerator encoding {encoded[len(MAGIC)]}."
+        )
+    header = memoryview(encoded)
+    num_legs, pos = _read_varint(header, len(MAGIC) + 1)
+    data = memoryview(zlib.decompress(encoded[pos:]))
+
+    key_bytes = (num_legs + 3) // 4
+    pos = 0
+    while pos < len(data):
+        key = _unpack_key(data, pos, num_legs)
+        pos += key_bytes
+        num_terms, pos = _read_varint(data, pos)
+        terms = {}
+        weight = 0
+        for _ in range(num_terms):
+            delta, pos = _read_varint(data, pos)
+            coefficient, pos = _read_varint(data, pos)
+            weight += delta
+            terms[weight] = coefficient
+        yield key, UnivariatePoly(terms)
+
+
+def decode_tensor_enumerator(
+    encoded: bytes | str,
+) -> Dict[Tuple[int, ...], UnivariatePoly]:
+    """Decodes an encoded tensor enumerator into a dictionary."""
+    return dict(iter_tensor_enumerator(encoded))
@@ -0,0 +1,55 @@
+import io
+import zlib
+
+import pytest
+
+from planqtn.poly import UnivariatePoly
+from planqtn_types.tensor_enumerator_encoding import (
+    TensorEnumeratorWriter,
+    decode_tensor_enumerator,
+    encode_tensor_enumerator,
+)
+
+
+def test_round_trip():
+    tensor = {
+        (0, 1, 2, 3, 1): UnivariatePoly({0: 1, 3: 2, 4: 1}),
+        (3, 3, 3, 3, 3): UnivariatePoly({2: 2**70}),
+        (1, 0, 0, 0, 0): UnivariatePoly(),
+    }
+    encoded = encode_tensor_enumerator(tensor.items(), num_legs=5)
+    assert isinstance(encoded, str)
+    assert decode_tensor_enumerator(encoded) == tensor
+
+
+def test_scalar_and_empty_tensors():
+    scalar = {(): UnivariatePoly({0: 1, 4: 21, 6: 42})}
+    assert decode_tensor_enumerator(encode_tensor_enumerator(scalar.items(), 0)) == (
+        scalar
+    )
+    assert decode_tensor_enumerator(encode_tensor_enumerator([], 3)) == {}
+
+
+def test_streaming_writer_is_compact():
+    num_legs = 10
+    tensor = {
+        tuple((i >> (2 * leg)) & 3 for leg in range(num_legs)): UnivariatePoly(
+            {w: (i * w) % 7 + 1 for w in range(0, num_legs + 1, 2)}
+        )
+        for i in range(4**num_legs // 8)
+    }
+    sink = io.BytesIO()
+    with TensorEnumeratorWriter(sink, num_legs) as writer:
+        for key, polynomial in tensor.items():
+            writer.write(key, polynomial)
+
+    as_text = "\n".join(f"{k}: {v}" for k, v in tensor.items())
+    assert len(sink.getvalue()) * 10 < len(as_text)
+    assert decode_tensor_enumerator(sink.getvalue()) == tensor
+
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError, match="Not an encoded tensor enumerator"):
+        decode_tensor_enumerator(zlib.compress(b"{0:1, 4:21}"))
+    with pytest.raises(ValueError, match="Expected a key of 2 legs"):
+        encode_tensor_enumerator([((0,), UnivariatePoly({0: 1}))], num_legs=2)
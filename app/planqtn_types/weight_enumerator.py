@@ -0,0 +1,99 @@
+import itertools
+import os
+import time
+from typing import Optional
+
+from planqtn.pauli import Pauli
+from planqtn.progress_reporter import DummyProgressReporter, ProgressReporter
+from planqtn.tensor_network import TensorNetwork
+from planqtn_types.api_types import (
+    WeightEnumeratorCalculationArgs,
+    WeightEnumeratorCalculationResult,
+)
+from planqtn_types.tensor_enumerator_encoding import encode_tensor_enumerator
+
+# budget for the tensors of a calculation, intermediate tensors beyond it are
+# spilled to disk, set it below the memory limit of the job's pod
+MEMORY_LIMIT_BYTES = (
+    int(os.environ["PLANQTN_MEMORY_LIMIT_BYTES"])
+    if os.getenv("PLANQTN_MEMORY_LIMIT_BYTES")
+    else None
+)
+
+# open-leg results list this many keys as text, the whole tensor enumerator is
+# in the compact tensor_enumerator encoding
+MAX_LISTED_KEYS = 1000
+
+
+def calculate_weight_enumerator(
+    args: WeightEnumeratorCalculationArgs,
+    progress_reporter: ProgressReporter = DummyProgressReporter(),
+    debug: bool = False,
+    tn: Optional[TensorNetwork] = None,
+    cotengra: Optional[bool] = None,
+) -> WeightEnumeratorCalculationResult:
+    """Calculates the weight enumerators of a Studio tensor network.
+
+    Shared by the weight enumerator jobs and the inline fast path of the API.
+    The inline path passes the tensor network it already built for its cost
+    estimate, and contracts it in the order it estimated. By default cotengra
+    looks for the order of networks with more than 5 legos.
+    """
+    if tn is None:
+        tn = args.to_tensor_network(truncate_length=args.truncate_length)
+    if cotengra is None:
+        cotengra = len(tn.nodes) > 5
+    open_legs = args.tensor_network_open_legs()
+
+    start = time.time()
+    # Conjoin all nodes to get the final tensor network
+    polynomial = tn.stabilizer_enumerator_polynomial(
+        verbose=debug,
+        progress_reporter=progress_reporter,
+        cotengra=cotengra,
+        open_legs=open_legs,
+        memory_limit=MEMORY_LIMIT_BYTES,
+    )
+    end = time.time()
+
+    print("WEP calculation time", end - start)
+    print("polynomial", polynomial)
+
+    if open_legs:
+        poly_b = "not supported for open legs yet"
+    elif polynomial.is_scalar():
+        poly_b = polynomial
+    elif args.truncate_length is not None:
+        poly_b = "not defined for truncated enumerator"
+    else:
+        h = tn.conjoin_nodes().h
+        r = h.shape[0]
+        n = h.shape[1] // 2
+        k = n - r
+
+        poly_b = polynomial.macwilliams_dual(n=n, k=k, to_normalizer=True)
+
+        print("poly_b", poly_b)
+
+    # Convert the polynomial to a string representation
+    tensor_enumerator = None
+    if open_legs:
+        polynomial_str = "\n".join(
+            f"{Pauli.to_str(*pauli)}: {str(wep)}"
+            for pauli, wep in itertools.islice(polynomial.items(), MAX_LISTED_KEYS)
+        )
+        if len(polynomial) > MAX_LISTED_KEYS:
+            polynomial_str += f"\n... and {len(polynomial) - MAX_LISTED_KEYS} more keys"
+        normalizer_polynomial_str = "not supported for open legs yet"
+        tensor_enumerator = encode_tensor_enumerator(
+            polynomial.items(), num_legs=len(open_legs)
+        )
+    else:
+        polynomial_str = str(polynomial)
+        normalizer_polynomial_str = str(poly_b)
+    return WeightEnumeratorCalculationResult(
+        stabilizer_polynomial=polynomial_str,
+        normalizer_polynomial=normalizer_polynomial_str,
+        time=end - start,
+        tensor_enumerator=tensor_enumerator,
+    )
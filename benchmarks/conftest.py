@@ -0,0 +1,28 @@
+import random
+
+import numpy as np
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--large",
+        action="store_true",
+        help="also run the large workloads, some of them take minutes per round",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--large"):
+        return
+    skip_large = pytest.mark.skip(reason="large workload, run with --large")
+    for item in items:
+        if "large" in item.keywords:
+            item.add_marker(skip_large)
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    # cotengra's search draws from the global generators
+    random.seed(0)
+    np.random.seed(0)
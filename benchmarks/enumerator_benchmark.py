@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from planqtn.poly import UnivariatePoly
+from planqtn.stabilizer_tensor_enumerator import StabilizerCodeTensorEnumerator
+from workloads import leaf_parity_check, random_pte
+
+
+@pytest.mark.parametrize(
+    "num_generators", [4, 8, 12, pytest.param(16, marks=pytest.mark.large)]
+)
+def test_leaf_enumeration(benchmark, num_generators):
+    # all legs open, as for the leaves of a closed network
+    node = StabilizerCodeTensorEnumerator(leaf_parity_check(num_generators))
+
+    tensor = benchmark.pedantic(
+        node.stabilizer_enumerator_polynomial,
+        kwargs={"open_legs": node.legs},
+        rounds=3,
+    )
+
+    assert sum(sum(p.dict.values()) for p in tensor.values()) == 2**num_generators
+
+
+@pytest.mark.parametrize(
+    "num_keys", [64, 256, 1024, pytest.param(4096, marks=pytest.mark.large)]
+)
+def test_merge_with(benchmark, num_keys):
+    rng = np.random.default_rng(num_keys)
+    pte1, pte2 = random_pte(0, num_keys, rng), random_pte(1, num_keys, rng)
+
+    benchmark.pedantic(
+        pte1.merge_with,
+        args=(pte2, ((0, 0), (0, 1)), ((1, 0), (1, 1))),
+        rounds=3,
+    )
+
+
+@pytest.mark.parametrize("n", [9, 25, pytest.param(49, marks=pytest.mark.large)])
+def test_macwilliams_dual(benchmark, n):
+    rng = np.random.default_rng(n)
+    wep = UnivariatePoly(
+        {0: 1, **{w: int(c) for w, c in zip(range(2, n + 1), rng.integers(1, 1000, n))}}
+    )
+
+    benchmark.pedantic(wep.macwilliams_dual, kwargs={"n": n, "k": 1}, rounds=3)
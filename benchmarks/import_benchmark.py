@@ -0,0 +1,18 @@
+import pathlib
+import subprocess
+import sys
+
+REPO_ROOT = pathlib.Path(__file__).parent.parent
+
+
+# importing takes about 0.9s, most of it galois and numba, importing sympy and
+# cotengra eagerly again would add another 0.5s
+def test_import_planqtn(benchmark):
+    # in a fresh interpreter, the benchmark process has everything imported
+    # already, the time includes the start of the interpreter
+    benchmark.pedantic(
+        subprocess.run,
+        args=([sys.executable, "-c", "import planqtn, planqtn.networks"],),
+        kwargs={"check": True, "cwd": REPO_ROOT},
+        rounds=3,
+    )
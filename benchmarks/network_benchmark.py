@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from galois import GF2
+
+from planqtn.networks import CssTannerCodeTN, RotatedSurfaceCodeTN, SurfaceCodeTN
+from workloads import (
+    clear_caches,
+    contract,
+    greedy_contraction_tree,
+    hypergraph_product_code,
+    random_ldpc_code,
+)
+
+
+# the surface codes are contracted in the order of their traces, which they are
+# laid out for, so that the runs don't depend on cotengra's randomized search
+@pytest.mark.parametrize("d", [3, 5, 7, pytest.param(9, marks=pytest.mark.large)])
+def test_rotated_surface_code_wep(benchmark, d):
+    def setup():
+        clear_caches()
+        return (RotatedSurfaceCodeTN(d),), {}
+
+    benchmark.pedantic(
+        lambda tn: tn.stabilizer_enumerator_polynomial(cotengra=False),
+        setup=setup,
+        rounds=3,
+    )
+
+
+@pytest.mark.parametrize("d", [3, 5, pytest.param(7, marks=pytest.mark.large)])
+def test_surface_code_wep(benchmark, d):
+    def setup():
+        clear_caches()
+        return (SurfaceCodeTN(d),), {}
+
+    benchmark.pedantic(
+        lambda tn: tn.stabilizer_enumerator_polynomial(cotengra=False),
+        setup=setup,
+        rounds=3,
+    )
+
+
+# the order of the traces of Tanner networks is far from optimal, they are
+# contracted along a greedy tree instead
+@pytest.mark.parametrize("num_checks,num_bits", [(2, 3), (2, 4), (3, 4)])
+def test_css_tanner_code_wep(benchmark, num_checks, num_bits):
+    hx, hz = hypergraph_product_code(num_checks, num_bits, seed=0)
+    tree = greedy_contraction_tree(CssTannerCodeTN(hx, hz))
+
+    def setup():
+        clear_caches()
+        return (CssTannerCodeTN(hx, hz), tree), {}
+
+    benchmark.pedantic(contract, setup=setup, rounds=3)
+
+
+@pytest.mark.parametrize("num_qubits", [100, 1000, 10000])
+def test_css_tanner_code_construction(benchmark, num_qubits):
+    hx, hz = random_ldpc_code(num_qubits, seed=0)
+
+    benchmark.pedantic(CssTannerCodeTN, args=(hx, hz), rounds=3)
+
+
+@pytest.mark.parametrize("num_cosets", [1, 8, 32])
+def test_coset_sweep(benchmark, num_cosets):
+    rng = np.random.default_rng(num_cosets)
+    tn = RotatedSurfaceCodeTN(5)
+    coset_errors = [
+        GF2(rng.integers(0, 2, 2 * tn.n_qubits())) for _ in range(num_cosets)
+    ]
+
+    benchmark.pedantic(
+        tn.coset_enumerators,
+        args=(coset_errors,),
+        kwargs={"cotengra": False},
+        setup=clear_caches,
+        rounds=3,
+    )
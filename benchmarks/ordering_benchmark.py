@@ -0,0 +1,38 @@
+import pytest
+
+from planqtn.networks import CssTannerCodeTN, RotatedSurfaceCodeTN
+from planqtn.tensor_network import Contraction
+from workloads import hypergraph_product_code
+
+# the search is randomized, a fixed number of trials keeps the work comparable
+MAX_REPEATS = 8
+
+
+@pytest.mark.parametrize("d", [3, 5, 7, pytest.param(9, marks=pytest.mark.large)])
+def test_rotated_surface_code_ordering(benchmark, d):
+    def setup():
+        return (Contraction(RotatedSurfaceCodeTN(d), lambda node: node),), {}
+
+    benchmark.pedantic(
+        lambda contraction: contraction.contraction_tree(
+            cotengra_opts={"max_repeats": MAX_REPEATS}
+        ),
+        setup=setup,
+        rounds=3,
+    )
+
+
+@pytest.mark.parametrize("num_checks,num_bits", [(2, 3), (3, 4)])
+def test_css_tanner_code_ordering(benchmark, num_checks, num_bits):
+    hx, hz = hypergraph_product_code(num_checks, num_bits, seed=0)
+
+    def setup():
+        return (Contraction(CssTannerCodeTN(hx, hz), lambda node: node),), {}
+
+    benchmark.pedantic(
+        lambda contraction: contraction.contraction_tree(
+            cotengra_opts={"max_repeats": MAX_REPEATS}
+        ),
+        setup=setup,
+        rounds=3,
+    )
@@ -0,0 +1,16 @@
+import pytest
+
+from planqtn.networks import CssTannerCodeTN
+from planqtn_types.api_types import TensorNetworkResponse
+from workloads import random_ldpc_code
+
+
+# what the network endpoints do after building the network
+@pytest.mark.parametrize("num_qubits", [100, 1000, 10000])
+def test_tensor_network_response(benchmark, num_qubits):
+    tn = CssTannerCodeTN(*random_ldpc_code(num_qubits, seed=0))
+
+    benchmark.pedantic(
+        lambda: TensorNetworkResponse.from_tensor_network(tn).model_dump_json(),
+        rounds=3,
+    )
@@ -0,0 +1,122 @@
+"""Inputs of the benchmarks, seeded so that every run measures the same work."""
+
+from typing import Tuple
+
+import cotengra as ctg
+import numpy as np
+from cotengra.pathfinders.path_basic import optimize_greedy
+from galois import GF2
+from scipy.sparse import csr_array
+
+from planqtn.legos import Legos
+from planqtn.parity_check import tensor_product
+from planqtn.poly import UnivariatePoly
+from planqtn.tensor_network import (
+    _LEAF_ENUMERATOR_CACHE,
+    Contraction,
+    TensorNetwork,
+    _PartiallyTracedEnumerator,
+)
+
+# legs of the synthetic partially traced enumerators, 4^8 possible keys
+PTE_LEGS = 8
+
+
+def clear_caches() -> None:
+    """Forgets the leaf enumerators, so that each round enumerates them again."""
+    _LEAF_ENUMERATOR_CACHE.clear()
+
+
+def leaf_parity_check(num_generators: int) -> GF2:
+    """Copies of the [[5,1,2]] encoding tensor, 4 generators each."""
+    assert num_generators % 4 == 0
+    h = Legos.encoding_tensor_512
+    for _ in range(num_generators // 4 - 1):
+        h = tensor_product(h, Legos.encoding_tensor_512)
+    return h
+
+
+def random_pte(
+    node_id: int, num_keys: int, rng: np.random.Generator
+) -> _PartiallyTracedEnumerator:
+    """A partially traced enumerator with distinct random keys and small polynomials."""
+    keys = rng.choice(4**PTE_LEGS, size=num_keys, replace=False)
+    tensor = {
+        tuple((int(key) >> (2 * leg)) & 3 for leg in range(PTE_LEGS)): UnivariatePoly(
+            {
+                int(w): int(c)
+                for w, c in zip(rng.integers(0, 9, 3), rng.integers(1, 5, 3))
+            }
+        )
+        for key in keys
+    }
+    return _PartiallyTracedEnumerator(
+        [node_id],
+        tracable_legs=tuple((node_id, leg) for leg in range(PTE_LEGS)),
+        tensor=tensor,
+        truncate_length=None,
+    )
+
+
+def hypergraph_product_code(
+    num_checks: int, num_bits: int, seed: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """The Hx and Hz of the hypergraph product of a random classical code with itself."""
+    rng = np.random.default_rng(seed)
+    while True:
+        h = (rng.random((num_checks, num_bits)) < 0.5).astype(int)
+        if h.any(axis=0).all() and h.any(axis=1).all():
+            break
+    checks, bits = np.eye(num_checks, dtype=int), np.eye(num_bits, dtype=int)
+    hx = np.hstack([np.kron(h, bits), np.kron(checks, h.T)])
+    hz = np.hstack([np.kron(bits, h), np.kron(h.T, checks)])
+    return hx, hz
+
+
+def random_ldpc_code(num_qubits: int, seed: int) -> Tuple[csr_array, csr_array]:
+    """Random sparse Hx and Hz with num_qubits / 2 checks each.
+
+    Every qubit is in 3 checks of both, and checks that got no qubits get a random one.
+    """
+    rng = np.random.default_rng(seed)
+    num_checks = num_qubits // 2
+
+    def checks() -> csr_array:
+        rows = [
+            rng.choice(num_checks, size=3, replace=False) for _ in range(num_qubits)
+        ]
+        cols = [np.full(3, qubit) for qubit in range(num_qubits)]
+        empty = np.setdiff1d(np.arange(num_checks), np.concatenate(rows))
+        rows.append(empty)
+        cols.append(rng.integers(num_qubits, size=len(empty)))
+        rows_array, cols_array = np.concatenate(rows), np.concatenate(cols)
+        return csr_array(
+            (np.ones(len(rows_array), dtype=np.uint8), (rows_array, cols_array)),
+            shape=(num_checks, num_qubits),
+        )
+
+    return checks(), checks()
+
+
+def greedy_contraction_tree(tn: TensorNetwork) -> "ctg.ContractionTree":
+    """A deterministic contraction tree, unlike cotengra's randomized search."""
+    contraction = Contraction(tn, lambda node: node)
+    path = optimize_greedy(
+        contraction.inputs, contraction.output, contraction.size_dict
+    )
+    return ctg.ContractionTree.from_path(
+        contraction.inputs, contraction.output, contraction.size_dict, path=path
+    )
+
+
+def contract(
+    tn: TensorNetwork, tree: "ctg.ContractionTree"
+) -> _PartiallyTracedEnumerator:
+    """Enumerates the leaves of the network and merges them along the tree."""
+    return Contraction[_PartiallyTracedEnumerator](
+        tn,
+        lambda node: _PartiallyTracedEnumerator.from_stabilizer_code_tensor_enumerator(
+            node, tn.truncate_length
+        ),
+        cotengra_tree=tree,
+    ).contract()
@@ -12,10 +12,38 @@ Trace = Tuple[TensorId, TensorId, List[TensorLeg], List[TensorLeg]]
 T = TypeVar("T", bound=Tracable)
 
 
-# pylint: disable=too-few-public-methods
 class ContractionVisitor(abc.ABC, Generic[T]):
     """Abstract base class for visitors that can be called during contraction."""
 
+    def on_leaf(self, node_id: TensorId, pte: T, start: float, seconds: float) -> None:
+        """Called for each leaf at the start of the contraction.
+
+        Args:
+            node_id: The node of the leaf.
+            pte: The object created for the leaf.
+            start: The `time.perf_counter()` when the creation of the leaf started, the leaves are
+                created before the contraction starts.
+            seconds: How long the creation of the leaf took.
+        """
+
+    def on_merge_start(
+        self,
+        pte1: T,
+        pte2: T,
+        join_legs1: List[TensorLeg],
+        join_legs2: List[TensorLeg],
+        tensor_with: bool = False,
+    ) -> None:
+        """Called before two PTEs are merged.
+
+        Args:
+            pte1: The first PTE.
+            pte2: The second PTE.
+            join_legs1: The legs of the first PTE to join.
+            join_legs2: The legs of the second PTE to join.
+            tensor_with: Whether the PTEs are tensored, without joining legs.
+        """
+
     @abc.abstractmethod
     def on_merge(
         self,
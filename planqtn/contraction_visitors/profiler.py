@@ -0,0 +1,288 @@
+"""Profiles the merges of a weight enumerator contraction.
+
+The cost visitors predict the cost of a contraction from the parity check matrices, the
+[`ContractionProfiler`][planqtn.contraction_visitors.profiler.ContractionProfiler] measures a real
+run: the time, the number of keys and polynomial terms and the growth of the peak memory of each
+merge, and the time the enumeration of the leaves took. The profile can be saved as a Chrome trace,
+to be opened in `chrome://tracing` or [Perfetto](https://ui.perfetto.dev).
+
+Example:
+    ```python
+    >>> from planqtn.contraction_visitors.profiler import ContractionProfiler
+    >>> from planqtn.networks import RotatedSurfaceCodeTN
+    >>> profiler = ContractionProfiler()
+    >>> wep = RotatedSurfaceCodeTN(3).stabilizer_enumerator_polynomial(
+    ...     cotengra=False, visitors=[profiler]
+    ... )
+    >>> len(profiler.leaves), len(profiler.merges)
+    (9, 8)
+    >>> profiler.merges[-1].keys_out
+    1
+
+    ```
+"""
+
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from planqtn.contraction_visitors.contraction_visitor import ContractionVisitor
+from planqtn.tensor import TensorId, TensorLeg
+
+if TYPE_CHECKING:
+    from planqtn.tensor_network import _PartiallyTracedEnumerator
+
+
+def _peak_rss_bytes() -> int:
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:  # not available on Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _num_terms(pte: "_PartiallyTracedEnumerator") -> Optional[int]:
+    # reading a spilled tensor back would change what is measured
+    if pte.is_spilled:
+        return None
+    return sum(len(poly.dict) for poly in pte.tensor.values())
+
+
+@dataclass
+class LeafProfile:
+    """The enumeration of the tensor of a leaf.
+
+    Attributes:
+        node_id: The node of the leaf.
+        start: The `time.perf_counter()` at the start of the enumeration.
+        seconds: The time the enumeration took, including the lookup in the leaf cache.
+        keys: The number of keys of the tensor enumerator.
+        terms: The number of terms of the polynomials of the tensor enumerator.
+    """
+
+    node_id: TensorId
+    start: float
+    seconds: float
+    keys: int
+    terms: Optional[int]
+
+
+@dataclass
+class MergeProfile:
+    """A merge (or tensor product) of two tensor enumerators.
+
+    Attributes:
+        node_ids1: The nodes of the first tensor enumerator.
+        node_ids2: The nodes of the second tensor enumerator.
+        tensor_with: Whether it was a tensor product, without any joined legs.
+        join_legs: The number of legs joined.
+        start: The `time.perf_counter()` at the start of the merge.
+        seconds: The time the merge took.
+        keys1: The number of keys of the first tensor enumerator.
+        keys2: The number of keys of the second tensor enumerator.
+        keys_out: The number of keys of the merged tensor enumerator.
+        terms1: The number of polynomial terms of the first tensor enumerator, `None` if it was
+            spilled to disk.
+        terms2: The number of polynomial terms of the second tensor enumerator, `None` if it was
+            spilled to disk.
+        terms_out: The number of polynomial terms of the merged tensor enumerator.
+        peak_rss_delta_bytes: How much the peak resident memory of the process grew during the
+            merge, 0 if it stayed below an earlier peak.
+        leaf_seconds: The time the enumeration of the leaves merged here took, 0 if both tensor
+            enumerators are intermediate results.
+    """
+
+    node_ids1: List[TensorId]
+    node_ids2: List[TensorId]
+    tensor_with: bool
+    join_legs: int
+    start: float
+    seconds: float
+    keys1: int
+    keys2: int
+    keys_out: int
+    terms1: Optional[int]
+    terms2: Optional[int]
+    terms_out: Optional[int]
+    peak_rss_delta_bytes: int
+    leaf_seconds: float
+
+
+class ContractionProfiler(ContractionVisitor["_PartiallyTracedEnumerator"]):
+    """A contraction visitor that profiles the leaves and merges of a contraction.
+
+    Pass it to `TensorNetwork.stabilizer_enumerator_polynomial` in `visitors`. Counting the
+    polynomial terms takes a pass over the tensors, it is not included in the measured times.
+    """
+
+    def __init__(self) -> None:
+        """Creates a profiler without any leaves or merges recorded."""
+        super().__init__()
+        self.leaves: List[LeafProfile] = []
+        self.merges: List[MergeProfile] = []
+        # the times of the leaves that were not merged yet
+        self._unmerged_leaves: Dict[TensorId, float] = {}
+        self._pending: Dict[str, Any] = {}
+
+    def on_leaf(
+        self,
+        node_id: TensorId,
+        pte: "_PartiallyTracedEnumerator",
+        start: float,
+        seconds: float,
+    ) -> None:
+        """Records the leaf.
+
+        Args:
+            node_id: The node of the leaf.
+            pte: The tensor enumerator of the leaf.
+            start: The `time.perf_counter()` when the enumeration started.
+            seconds: How long the enumeration took.
+        """
+        self.leaves.append(
+            LeafProfile(node_id, start, seconds, pte.num_entries(), _num_terms(pte))
+        )
+        self._unmerged_leaves[node_id] = seconds
+
+    def _leaf_seconds(self, pte: "_PartiallyTracedEnumerator") -> float:
+        if len(pte.node_ids) != 1:
+            return 0.0
+        return self._unmerged_leaves.pop(pte.node_ids[0], 0.0)
+
+    def on_merge_start(
+        self,
+        pte1: "_PartiallyTracedEnumerator",
+        pte2: "_PartiallyTracedEnumerator",
+        join_legs1: List[TensorLeg],
+        join_legs2: List[TensorLeg],
+        tensor_with: bool = False,
+    ) -> None:
+        """Measures the inputs of the merge and starts timing it.
+
+        Args:
+            pte1: The first tensor enumerator.
+            pte2: The second tensor enumerator.
+            join_legs1: The legs of the first tensor enumerator to join.
+            join_legs2: The legs of the second tensor enumerator to join.
+            tensor_with: Whether the tensor enumerators are tensored, without joining legs.
+        """
+        self._pending = {
+            "keys1": pte1.num_entries(),
+            "keys2": pte2.num_entries(),
+            "terms1": _num_terms(pte1),
+            "terms2": _num_terms(pte2),
+            "leaf_seconds": self._leaf_seconds(pte1) + self._leaf_seconds(pte2),
+            "peak_rss": _peak_rss_bytes(),
+            # last, so that the counting above is not measured
+            "start": time.perf_counter(),
+        }
+
+    def on_merge(
+        self,
+        pte1: "_PartiallyTracedEnumerator",
+        pte2: "_PartiallyTracedEnumerator",
+        join_legs1: List[TensorLeg],
+        join_legs2: List[TensorLeg],
+        new_pte: "_PartiallyTracedEnumerator",
+        tensor_with: bool = False,
+    ) -> None:
+        """Records the merge started in `on_merge_start`.
+
+        Args:
+            pte1: The first tensor enumerator.
+            pte2: The second tensor enumerator.
+            join_legs1: The legs of the first tensor enumerator that were joined.
+            join_legs2: The legs of the second tensor enumerator that were joined.
+            new_pte: The merged tensor enumerator.
+            tensor_with: Whether the tensor enumerators were tensored, without joining legs.
+        """
+        end = time.perf_counter()
+        pending = self._pending
+        self.merges.append(
+            MergeProfile(
+                node_ids1=list(pte1.node_ids),
+                node_ids2=list(pte2.node_ids),
+                tensor_with=tensor_with,
+                join_legs=len(join_legs1),
+                start=pending["start"],
+                seconds=end - pending["start"],
+                keys1=pending["keys1"],
+                keys2=pending["keys2"],
+                keys_out=new_pte.num_entries(),
+                terms1=pending["terms1"],
+                terms2=pending["terms2"],
+                terms_out=_num_terms(new_pte),
+                peak_rss_delta_bytes=_peak_rss_bytes() - pending["peak_rss"],
+                leaf_seconds=pending["leaf_seconds"],
+            )
+        )
+
+    def total_seconds(self) -> float:
+        """Returns the time spent in the leaves and the merges.
+
+        Returns:
+            The sum of the times of the leaves and the merges in seconds.
+        """
+        return sum(leaf.seconds for leaf in self.leaves) + sum(
+            merge.seconds for merge in self.merges
+        )
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Returns the profile in the Chrome trace event format.
+
+        Each leaf and merge is a complete event with its measurements as arguments, the times are
+        in microseconds from the start of the first leaf.
+
+        Returns:
+            The trace as a JSON serializable dictionary.
+        """
+        starts = [leaf.start for leaf in self.leaves] + [
+            merge.start for merge in self.merges
+        ]
+        origin = min(starts, default=0.0)
+
+        def event(name: str, category: str, profile: Any) -> Dict[str, Any]:
+            args = {
+                key: (
+                    value
+                    if value is None or isinstance(value, (int, float, bool))
+                    else str(value)
+                )
+                for key, value in asdict(profile).items()
+                if key not in ("start", "seconds")
+            }
+            return {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (profile.start - origin) * 1e6,
+                "dur": profile.seconds * 1e6,
+                "pid": 0,
+                "tid": 0,
+                "args": args,
+            }
+
+        events = [event(f"leaf {leaf.node_id}", "leaf", leaf) for leaf in self.leaves]
+        events += [
+            event(
+                f"{'tensor' if merge.tensor_with else 'merge'} "
+                f"{merge.keys1} x {merge.keys2} keys",
+                "merge",
+                merge,
+            )
+            for merge in self.merges
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str) -> None:
+        """Saves the profile as a Chrome trace JSON file.
+
+        Args:
+            path: The path of the JSON file.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from planqtn.contraction_visitors.contraction_visitor import ContractionVisitor
+from planqtn.contraction_visitors.profiler import ContractionProfiler
+from planqtn.legos import Legos
+from planqtn.networks.rotated_surface_code import RotatedSurfaceCodeTN
+from planqtn.stabilizer_tensor_enumerator import StabilizerCodeTensorEnumerator
+from planqtn.tensor_network import Contraction, TensorNetwork
+
+
+class RecordingVisitor(ContractionVisitor):
+    def __init__(self):
+        self.calls = []
+
+    def on_leaf(self, node_id, pte, start, seconds):
+        self.calls.append("leaf")
+
+    def on_merge_start(self, pte1, pte2, join_legs1, join_legs2, tensor_with=False):
+        self.calls.append("start")
+
+    def on_merge(self, pte1, pte2, join_legs1, join_legs2, new_pte, tensor_with=False):
+        self.calls.append("merge")
+
+
+def test_hooks_are_called_around_each_merge():
+    tn = RotatedSurfaceCodeTN(d=3)
+    visitor = RecordingVisitor()
+
+    Contraction(tn, lambda node: node.copy()).contract(
+        visitors=[visitor], cotengra=False
+    )
+
+    assert visitor.calls == ["leaf"] * 9 + ["start", "merge"] * 8
+
+
+def test_profile_of_a_contraction():
+    tn = RotatedSurfaceCodeTN(d=3)
+    profiler = ContractionProfiler()
+
+    wep = tn.stabilizer_enumerator_polynomial(cotengra=False, visitors=[profiler])
+
+    assert wep == RotatedSurfaceCodeTN(d=3).stabilizer_enumerator_polynomial(
+        cotengra=False
+    )
+    assert sorted(leaf.node_id for leaf in profiler.leaves) == sorted(tn.nodes)
+    assert len(profiler.merges) == len(tn.nodes) - 1
+    final = profiler.merges[-1]
+    assert final.keys_out == 1
+    assert final.terms_out == len(wep.dict)
+    assert sorted(final.node_ids1 + final.node_ids2) == sorted(tn.nodes)
+    for merge in profiler.merges:
+        assert merge.seconds >= 0
+        assert merge.peak_rss_delta_bytes >= 0
+        assert merge.join_legs > 0
+        assert merge.terms1 >= merge.keys1 > 0
+        assert merge.terms2 >= merge.keys2 > 0
+    # each leaf is merged once
+    assert sum(merge.leaf_seconds for merge in profiler.merges) == pytest.approx(
+        sum(leaf.seconds for leaf in profiler.leaves)
+    )
+    assert profiler.total_seconds() > 0
+
+
+def test_profile_of_a_spilling_contraction(tmp_path):
+    tn = TensorNetwork(
+        [
+            StabilizerCodeTensorEnumerator(Legos.encoding_tensor_512, tensor_id=i)
+            for i in range(4)
+        ]
+    )
+    # (0, 1) is cold while (2, 3) is merged
+    tn.self_trace(0, 1, [0], [0])
+    tn.self_trace(2, 3, [0], [0])
+    tn.self_trace(1, 2, [1], [1])
+    profiler = ContractionProfiler()
+
+    tn.stabilizer_enumerator_polynomial(
+        cotengra=False, memory_limit=1, spill_dir=str(tmp_path), visitors=[profiler]
+    )
+
+    # the merged tensors are measured before they are spilled, and not read back
+    assert [merge.terms_out is None for merge in profiler.merges] == [False] * 3
+    assert profiler.merges[-1].terms1 is None
+    assert profiler.merges[-1].keys1 == profiler.merges[0].keys_out
+
+
+def test_chrome_trace(tmp_path):
+    profiler = ContractionProfiler()
+    RotatedSurfaceCodeTN(d=3).stabilizer_enumerator_polynomial(
+        cotengra=False, visitors=[profiler]
+    )
+
+    profiler.save_chrome_trace(str(tmp_path / "trace.json"))
+
+    with open(tmp_path / "trace.json", encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    assert [event["cat"] for event in events] == ["leaf"] * 9 + ["merge"] * 8
+    assert min(event["ts"] for event in events) == 0
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    # merges are sequential
+    merges = events[9:]
+    for prev, event in zip(merges, merges[1:]):
+        assert event["ts"] >= prev["ts"] + prev["dur"]
+    assert merges[-1]["args"]["keys_out"] == 1
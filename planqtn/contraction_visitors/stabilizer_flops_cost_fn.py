@@ -15,16 +15,59 @@ from planqtn.stabilizer_tensor_enumerator import (
 Trace = Tuple[TensorId, TensorId, List[TensorLeg], List[TensorLeg]]
 
 
+def pairs_and_matches(
+    pte1: StabilizerCodeTensorEnumerator,
+    pte2: StabilizerCodeTensorEnumerator,
+    join_legs1: List[TensorLeg],
+    join_legs2: List[TensorLeg],
+    tensor_with: bool = False,
+) -> Tuple[int, float]:
+    """Predicts the work of merging the tensor enumerators of two nodes.
+
+    Args:
+        pte1: The first node.
+        pte2: The second node.
+        join_legs1: The legs of the first node that are traced.
+        join_legs2: The legs of the second node that are traced.
+        tensor_with: Whether the merge is a tensor product.
+
+    Returns:
+        The number of pairs of keys of the two tensor enumerators and the expected number of pairs
+        that match on the join legs.
+    """
+    pairs = 2 ** (pte1.rank() + pte2.rank())
+    if (
+        not join_legs1 and not join_legs2
+    ) or tensor_with:  # If no legs to join, just tensor product so go over all keys
+        return pairs, float(pairs)
+    return pairs, pairs * count_matching_stabilizers_ratio_all_pairs(
+        pte1, pte2, join_legs1, join_legs2
+    )
+
+
 # pylint: disable=too-few-public-methods
 class StabilizerCodeFlopsCostVisitor(
     ContractionVisitor[StabilizerCodeTensorEnumerator]
 ):
     """A contraction visitor that calculates the cost of contracting a stabilizer code
-    tensor network from the parity check matrices of the nodes."""
+    tensor network from the parity check matrices of the nodes.
+
+    By default the cost is the number of matching pairs of keys, the work of multiplying their
+    polynomials. Weights, e.g. from a calibration against real runs, can also charge for the
+    comparison of every pair of keys.
+    """
+
+    def __init__(self, pair_cost: float = 0.0, match_cost: float = 1.0) -> None:
+        """Creates the visitor.
 
-    def __init__(self) -> None:
+        Args:
+            pair_cost: The cost of comparing a pair of keys of the merged tensors.
+            match_cost: The cost of merging a pair of keys that match on the join legs.
+        """
         super().__init__()
-        self.total_cost = 0
+        self.total_cost = 0.0
+        self.pair_cost = pair_cost
+        self.match_cost = match_cost
 
     def on_merge(
         self,
@@ -35,16 +78,7 @@ class StabilizerCodeFlopsCostVisitor(
         new_pte: StabilizerCodeTensorEnumerator,
         tensor_with: bool = False,
     ) -> None:
-        prev_submatrix1 = pte1.rank()
-        prev_submatrix2 = pte2.rank()
-
-        if (
-            not join_legs1 and not join_legs2
-        ) or tensor_with:  # If no legs to join, just tensor product so go over all keys
-            matches = 1.0
-        else:
-            matches = count_matching_stabilizers_ratio_all_pairs(
-                pte1, pte2, join_legs1, join_legs2
-            )
-
-        self.total_cost += (2 ** (prev_submatrix1 + prev_submatrix2)) * matches
+        pairs, matches = pairs_and_matches(
+            pte1, pte2, join_legs1, join_legs2, tensor_with
+        )
+        self.total_cost += self.pair_cost * pairs + self.match_cost * matches
@@ -0,0 +1,305 @@
+"""Pre-flight estimates of the cost of weight enumerator calculations.
+
+The estimates are computed by conjoining the parity check matrices of the nodes along the
+contraction tree, which is polynomial in the size of the network, while the weight enumerator
+calculation itself is exponential. See
+[`TensorNetwork.estimate_contraction_cost`][planqtn.TensorNetwork.estimate_contraction_cost].
+
+How well the predicted work of the merges matches their real time can be measured, and the flops
+cost corrected, with
+[`TensorNetwork.calibrate_contraction_cost`][planqtn.TensorNetwork.calibrate_contraction_cost].
+"""
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from planqtn.contraction_visitors.contraction_visitor import ContractionVisitor
+from planqtn.contraction_visitors.stabilizer_flops_cost_fn import (
+    StabilizerCodeFlopsCostVisitor,
+    pairs_and_matches,
+)
+from planqtn.stabilizer_tensor_enumerator import (
+    StabilizerCodeTensorEnumerator,
+    TensorId,
+    TensorLeg,
+)
+from planqtn.tensor import TensorEnumerator
+
+# Memory used by the entries of a tensor enumerator in CPython: a dict slot, the key tuple and a
+# UnivariatePoly with its own dict, measured with tracemalloc.
+BYTES_PER_TENSOR_ENTRY = 480
+BYTES_PER_TENSOR_KEY_LEG = 8
+BYTES_PER_COEFFICIENT = 48
+
+
+@dataclass
+class ContractionCostEstimate:
+    """Predicted cost of the weight enumerator calculation of a tensor network.
+
+    Attributes:
+        flops: The number of stabilizer pair operations, see `StabilizerCodeFlopsCostVisitor`.
+        upper_bound: The upper bound cost from the number of open legs, see
+            `UpperBoundCostVisitor`.
+        max_tensor_entries: The number of entries of the largest intermediate tensor enumerator,
+            see `MaxTensorSizeCostVisitor`.
+        peak_memory_bytes: The predicted peak memory of the tensor enumerators alive at the same
+            time during the contraction.
+    """
+
+    flops: float
+    upper_bound: float
+    max_tensor_entries: int
+    peak_memory_bytes: int
+
+
+def tensor_enumerator_bytes(
+    node: StabilizerCodeTensorEnumerator, truncate_length: Optional[int] = None
+) -> int:
+    """Predicts the memory of the tensor enumerator of a (conjoined) node.
+
+    The tensor is keyed by the Paulis on the open legs of the node, it has `2**node.rank()`
+    entries. Each entry is a polynomial with at most one coefficient per weight on the other legs.
+
+    Args:
+        node: The node, e.g. the conjoined node of a subnetwork.
+        truncate_length: The maximum weight kept in the polynomials.
+
+    Returns:
+        The predicted size of the tensor enumerator in bytes.
+    """
+    n = len(node.legs) - len(node.open_legs)
+    coefficients = n + 1 if truncate_length is None else min(n, truncate_length) + 1
+    return int(2 ** node.rank()) * (
+        BYTES_PER_TENSOR_ENTRY
+        + BYTES_PER_TENSOR_KEY_LEG * len(node.open_legs)
+        + BYTES_PER_COEFFICIENT * coefficients
+    )
+
+
+def tensor_bytes(tensor: TensorEnumerator) -> int:
+    """Approximates the memory of a tensor enumerator with the same model as the estimates.
+
+    Args:
+        tensor: The tensor enumerator.
+
+    Returns:
+        The approximate size of the tensor enumerator in bytes.
+    """
+    key_legs = len(next(iter(tensor))) if tensor else 0
+    return sum(
+        BYTES_PER_TENSOR_ENTRY
+        + BYTES_PER_TENSOR_KEY_LEG * key_legs
+        + BYTES_PER_COEFFICIENT * len(poly.dict)
+        for poly in tensor.values()
+    )
+
+
+# pylint: disable=too-few-public-methods
+class PeakMemoryVisitor(ContractionVisitor[StabilizerCodeTensorEnumerator]):
+    """A contraction visitor that predicts the peak memory of the tensor enumerators.
+
+    Both merged tensors and the result of a merge are alive while merging, next to all the tensors
+    that are not merged yet.
+    """
+
+    def __init__(
+        self,
+        leaves: List[StabilizerCodeTensorEnumerator],
+        truncate_length: Optional[int] = None,
+    ) -> None:
+        """Creates the visitor.
+
+        Args:
+            leaves: The nodes of the contraction, alive from its start.
+            truncate_length: The maximum weight kept in the polynomials.
+        """
+        super().__init__()
+        self.truncate_length = truncate_length
+        self.live_bytes = sum(
+            tensor_enumerator_bytes(leaf, truncate_length) for leaf in leaves
+        )
+        self.peak_bytes = self.live_bytes
+
+    def on_merge(
+        self,
+        pte1: StabilizerCodeTensorEnumerator,
+        pte2: StabilizerCodeTensorEnumerator,
+        join_legs1: List[TensorLeg],
+        join_legs2: List[TensorLeg],
+        new_pte: StabilizerCodeTensorEnumerator,
+        tensor_with: bool = False,
+    ) -> None:
+        """Accounts for the new tensor, then frees the two merged ones.
+
+        Args:
+            pte1: The first merged node.
+            pte2: The second merged node.
+            join_legs1: The legs of the first node that are traced.
+            join_legs2: The legs of the second node that are traced.
+            new_pte: The node created by the merge.
+            tensor_with: Whether the merge is a tensor product.
+        """
+        new_bytes = tensor_enumerator_bytes(new_pte, self.truncate_length)
+        self.peak_bytes = max(self.peak_bytes, self.live_bytes + new_bytes)
+        self.live_bytes += (
+            new_bytes
+            - tensor_enumerator_bytes(pte1, self.truncate_length)
+            - tensor_enumerator_bytes(pte2, self.truncate_length)
+        )
+
+
+@dataclass
+class MergeCalibration:
+    """The predicted and the measured cost of a merge of a weight enumerator calculation.
+
+    Attributes:
+        node_ids: The nodes of the merged tensor enumerator.
+        predicted_keys: The number of keys of the merged tensor enumerator predicted from the rank
+            of the conjoined parity check matrix, see `MaxTensorSizeCostVisitor`.
+        predicted_pairs: The predicted number of pairs of keys of the two merged tensor
+            enumerators.
+        predicted_matches: The predicted number of pairs that match on the join legs, the cost of
+            the merge for `StabilizerCodeFlopsCostVisitor`.
+        keys: The number of keys of the merged tensor enumerator.
+        pairs: The number of pairs of keys of the two merged tensor enumerators.
+        seconds: The time the merge took.
+    """
+
+    node_ids: FrozenSet[TensorId]
+    predicted_keys: int
+    predicted_pairs: int
+    predicted_matches: float
+    keys: int
+    pairs: int
+    seconds: float
+
+
+# pylint: disable=too-few-public-methods
+class MergePredictionVisitor(ContractionVisitor[StabilizerCodeTensorEnumerator]):
+    """A contraction visitor that records the predicted keys, pairs and matches of each merge."""
+
+    def __init__(self) -> None:
+        """Creates the visitor without any merges recorded."""
+        super().__init__()
+        self.predictions: Dict[FrozenSet[TensorId], Tuple[int, int, float]] = {}
+
+    def on_merge(
+        self,
+        pte1: StabilizerCodeTensorEnumerator,
+        pte2: StabilizerCodeTensorEnumerator,
+        join_legs1: List[TensorLeg],
+        join_legs2: List[TensorLeg],
+        new_pte: StabilizerCodeTensorEnumerator,
+        tensor_with: bool = False,
+    ) -> None:
+        """Records the prediction for the merge, by the nodes of the merged node.
+
+        Args:
+            pte1: The first merged node.
+            pte2: The second merged node.
+            join_legs1: The legs of the first node that are traced.
+            join_legs2: The legs of the second node that are traced.
+            new_pte: The node created by the merge.
+            tensor_with: Whether the merge is a tensor product.
+        """
+        pairs, matches = pairs_and_matches(
+            pte1, pte2, join_legs1, join_legs2, tensor_with
+        )
+        self.predictions[frozenset(new_pte.node_ids)] = (
+            int(2 ** new_pte.rank()),
+            pairs,
+            matches,
+        )
+
+
+@dataclass
+class CostCalibration:
+    """The flops cost model fitted to the measured time of merges.
+
+    Merging two tensor enumerators compares every pair of their keys, and multiplies the
+    polynomials of the pairs that match on the join legs. The time of a merge is modelled as
+    `seconds_per_pair * predicted_pairs + seconds_per_match * predicted_matches`, while the
+    uncalibrated flops cost only counts the matches.
+
+    Passed as `minimize` in `cotengra_opts`, cotengra looks for the contraction order with the
+    smallest predicted time.
+
+    Attributes:
+        merges: The merges the model was fitted to.
+        seconds_per_pair: The time of comparing a pair of keys.
+        seconds_per_match: The time of merging a pair of keys that match.
+    """
+
+    merges: List[MergeCalibration]
+    seconds_per_pair: float
+    seconds_per_match: float
+
+    @classmethod
+    def fit(cls, merges: List[MergeCalibration]) -> "CostCalibration":
+        """Fits the time per pair and per match to the measured times of the merges.
+
+        The merges can come from several calibration runs, e.g. to fit the model to a set of
+        typical workloads. The fit is a non-negative least squares fit, dominated by the slowest
+        merges.
+
+        Args:
+            merges: The predicted and measured costs of the merges.
+
+        Returns:
+            The fitted calibration.
+
+        Raises:
+            ValueError: If none of the merges took measurable time, or the time could not be
+                attributed to the pairs or the matches.
+        """
+        # pylint: disable=import-outside-toplevel
+        from scipy.optimize import nnls
+
+        features = np.array(
+            [[merge.predicted_pairs, merge.predicted_matches] for merge in merges],
+            dtype=float,
+        ).reshape(-1, 2)
+        seconds = np.array([merge.seconds for merge in merges], dtype=float)
+        if not seconds.any():
+            raise ValueError("None of the merges took measurable time to calibrate.")
+        (seconds_per_pair, seconds_per_match), _ = nnls(features, seconds)
+        if seconds_per_pair <= 0 and seconds_per_match <= 0:
+            raise ValueError(
+                "The measured time could not be attributed to the pairs or the matches of the "
+                "merges, calibrate on a larger network."
+            )
+        return cls(merges, float(seconds_per_pair), float(seconds_per_match))
+
+    def predicted_seconds(self, merge: MergeCalibration) -> float:
+        """Predicts the time of a merge with the fitted model.
+
+        Args:
+            merge: The merge.
+
+        Returns:
+            The predicted time in seconds.
+        """
+        return (
+            self.seconds_per_pair * merge.predicted_pairs
+            + self.seconds_per_match * merge.predicted_matches
+        )
+
+    def flops_cost_visitor(self) -> StabilizerCodeFlopsCostVisitor:
+        """Returns a flops cost visitor that sums the predicted time of the merges.
+
+        The costs are relative to the more expensive of the two operations, so that the total
+        cost stays at least 1, as the logarithm of it is the score of a contraction tree. Without
+        a positive cost, the uncalibrated visitor is returned.
+
+        Returns:
+            The visitor with the fitted costs per pair and per match.
+        """
+        unit = max(self.seconds_per_pair, self.seconds_per_match)
+        if not unit > 0:
+            return StabilizerCodeFlopsCostVisitor()
+        return StabilizerCodeFlopsCostVisitor(
+            pair_cost=self.seconds_per_pair / unit,
+            match_cost=self.seconds_per_match / unit,
+        )
@@ -0,0 +1,145 @@
+import tracemalloc
+
+import pytest
+
+from planqtn.cost_estimate import (
+    BYTES_PER_COEFFICIENT,
+    BYTES_PER_TENSOR_ENTRY,
+    BYTES_PER_TENSOR_KEY_LEG,
+    CostCalibration,
+    MergeCalibration,
+    tensor_enumerator_bytes,
+)
+from planqtn.legos import Legos
+from planqtn.networks.rotated_surface_code import RotatedSurfaceCodeTN
+from planqtn.stabilizer_tensor_enumerator import StabilizerCodeTensorEnumerator
+
+
+def test_tensor_enumerator_bytes():
+    node = StabilizerCodeTensorEnumerator(
+        Legos.encoding_tensor_512, tensor_id=0, open_legs=[(0, 0), (0, 1)]
+    )
+    assert node.rank() == 3
+    assert tensor_enumerator_bytes(node) == 2**3 * (
+        BYTES_PER_TENSOR_ENTRY
+        + 2 * BYTES_PER_TENSOR_KEY_LEG
+        + (5 - 2 + 1) * BYTES_PER_COEFFICIENT
+    )
+    assert tensor_enumerator_bytes(node, truncate_length=1) == 2**3 * (
+        BYTES_PER_TENSOR_ENTRY
+        + 2 * BYTES_PER_TENSOR_KEY_LEG
+        + 2 * BYTES_PER_COEFFICIENT
+    )
+
+
+def test_estimate_contraction_cost_flops_match_visitor():
+    estimate = RotatedSurfaceCodeTN(d=3).estimate_contraction_cost(cotengra=False)
+    # see test_custom_cost_stabilizer_codes
+    assert estimate.flops == 148.0
+    assert estimate.upper_bound > estimate.flops
+    assert estimate.max_tensor_entries == 32
+
+
+def test_estimate_contraction_cost_open_legs_grow_the_final_tensor():
+    tn = RotatedSurfaceCodeTN(d=3)
+    closed = tn.estimate_contraction_cost(cotengra=False)
+    opened = tn.estimate_contraction_cost(
+        open_legs=[((0, 0), 4), ((0, 1), 4)], cotengra=False
+    )
+    assert opened.max_tensor_entries >= closed.max_tensor_entries
+    assert opened.peak_memory_bytes > closed.peak_memory_bytes
+
+
+def test_estimated_peak_memory_close_to_measured_peak():
+    tn = RotatedSurfaceCodeTN(d=5)
+    estimate = tn.estimate_contraction_cost(cotengra=False)
+
+    tracemalloc.start()
+    try:
+        tn.stabilizer_enumerator_polynomial(cotengra=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak / 2 <= estimate.peak_memory_bytes <= 4 * peak
+
+
+def test_calibrate_contraction_cost():
+    tn = RotatedSurfaceCodeTN(d=5)
+
+    calibration = tn.calibrate_contraction_cost(cotengra=False)
+
+    assert len(calibration.merges) == len(tn.nodes) - 1
+    for merge in calibration.merges:
+        # without truncation the predictions are exact
+        assert merge.predicted_keys == merge.keys
+        assert merge.predicted_pairs == merge.pairs
+        assert merge.predicted_matches <= merge.predicted_pairs
+    assert calibration.seconds_per_pair >= 0
+    assert calibration.seconds_per_match >= 0
+    assert max(calibration.seconds_per_pair, calibration.seconds_per_match) > 0
+    visitor = calibration.flops_cost_visitor()
+    assert max(visitor.pair_cost, visitor.match_cost) == 1.0
+
+
+def test_calibration_fit():
+    merges = [
+        MergeCalibration(
+            node_ids=frozenset({i}),
+            predicted_keys=1,
+            predicted_pairs=pairs,
+            predicted_matches=matches,
+            keys=1,
+            pairs=pairs,
+            seconds=2.0 * pairs + 3.0 * matches,
+        )
+        for i, (pairs, matches) in enumerate([(4, 1), (16, 4), (64, 4)])
+    ]
+
+    calibration = CostCalibration.fit(merges)
+
+    assert calibration.seconds_per_pair == pytest.approx(2.0)
+    assert calibration.seconds_per_match == pytest.approx(3.0)
+    assert calibration.predicted_seconds(merges[2]) == pytest.approx(140.0)
+
+    for merge in merges:
+        merge.seconds = 0.0
+    with pytest.raises(ValueError, match="measurable time"):
+        CostCalibration.fit(merges)
+    with pytest.raises(ValueError, match="measurable time"):
+        CostCalibration.fit([])
+
+
+def test_calibration_fit_rejects_zero_costs():
+    # time that none of the predicted pairs or matches account for
+    merges = [
+        MergeCalibration(
+            node_ids=frozenset({0}),
+            predicted_keys=1,
+            predicted_pairs=0,
+            predicted_matches=0,
+            keys=1,
+            pairs=0,
+            seconds=1.0,
+        )
+    ]
+
+    with pytest.raises(ValueError, match="could not be attributed"):
+        CostCalibration.fit(merges)
+
+    visitor = CostCalibration(merges, 0.0, 0.0).flops_cost_visitor()
+
+    assert visitor.pair_cost == 0.0
+    assert visitor.match_cost == 1.0
+
+
+def test_calibrated_contraction_order():
+    calibration = RotatedSurfaceCodeTN(d=3).calibrate_contraction_cost(cotengra=False)
+
+    wep = RotatedSurfaceCodeTN(d=3).stabilizer_enumerator_polynomial(
+        cotengra_opts={"minimize": calibration, "max_repeats": 4}
+    )
+
+    assert wep == RotatedSurfaceCodeTN(d=3).stabilizer_enumerator_polynomial(
+        cotengra=False
+    )
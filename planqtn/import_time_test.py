@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+# slow to import and only needed by some of the functionality, see the imports
+# in planqtn.poly and planqtn.tensor_network, the import time itself is
+# measured in benchmarks/import_benchmark.py
+LAZY_MODULES = ["sympy", "cotengra", "pyzx", "matplotlib"]
+
+IMPORT_PLANQTN = f"""
+import sys
+
+import planqtn
+import planqtn.networks
+print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))
+"""
+
+
+def test_import_planqtn_does_not_load_lazy_dependencies():
+    # in a fresh interpreter, the test process has everything imported already
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_PLANQTN],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+    assert out == ""
@@ -1,6 +1,7 @@
 """A list of predefined lego types."""
 
 import enum
+import functools
 from typing import Optional
 
 import attrs
@@ -71,6 +72,24 @@ class LegoAnnotation:
     short_name: Optional[str] = None
 
 
+# the repetition codes of the most recently used distances are kept, the distances come from user
+# input, e.g. the check weights of a Tanner network, so the cache is bounded
+_REP_CODE_CACHE_SIZE = 64
+
+
+def _rep_code(d: int, z_type: bool) -> GF2:
+    # the d - 1 neighbouring pairs on one half of the columns, the all ones row on the other half,
+    # which is the single empty row for d=0, e.g. for an all zero check of a Tanner network
+    pairs = d if z_type else 0
+    h = np.zeros((max(d, 1), 2 * d), dtype=np.uint8)
+    rows = np.arange(d - 1)
+    h[rows, pairs + rows] = 1
+    h[rows, pairs + rows + 1] = 1
+    h[d - 1, np.arange(d) + d - pairs] = 1
+    h.flags.writeable = False
+    return h.view(GF2)
+
+
 class Legos:
     """Collection of predefined quantum error correction tensor "legos".
 
@@ -142,6 +161,7 @@ class Legos:
     # fmt: on
 
     @staticmethod
+    @functools.lru_cache(maxsize=_REP_CODE_CACHE_SIZE)
     def z_rep_code(d: int = 3) -> GF2:
         """Generate a Z-type repetition code parity check matrix.
 
@@ -149,23 +169,19 @@ class Legos:
         Z-type stabilizers. The code has distance d and encodes 1 logical qubit
         in d physical qubits. It is also the Z-spider in the ZX-calculus.
 
+        The matrix is cached per distance (for the most recently used distances) and shared between
+        the callers, so it is read-only.
+
         Args:
             d: Distance of the repetition code (default: 3).
 
         Returns:
             GF2: Parity check matrix for the Z-repetition code.
         """
-        gens = []
-        for i in range(d - 1):
-            g = GF2.Zeros(2 * d)
-            g[[d + i, d + i + 1]] = 1
-            gens.append(g)
-        g = GF2.Zeros(2 * d)
-        g[np.arange(d)] = 1
-        gens.append(g)
-        return GF2(gens)
+        return _rep_code(d, z_type=True)
 
     @staticmethod
+    @functools.lru_cache(maxsize=_REP_CODE_CACHE_SIZE)
     def x_rep_code(d: int = 3) -> GF2:
         """Generate an X-type repetition code parity check matrix.
 
@@ -173,21 +189,16 @@ class Legos:
         X-type stabilizers. The code has distance d and encodes 1 logical qubit
         in d physical qubits. It is also the X-spider in the ZX-calculus.
 
+        The matrix is cached per distance (for the most recently used distances) and shared between
+        the callers, so it is read-only.
+
         Args:
             d: Distance of the repetition code (default: 3).
 
         Returns:
             GF2: Parity check matrix for the X-repetition code.
         """
-        gens = []
-        for i in range(d - 1):
-            g = GF2.Zeros(2 * d)
-            g[[i, i + 1]] = 1
-            gens.append(g)
-        g = GF2.Zeros(2 * d)
-        g[np.arange(d, 2 * d)] = 1
-        gens.append(g)
-        return GF2(gens)
+        return _rep_code(d, z_type=False)
 
     identity = GF2(
         [
@@ -1,3 +1,6 @@
+from galois import GF2
+import pytest
+
 from planqtn.legos import Legos
 from planqtn.tensor_network import StabilizerCodeTensorEnumerator
 
@@ -36,3 +39,24 @@ def test_x_spider_h_is_z_spider():
         z_spider.stabilizer_enumerator_polynomial()
         == x_spider.stabilizer_enumerator_polynomial()
     )
+
+
+def test_rep_codes_are_cached_and_read_only():
+    assert Legos.x_rep_code(4) is Legos.x_rep_code(4)
+    assert Legos.z_rep_code(4) is not Legos.x_rep_code(4)
+    assert (
+        Legos.z_rep_code(3)
+        == GF2([[0, 0, 0, 1, 1, 0], [0, 0, 0, 0, 1, 1], [1, 1, 1, 0, 0, 0]])
+    ).all()
+    assert (
+        Legos.x_rep_code(3)
+        == GF2([[1, 1, 0, 0, 0, 0], [0, 1, 1, 0, 0, 0], [0, 0, 0, 1, 1, 1]])
+    ).all()
+    with pytest.raises(ValueError, match="read-only"):
+        Legos.x_rep_code(4)[0, 0] = 0
+    # the single empty row, e.g. for an all zero check of a Tanner network
+    assert Legos.x_rep_code(0).shape == (1, 0)
+    assert Legos.z_rep_code(0).shape == (1, 0)
+    # the distances come from user input
+    assert Legos.x_rep_code.cache_info().maxsize is not None
+    assert Legos.z_rep_code.cache_info().maxsize is not None
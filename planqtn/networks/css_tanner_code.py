@@ -10,8 +10,9 @@ PRX Quantum 5 (3): 030313. https://doi.org/10.1103/PRXQuantum.5.030313.
 
 from typing import List, Tuple
 import numpy as np
-from planqtn.tensor_network import TensorNetwork, Trace, TensorId, TensorLeg
+from planqtn.tensor_network import TensorNetwork, Trace, TensorId, TensorLeg, _gc_paused
 from planqtn.legos import LegoAnnotation, Legos
+from planqtn.parity_check import ParityCheckMatrix, nonzero_entries
 from planqtn.tensor_network import (
     StabilizerCodeTensorEnumerator,
 )
@@ -26,13 +27,17 @@ class CssTannerCodeTN(TensorNetwork):
     according to the non-zero entries in the parity check matrices.
     """
 
+    @_gc_paused()
     def __init__(
         self,
-        hx: np.ndarray,
-        hz: np.ndarray,
+        hx: ParityCheckMatrix,
+        hz: ParityCheckMatrix,
     ):
         """Construct a CSS code tensor network from X and Z parity check matrices.
 
+        The matrices can be scipy sparse matrices, which are not made dense, so large LDPC codes
+        are built in time proportional to the number of nonzero entries.
+
         Args:
             hx: X-type parity check matrix.
             hz: Z-type parity check matrix.
@@ -40,16 +45,16 @@ class CssTannerCodeTN(TensorNetwork):
         self.n: int = hx.shape[1]
         self.r: int = hz.shape[0]  # rz, but not used
 
+        x_checks, x_qubits = nonzero_entries(hx)
+        z_checks, z_qubits = nonzero_entries(hz)
+        x_degrees = np.bincount(x_qubits, minlength=self.n).tolist()
+        z_degrees = np.bincount(z_qubits, minlength=self.n).tolist()
+
         q_tensors: List[StabilizerCodeTensorEnumerator] = []
         traces: List[Trace] = []
         self.q_to_leg_and_node: List[Tuple[TensorId, TensorLeg]] = []
 
         for q in range(self.n):
-            x_stabs = np.nonzero(hx[:, q])[0]
-            n_x_legs = len(x_stabs)
-            z_stabs = np.nonzero(hz[:, q])[0]
-            n_z_legs = len(z_stabs)
-
             h0 = StabilizerCodeTensorEnumerator(
                 Legos.h,
                 tensor_id=f"q{q}.h0",
@@ -62,13 +67,13 @@ class CssTannerCodeTN(TensorNetwork):
             )
 
             x = StabilizerCodeTensorEnumerator(
-                Legos.x_rep_code(2 + n_x_legs),
+                Legos.x_rep_code(2 + x_degrees[q]),
                 tensor_id=f"q{q}.x",
                 annotation=LegoAnnotation(type=LegoType.XREP, short_name=f"x{q}"),
             )
 
             z = StabilizerCodeTensorEnumerator(
-                Legos.x_rep_code(2 + n_z_legs),
+                Legos.x_rep_code(2 + z_degrees[q]),
                 tensor_id=f"q{q}.z",
                 annotation=LegoAnnotation(type=LegoType.XREP, short_name=f"z{q}"),
             )
@@ -122,61 +127,13 @@ class CssTannerCodeTN(TensorNetwork):
                 )
             )
 
-        q_legs = [2] * self.n
-        gx_tensors = []
-        for i, gx in enumerate(hx):
-            qs = np.nonzero(gx)[0].astype(int)
-            g_tensor = StabilizerCodeTensorEnumerator(
-                Legos.z_rep_code(len(qs)),
-                f"x{i}",
-                annotation=LegoAnnotation(
-                    type=LegoType.ZREP,
-                    short_name=f"x{i}",
-                ),
-            )
-            # print(f"=== x tensor {g_tensor.idx} -> {qs} === ")
-
-            gx_tensors.append(g_tensor)
-            for g_leg, q in enumerate(qs):
-                x_tensor_id = f"q{q}.x"
-                traces.append(
-                    (
-                        g_tensor.tensor_id,
-                        x_tensor_id,
-                        [(g_tensor.tensor_id, g_leg)],
-                        [(x_tensor_id, q_legs[q])],
-                    )
-                )
-                q_legs[q] += 1
-        gz_tensors = []
-        q_legs = [2] * self.n
-
-        for i, gz in enumerate(hz):
-            qs = np.nonzero(gz)[0].astype(int)
-            g_tensor = StabilizerCodeTensorEnumerator(
-                Legos.z_rep_code(len(qs)),
-                f"z{i}",
-                annotation=LegoAnnotation(
-                    type=LegoType.ZREP,
-                    short_name=f"z{i}",
-                ),
-            )
-            gz_tensors.append(g_tensor)
-            for g_leg, q in enumerate(qs):
-                z_tensor_id = f"q{q}.z"
-                traces.append(
-                    (
-                        g_tensor.tensor_id,
-                        z_tensor_id,
-                        [(g_tensor.tensor_id, g_leg)],
-                        [(z_tensor_id, q_legs[q])],
-                    )
-                )
-                q_legs[q] += 1
+        gx_tensors = _check_tensors(np.bincount(x_checks, minlength=hx.shape[0]), "x")
+        traces += _check_traces(x_checks, x_qubits, "x", "x")
+        gz_tensors = _check_tensors(np.bincount(z_checks, minlength=self.r), "z")
+        traces += _check_traces(z_checks, z_qubits, "z", "z")
         super().__init__(q_tensors + gx_tensors + gz_tensors)
 
-        for t in traces:
-            self.self_trace(*t)
+        self.add_traces(traces)
 
     def n_qubits(self) -> int:
         """Get the total number of qubits in the tensor network.
@@ -196,3 +153,54 @@ class CssTannerCodeTN(TensorNetwork):
             Tuple[TensorId, TensorLeg]: Node ID and leg that represent the qubit.
         """
         return f"q{q}.x", (f"q{q}.x", 1)
+
+
+def _check_tensors(
+    weights: np.ndarray, prefix: str
+) -> List[StabilizerCodeTensorEnumerator]:
+    return [
+        StabilizerCodeTensorEnumerator(
+            Legos.z_rep_code(weight),
+            f"{prefix}{i}",
+            annotation=LegoAnnotation(type=LegoType.ZREP, short_name=f"{prefix}{i}"),
+        )
+        for i, weight in enumerate(weights.tolist())
+    ]
+
+
+def _check_traces(
+    checks: np.ndarray, qubits: np.ndarray, prefix: str, qubit_node: str
+) -> List[Trace]:
+    """Traces between the check tensors and the qubit tensors from the nonzeros of a check matrix.
+
+    The legs of a check tensor are numbered along its row of the matrix, the legs of a qubit tensor
+    down its column from 2, the first two legs are the logical and physical ones.
+
+    Args:
+        checks: The row indices of the nonzero entries, ordered by row and then by column.
+        qubits: The column indices of the nonzero entries.
+        prefix: The prefix of the ids of the check tensors.
+        qubit_node: The name of the qubit tensors the checks connect to, e.g. `x` for `q0.x`.
+
+    Returns:
+        The traces, in the order of the nonzero entries.
+    """
+    row_starts = np.searchsorted(checks, checks)
+    check_legs = np.arange(len(checks)) - row_starts
+    by_qubit = np.argsort(qubits, kind="stable")
+    sorted_qubits = qubits[by_qubit]
+    qubit_legs = np.empty_like(check_legs)
+    qubit_legs[by_qubit] = (
+        2 + np.arange(len(qubits)) - np.searchsorted(sorted_qubits, sorted_qubits)
+    )
+    return [
+        (
+            f"{prefix}{i}",
+            f"q{q}.{qubit_node}",
+            [(f"{prefix}{i}", check_leg)],
+            [(f"q{q}.{qubit_node}", qubit_leg)],
+        )
+        for i, q, check_leg, qubit_leg in zip(
+            checks.tolist(), qubits.tolist(), check_legs.tolist(), qubit_legs.tolist()
+        )
+    ]
@@ -1,7 +1,10 @@
 from galois import GF2
+import numpy as np
+import scipy.sparse
 
 from planqtn.networks.compass_code import CompassCodeDualSurfaceCodeLayoutTN
 from planqtn.networks.css_tanner_code import CssTannerCodeTN
+from planqtn.poly import UnivariatePoly
 
 
 def test_tanner_graph_enumerator():
@@ -36,3 +39,58 @@ def test_tanner_graph_enumerator():
     expected_wep = tn.stabilizer_enumerator_polynomial(cotengra=False)
 
     assert wep == expected_wep
+
+
+def test_tanner_graph_legs_of_a_random_ldpc_code():
+    rng = np.random.default_rng(0)
+    hx = (rng.random((30, 100)) < 0.05).astype(int)
+    hz = (rng.random((30, 100)) < 0.05).astype(int)
+
+    tn = CssTannerCodeTN(hx, hz)
+
+    for h, prefix in [(hx, "x"), (hz, "z")]:
+        for i, row in enumerate(h):
+            assert tn.nodes[f"{prefix}{i}"].n == row.sum()
+        for q, column in enumerate(h.T):
+            node = tn.nodes[f"q{q}.{prefix}"]
+            assert node.n == 2 + column.sum()
+            # all legs but the physical leg of the X spider are traced
+            traced = len(node.legs) - (1 if prefix == "x" else 0)
+            assert len(node.open_legs) == traced
+        traces = {
+            (t[0], t[2][0][1]): (t[1], t[3][0][1])
+            for t in tn._traces
+            if t[0].startswith(prefix) and t[0][1:].isdigit()
+        }
+        for i, q in zip(*np.nonzero(h)):
+            check_leg = int(np.count_nonzero(h[i, :q]))
+            qubit_leg = 2 + int(np.count_nonzero(h[:i, q]))
+            assert traces[(f"{prefix}{i}", check_leg)] == (f"q{q}.{prefix}", qubit_leg)
+
+
+def test_sparse_parity_check_matrices():
+    rng = np.random.default_rng(1)
+    hx = (rng.random((30, 100)) < 0.05).astype(int)
+    hz = (rng.random((30, 100)) < 0.05).astype(int)
+
+    dense = CssTannerCodeTN(hx, hz)
+    sparse = CssTannerCodeTN(scipy.sparse.csr_array(hx), scipy.sparse.csc_array(hz))
+
+    assert sparse.n_qubits() == 100
+    assert list(sparse.nodes) == list(dense.nodes)
+    for node_id, node in sparse.nodes.items():
+        assert np.array_equal(node.h, dense.nodes[node_id].h)
+        assert node.legs == dense.nodes[node_id].legs
+    assert sparse._traces == dense._traces
+
+
+def test_all_zero_check_row():
+    # the all zero check is a check tensor without legs
+    hx = np.array([[1, 1, 1, 1], [0, 0, 0, 0]])
+    hz = np.array([[1, 1, 1, 1]])
+
+    tn = CssTannerCodeTN(hx, hz)
+
+    assert tn.stabilizer_enumerator_polynomial(cotengra=False) == UnivariatePoly(
+        {0: 1, 4: 3}
+    )
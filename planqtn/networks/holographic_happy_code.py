@@ -145,32 +145,31 @@ class HolographicHappyTN(TensorNetwork):
         return e
 
     def qubit_to_node_and_leg(self, q: int) -> Tuple[TensorId, TensorLeg]:
+        return self.qubit_table()[q]
+
+    def _build_qubit_table(self) -> List[Tuple[TensorId, TensorLeg]]:
         # Physical qubits are all open legs left on last layer
         open_legs_per_node = self._find_open_legs(self.connections, self.nodes)
-        qubit_count = 0
 
         sorted_nodes = sorted(
             (
-                (k, v)
-                for k, v in self.nodes.items()
+                k
+                for k in self.nodes
                 if isinstance(k, tuple)
                 and len(k) == 2
                 and isinstance(k[0], int)
                 and isinstance(k[1], int)
             ),
-            key=lambda item: item[0][1],
+            key=lambda k: k[1],
         )
 
-        for key, _ in sorted_nodes:
-            open_legs = list(open_legs_per_node[key])
-            if qubit_count + len(open_legs) >= q + 1:
-                # qubit is in current node
-                leg_idx = q - qubit_count
-                return key, (key, open_legs[leg_idx])
-            qubit_count += len(open_legs)
-
-        # this should be unreachable
-        assert False, "unreachable: qubit index out of range"
+        table: List[Tuple[TensorId, TensorLeg]] = [
+            (key, (key, leg))
+            for key in sorted_nodes
+            for leg in list(open_legs_per_node[key])
+        ]
+        assert len(table) >= self.n, "unreachable: qubit index out of range"
+        return table[: self.n]
 
     def n_qubits(self) -> int:
         return self.n
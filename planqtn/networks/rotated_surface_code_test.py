@@ -1,10 +1,12 @@
 from galois import GF2
 import numpy as np
+import pytest
 
 from planqtn.networks.rotated_surface_code import RotatedSurfaceCodeTN
+from planqtn.contraction_visitors.contraction_visitor import ContractionVisitor
 from planqtn.legos import Legos
 from planqtn.poly import UnivariatePoly
-from planqtn.tensor_network import StabilizerCodeTensorEnumerator
+from planqtn.tensor_network import Contraction, StabilizerCodeTensorEnumerator
 from planqtn.pauli import Pauli
 
 
@@ -298,3 +300,99 @@ def test_d3_rsc_z_coset_reset():
             6: 5,
         }
     )
+
+
+def test_d3_rsc_set_coset_flips_only_touched_nodes():
+    tn = RotatedSurfaceCodeTN(d=3)
+    tn.set_coset(((0, 4), (4, 8)))
+
+    flipped = {
+        node_idx: [(leg, tuple(int(b) for b in pauli)) for leg, pauli in legs]
+        for node_idx, node in tn.nodes.items()
+        if (legs := node.coset_flipped_legs)
+    }
+    assert flipped == {
+        (0, 0): [(((0, 0), 4), (1, 0))],
+        (1, 1): [(((1, 1), 4), (1, 1))],
+        (2, 2): [(((2, 2), 4), (0, 1))],
+    }
+
+    tn.set_coset(GF2.Zeros(18))
+    assert all(not node.coset_flipped_legs for node in tn.nodes.values())
+
+
+def test_d3_rsc_qubit_table_is_cached_until_nodes_change():
+    tn = RotatedSurfaceCodeTN(d=3)
+    table = tn.qubit_table()
+    assert list(table) == [tn.qubit_to_node_and_leg(q) for q in range(9)]
+
+    # replacing nodes with the same legs, e.g. setting a coset, keeps the table
+    tn.set_coset(((0,), (8,)))
+    assert tn.qubit_table() is table
+
+    tn.nodes[(0, 0)] = tn.nodes[(0, 0)].trace_with_stopper(Legos.stopper_i, ((0, 0), 4))
+    assert tn.qubit_table() is not table
+
+
+@pytest.mark.parametrize("cotengra", [False, True])
+def test_d3_rsc_coset_enumerators_match_set_coset(cotengra):
+    coset_errors = [
+        ((), ()),
+        ((), (1,)),
+        ((), (0, 5)),
+        ((0, 2), (1, 2)),
+        ((8,), ()),
+        ((4,), (4, 7)),
+    ]
+    tn = RotatedSurfaceCodeTN(d=3)
+    weps = tn.coset_enumerators(coset_errors, cotengra=cotengra)
+
+    for coset_error, wep in zip(coset_errors, weps):
+        expected_tn = RotatedSurfaceCodeTN(d=3, coset_error=coset_error)
+        expected_wep = expected_tn.stabilizer_enumerator_polynomial(cotengra=False)
+        assert (
+            wep == expected_wep
+        ), f"Not equal for {coset_error}: {wep} != {expected_wep}"
+
+    # the coset sweep should not change the coset of the network
+    assert all(not node.coset_flipped_legs for node in tn.nodes.values())
+    assert tn.stabilizer_enumerator_polynomial().dict == {
+        8: 129,
+        6: 100,
+        4: 22,
+        2: 4,
+        0: 1,
+    }
+
+
+class MergeCounter(ContractionVisitor):
+    def __init__(self):
+        self.merges = 0
+
+    def on_merge(self, pte1, pte2, join_legs1, join_legs2, new_pte, tensor_with=False):
+        self.merges += 1
+
+
+@pytest.mark.parametrize("cotengra", [False, True])
+def test_d5_rsc_coset_enumerators_reuse_clean_subtrees(cotengra):
+    # all on the qubit in the middle, so that the later cosets only redo its path to the root
+    coset_errors = [((12,), ()), ((), (12,)), ((12,), (12,))]
+    tn = RotatedSurfaceCodeTN(d=5)
+    counter = MergeCounter()
+
+    weps = tn.coset_enumerators(coset_errors, cotengra=cotengra, visitors=[counter])
+
+    num_merges = len(tn.nodes) - 1
+    assert counter.merges < len(coset_errors) * num_merges
+    if not cotengra:
+        contraction = Contraction(tn, lambda node: node)
+        contraction.contraction_tree(False)
+        dirty_node = tn.qubit_to_node_and_leg(12)[0]
+        dirty_merges = sum(
+            dirty_node in merged for merged, _, _ in contraction.subtrees()
+        )
+        assert counter.merges == num_merges + 2 * dirty_merges
+    for coset_error, wep in zip(coset_errors, weps):
+        assert wep == RotatedSurfaceCodeTN(
+            d=5, coset_error=coset_error
+        ).stabilizer_enumerator_polynomial(cotengra=False)
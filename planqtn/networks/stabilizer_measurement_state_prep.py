@@ -11,9 +11,10 @@ PRX Quantum 5 (3): 030313. https://doi.org/10.1103/PRXQuantum.5.030313.
 """
 
 from typing import List, Tuple
-import numpy as np
-from planqtn.tensor_network import TensorNetwork
+from planqtn.tensor_network import TensorNetwork, _gc_paused
 from planqtn.legos import LegoAnnotation, LegoType, Legos
+from planqtn.networks.stabilizer_tanner_code import _checks_by_qubit
+from planqtn.parity_check import ParityCheckMatrix
 from planqtn.tensor_network import (
     StabilizerCodeTensorEnumerator,
 )
@@ -31,9 +32,12 @@ class StabilizerMeasurementStatePrepTN(TensorNetwork):
     PRX Quantum 5 (3): 030313. https://doi.org/10.1103/PRXQuantum.5.030313.
     """
 
-    def __init__(self, parity_check_matrix: np.ndarray):
+    @_gc_paused()
+    def __init__(self, parity_check_matrix: ParityCheckMatrix):
         """Construct a stabilizer measurement state preparation tensor network.
 
+        The parity check matrix can be a scipy sparse matrix, which is not made dense.
+
         Args:
             parity_check_matrix: The parity check matrix of the stabilizer code.
 
@@ -48,14 +52,16 @@ class StabilizerMeasurementStatePrepTN(TensorNetwork):
 
         r = parity_check_matrix.shape[0]
         n = parity_check_matrix.shape[1] // 2
+        q_checks, q_x_checks, weights, has_y = _checks_by_qubit(parity_check_matrix)
+        if has_y:
+            raise NotImplementedError("Y stabilizer is not implemented yet...")
         traces = []
 
         self.q_to_leg_and_node: List[Tuple[TensorId, TensorLeg]] = []
 
         checks = []
         check_stoppers = []
-        for i in range(r):
-            weight = int(np.count_nonzero(parity_check_matrix[i]))
+        for i, weight in enumerate(weights):
             check = StabilizerCodeTensorEnumerator(
                 h=Legos.z_rep_code(weight + 2),
                 tensor_id=f"check{i}",
@@ -129,13 +135,8 @@ class StabilizerMeasurementStatePrepTN(TensorNetwork):
             )
             q_tensors.append(q_logical_id)
             physical_leg = (q_logical_id.tensor_id, (q_logical_id.tensor_id, 0))
-            for i in range(r):
-                op = tuple(parity_check_matrix[i, (q, q + n)])
-
-                if op == (0, 0):
-                    continue
-
-                if op == (1, 0):
+            for i, x_check_on_q in zip(q_checks[q], q_x_checks[q]):
+                if x_check_on_q:
                     x_check = StabilizerCodeTensorEnumerator(
                         h=Legos.x_rep_code(3),
                         tensor_id=f"q{q}.x{i}",
@@ -169,7 +170,7 @@ class StabilizerMeasurementStatePrepTN(TensorNetwork):
                     next_check_legs[i] += 1
                     physical_leg = (x_check.tensor_id, (x_check.tensor_id, 2))
 
-                elif op == (0, 1):
+                else:
                     z_check = StabilizerCodeTensorEnumerator(
                         h=Legos.z_rep_code(3),
                         tensor_id=f"q{q}.z{i}",
@@ -222,9 +223,6 @@ class StabilizerMeasurementStatePrepTN(TensorNetwork):
                     )
                     next_check_legs[i] += 1
                     physical_leg = (z_check.tensor_id, (z_check.tensor_id, 2))
-
-                else:
-                    raise NotImplementedError("Y stabilizer is not implemented yet...")
             self.q_to_leg_and_node.append(physical_leg)
 
         super().__init__(
@@ -233,8 +231,7 @@ class StabilizerMeasurementStatePrepTN(TensorNetwork):
             }
         )
 
-        for t in traces:
-            self.self_trace(*t)
+        self.add_traces(traces)
 
     def n_qubits(self) -> int:
         """Get the total number of qubits in the tensor network.
@@ -1,5 +1,6 @@
 from galois import GF2
 import numpy as np
+import scipy.sparse
 from planqtn.networks.stabilizer_measurement_state_prep import (
     StabilizerMeasurementStatePrepTN,
 )
@@ -22,3 +23,20 @@ def test_5_qubit_code():
 
     tn = StabilizerMeasurementStatePrepTN(h)
     assert np.array_equal(gauss(tn.conjoin_nodes().h), gauss(h))
+
+
+def test_sparse_parity_check_matrix():
+    h = GF2(
+        [
+            [1, 0, 0, 1, 0, 0, 1, 1, 0, 0],
+            [0, 1, 0, 0, 1, 0, 0, 1, 1, 0],
+            [1, 0, 1, 0, 0, 0, 0, 0, 1, 1],
+            [0, 1, 0, 1, 0, 1, 0, 0, 0, 1],
+        ]
+    )
+    dense = StabilizerMeasurementStatePrepTN(h)
+    tn = StabilizerMeasurementStatePrepTN(scipy.sparse.csr_array(h))
+
+    assert tn._traces == dense._traces
+    assert tn.q_to_leg_and_node == dense.q_to_leg_and_node
+    assert tn.stabilizer_enumerator_polynomial().dict == {0: 1, 4: 15}
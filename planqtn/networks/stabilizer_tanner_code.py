@@ -10,15 +10,28 @@ Cao, ChunJun, Michael J. Gullans, Brad Lackey, and Zitao Wang. 2024.
 PRX Quantum 5 (3): 030313. https://doi.org/10.1103/PRXQuantum.5.030313.
 """
 
-from typing import List, Tuple
+import functools
+from typing import Dict, List, Tuple
 import numpy as np
-from planqtn.tensor_network import TensorNetwork, TensorId, TensorLeg
+from planqtn.tensor_network import (
+    TensorNetwork,
+    TensorId,
+    TensorLeg,
+    Trace,
+    _gc_paused,
+)
 from planqtn.legos import Legos
+from planqtn.parity_check import ParityCheckMatrix, nonzero_entries
 from planqtn.tensor_network import (
     StabilizerCodeTensorEnumerator,
 )
 
 
+# the check and qubit tensors are shared between the networks built by a process, they are keyed
+# by the check weights and patterns of the input matrices, so the caches are bounded
+_TENSOR_CACHE_SIZE = 1024
+
+
 class StabilizerTannerCodeTN(TensorNetwork):
     """A tensor network representation of stabilizer codes using Tanner graph structure.
 
@@ -28,9 +41,13 @@ class StabilizerTannerCodeTN(TensorNetwork):
     to the non-zero entries in the parity check matrix.
     """
 
-    def __init__(self, h: np.ndarray):
+    @_gc_paused()
+    def __init__(self, h: ParityCheckMatrix):
         """Construct a stabilizer Tanner code tensor network.
 
+        The parity check matrix can be a scipy sparse matrix, which is not made dense, so large
+        LDPC codes are built in time proportional to the number of nonzero entries.
+
         Args:
             h: Parity check matrix in symplectic form (must have even number of columns).
 
@@ -43,87 +60,44 @@ class StabilizerTannerCodeTN(TensorNetwork):
 
         r = h.shape[0]
         n = h.shape[1] // 2
+        q_checks, q_x_checks, weights, has_y = _checks_by_qubit(h)
+        if has_y:
+            raise ValueError("Y stabilizer is not implemented yet...")
 
-        checks = []
-        for i in range(r):
-            weight = int(np.count_nonzero(h[i]))
-            check = StabilizerCodeTensorEnumerator(
-                h=Legos.z_rep_code(weight + 2), tensor_id=f"check{i}"
-            )
-            check = check.trace_with_stopper(Legos.stopper_x, (f"check{i}", 0))
-            check = check.trace_with_stopper(Legos.stopper_x, (f"check{i}", 1))
-            checks.append(check)
+        checks = [
+            _renamed(_check_tensor(weight), {"check": f"check{i}"})
+            for i, weight in enumerate(weights)
+        ]
 
-        traces = []
+        traces: List[Trace] = []
         next_check_legs = [2] * r
         q_tensors = []
         self.q_to_leg_and_node: List[Tuple[TensorId, TensorLeg]] = []
 
-        # for each qubit we create merged tensors across all checks
+        # for each qubit we create merged tensors across all checks, qubits with the same
+        # sequence of X and Z checks share the merged tensor up to the names of the legs
         for q in range(n):
-            q_tensor = StabilizerCodeTensorEnumerator(
-                h=Legos.stopper_i, tensor_id=f"q{q}"
-            )
-            physical_leg = (f"q{q}", 0)
-            for i in range(r):
-                op = tuple(h[i, (q, q + n)])
-                if op == (0, 0):
-                    continue
-
-                if op == (1, 0):
-                    q_tensor = q_tensor.merge_with(
-                        StabilizerCodeTensorEnumerator(
-                            h=Legos.x_rep_code(3), tensor_id=f"q{q}.c{i}"
-                        ),
-                        [physical_leg],
-                        [0],
-                    )
-                    traces.append(
-                        (
-                            q_tensor.tensor_id,
-                            checks[i].tensor_id,
-                            [(f"q{q}.c{i}", 1)],
-                            [next_check_legs[i]],
-                        )
-                    )
-                    next_check_legs[i] += 1
-                    physical_leg = (f"q{q}.c{i}", 2)
-
-                elif op == (0, 1):
-                    q_tensor = q_tensor.merge_with(
-                        StabilizerCodeTensorEnumerator(
-                            h=Legos.z_rep_code(3), tensor_id=f"q{q}.z{i}"
-                        ),
-                        [physical_leg],
-                        [0],
+            template, template_leg = _qubit_tensor(tuple(q_x_checks[q]))
+            node_names: Dict[TensorId, TensorId] = {"q": f"q{q}"}
+            for k, i in enumerate(q_checks[q]):
+                node_names[f"q.c{k}"] = f"q{q}.c{i}"
+                node_names[f"q.z{k}"] = f"q{q}.z{i}"
+                traces.append(
+                    (
+                        f"q{q}",
+                        f"check{i}",
+                        [(f"q{q}.c{i}", 1)],
+                        [(f"check{i}", next_check_legs[i])],
                     )
-                    q_tensor = q_tensor.merge_with(
-                        StabilizerCodeTensorEnumerator(
-                            h=Legos.h, tensor_id=f"q{q}.c{i}"
-                        ),
-                        [(f"q{q}.z{i}", 1)],
-                        [0],
-                    )
-                    traces.append(
-                        (
-                            q_tensor.tensor_id,
-                            checks[i].tensor_id,
-                            [(f"q{q}.c{i}", 1)],
-                            [next_check_legs[i]],
-                        )
-                    )
-                    next_check_legs[i] += 1
-                    physical_leg = (f"q{q}.z{i}", 2)
-
-                else:
-                    raise ValueError("Y stabilizer is not implemented yet...")
-            q_tensors.append(q_tensor)
+                )
+                next_check_legs[i] += 1
+            q_tensors.append(_renamed(template, node_names))
+            physical_leg = (node_names[template_leg[0]], template_leg[1])
             self.q_to_leg_and_node.append((physical_leg[0], physical_leg))
 
         super().__init__(nodes={n.tensor_id: n for n in q_tensors + checks})
 
-        for t in traces:
-            self.self_trace(*t)
+        self.add_traces(traces)
 
     def n_qubits(self) -> int:
         """Get the total number of qubits in the tensor network.
@@ -146,3 +120,124 @@ class StabilizerTannerCodeTN(TensorNetwork):
             Leg: leg that represent the qubit.
         """
         return self.q_to_leg_and_node[q]
+
+
+def _checks_by_qubit(
+    h: ParityCheckMatrix,
+) -> Tuple[List[List[int]], List[List[bool]], List[int], bool]:
+    """The checks on each qubit of a symplectic parity check matrix.
+
+    Args:
+        h: The parity check matrix, dense or sparse.
+
+    Returns:
+        The checks on each qubit in increasing order, whether each of them is an X check on the
+        qubit (otherwise it is a Z check), the weight of each check and whether any of the checks
+        is a Y on a qubit. The weights count the X and the Z of a Y separately.
+    """
+    n = h.shape[1] // 2
+    checks, cols = nonzero_entries(h)
+    weights = np.bincount(checks, minlength=h.shape[0]).tolist()
+    is_x = cols < n
+    qubits = np.where(is_x, cols, cols - n)
+    order = np.lexsort((checks, qubits))
+    checks, qubits, is_x = checks[order], qubits[order], is_x[order]
+    has_y = bool(np.any((checks[1:] == checks[:-1]) & (qubits[1:] == qubits[:-1])))
+    starts = np.searchsorted(qubits, np.arange(n + 1)).tolist()
+    checks_list = checks.tolist()
+    is_x_list = is_x.tolist()
+    return (
+        [checks_list[start:end] for start, end in zip(starts, starts[1:])],
+        [is_x_list[start:end] for start, end in zip(starts, starts[1:])],
+        weights,
+        has_y,
+    )
+
+
+def _renamed(
+    template: StabilizerCodeTensorEnumerator, names: Dict[TensorId, TensorId]
+) -> StabilizerCodeTensorEnumerator:
+    """A copy of a merged template tensor with its nodes renamed, sharing its matrix.
+
+    Args:
+        template: The template tensor.
+        names: The new names of the nodes of the template, nodes not in it keep their name.
+
+    Returns:
+        The renamed tensor.
+    """
+    return StabilizerCodeTensorEnumerator(
+        h=template.h,
+        tensor_id=names[template.tensor_id],
+        legs=[(names.get(node, node), leg) for node, leg in template.legs],
+        open_legs=tuple(
+            (names.get(node, node), leg) for node, leg in template.open_legs
+        ),
+        node_ids=[names.get(node, node) for node in template.node_ids],
+    )
+
+
+@functools.lru_cache(maxsize=_TENSOR_CACHE_SIZE)
+def _check_tensor(weight: int) -> StabilizerCodeTensorEnumerator:
+    """The tensor of a check of the given weight, named `check`.
+
+    Args:
+        weight: The number of qubits the check acts on.
+
+    Returns:
+        The check tensor, with its first two legs traced with X stoppers.
+    """
+    check = StabilizerCodeTensorEnumerator(
+        h=Legos.z_rep_code(weight + 2), tensor_id="check"
+    )
+    check = check.trace_with_stopper(Legos.stopper_x, ("check", 0))
+    check = check.trace_with_stopper(Legos.stopper_x, ("check", 1))
+    # shared by all the checks of this weight
+    check.h.flags.writeable = False
+    return check
+
+
+@functools.lru_cache(maxsize=_TENSOR_CACHE_SIZE)
+def _qubit_tensor(
+    x_checks: Tuple[bool, ...],
+) -> Tuple[StabilizerCodeTensorEnumerator, TensorLeg]:
+    """The merged tensor of a qubit and its physical leg, with the qubit named `q`.
+
+    The k-th check on the qubit is an X check if `x_checks[k]`, otherwise a Z check. Its tensors
+    are named `q.c{k}` (and `q.z{k}` for Z checks), the leg to the check is leg 1 of `q.c{k}`.
+
+    Args:
+        x_checks: Whether each check on the qubit is an X check, in the order of the checks.
+
+    Returns:
+        The merged tensor of the qubit and its physical leg.
+    """
+    q_tensor = StabilizerCodeTensorEnumerator(h=Legos.stopper_i, tensor_id="q")
+    physical_leg = ("q", 0)
+    for k, x_check in enumerate(x_checks):
+        if x_check:
+            q_tensor = q_tensor.merge_with(
+                StabilizerCodeTensorEnumerator(
+                    h=Legos.x_rep_code(3), tensor_id=f"q.c{k}"
+                ),
+                [physical_leg],
+                [0],
+            )
+            physical_leg = (f"q.c{k}", 2)
+        else:
+            q_tensor = q_tensor.merge_with(
+                StabilizerCodeTensorEnumerator(
+                    h=Legos.z_rep_code(3), tensor_id=f"q.z{k}"
+                ),
+                [physical_leg],
+                [0],
+            )
+            q_tensor = q_tensor.merge_with(
+                StabilizerCodeTensorEnumerator(h=Legos.h, tensor_id=f"q.c{k}"),
+                [(f"q.z{k}", 1)],
+                [0],
+            )
+            physical_leg = (f"q.z{k}", 2)
+    # shared by all the qubits with these checks
+    q_tensor.h.flags.writeable = False
+    return q_tensor, physical_leg
@@ -1,6 +1,12 @@
 from galois import GF2
+import pytest
 import numpy as np
-from planqtn.networks.stabilizer_tanner_code import StabilizerTannerCodeTN
+import scipy.sparse
+from planqtn.networks.stabilizer_tanner_code import (
+    StabilizerTannerCodeTN,
+    _check_tensor,
+    _qubit_tensor,
+)
 from planqtn.linalg import gauss
 
 
@@ -20,3 +26,47 @@ def test_5_qubit_code():
     tn = StabilizerTannerCodeTN(h)
 
     assert np.array_equal(gauss(tn.conjoin_nodes().h), gauss(h))
+
+
+def test_qubits_with_the_same_checks_share_their_tensor():
+    h = GF2(
+        [
+            [1, 1, 1, 1, 0, 0, 0, 0],
+            [0, 0, 0, 0, 1, 1, 1, 1],
+        ]
+    )
+    tn = StabilizerTannerCodeTN(h)
+
+    qubits = [tn.nodes[f"q{q}"] for q in range(4)]
+    assert all(q.h is qubits[0].h for q in qubits)
+    assert [q.tensor_id for q in qubits] == ["q0", "q1", "q2", "q3"]
+    assert qubits[1].legs[0] == ("q1.c0", 1)
+    assert tn.qubit_to_node_and_leg(2) == ("q2.z1", ("q2.z1", 2))
+    assert tn.stabilizer_enumerator_polynomial().dict == {0: 1, 4: 3}
+    assert np.array_equal(gauss(tn.conjoin_nodes().h), gauss(h))
+    # the templates are shared between builds, keyed by user input
+    assert _qubit_tensor.cache_info().maxsize is not None
+    assert _check_tensor.cache_info().maxsize is not None
+
+
+def test_y_stabilizers_are_not_supported():
+    with pytest.raises(ValueError, match="Y stabilizer"):
+        StabilizerTannerCodeTN(GF2([[1, 1, 1, 1]]))
+
+
+def test_sparse_parity_check_matrix():
+    h = GF2(
+        [
+            [1, 0, 0, 1, 0, 0, 1, 1, 0, 0],
+            [0, 1, 0, 0, 1, 0, 0, 1, 1, 0],
+            [1, 0, 1, 0, 0, 0, 0, 0, 1, 1],
+            [0, 1, 0, 1, 0, 1, 0, 0, 0, 1],
+        ]
+    )
+    dense = StabilizerTannerCodeTN(h)
+    tn = StabilizerTannerCodeTN(scipy.sparse.csr_array(h))
+
+    assert tn.n_qubits() == 5
+    assert tn._traces == dense._traces
+    assert tn.q_to_leg_and_node == dense.q_to_leg_and_node
+    assert tn.stabilizer_enumerator_polynomial().dict == {0: 1, 4: 15}
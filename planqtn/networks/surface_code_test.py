@@ -156,3 +156,4 @@ def test_d3_rotated_surface_code_qubits():
         ((4, 2), ((4, 2), 4)),
         ((4, 4), ((4, 4), 4)),
     ]
+    assert list(tn.qubit_table()) == qubits_and_legs
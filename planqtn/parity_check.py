@@ -1,14 +1,27 @@
 """Symplectic parity check matrix utilities."""
 
-from typing import List
+from typing import List, Tuple, Union
 
 from galois import GF2
 import numpy as np
 import scipy
+import scipy.sparse
 
 from planqtn.linalg import gauss
 
 
+# dense parity check matrices, or sparse ones for codes with thousands of qubits
+ParityCheckMatrix = Union[
+    np.ndarray,
+    scipy.sparse.csr_array,
+    scipy.sparse.csc_array,
+    scipy.sparse.coo_array,
+    scipy.sparse.csr_matrix,
+    scipy.sparse.csc_matrix,
+    scipy.sparse.coo_matrix,
+]
+
+
 def _normalize_emtpy_matrices_to_zero(h: GF2) -> GF2:
     if len(h) == 0 or h.shape == (0, 0) or h.shape == (1, 0):
         h = GF2([[0]])
@@ -197,3 +210,26 @@ def self_trace(h: GF2, leg1: int = 0, leg2: int = 1) -> GF2:
             kept_rows.remove(row_idx)
     mx = mx[np.array(kept_rows)]
     return mx
+
+
+def nonzero_entries(h: ParityCheckMatrix) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the nonzero entries of a dense or sparse parity check matrix.
+
+    Sparse matrices are not made dense, so the time and memory this takes scale with the number of
+    nonzero entries. Duplicate entries of a sparse matrix count once.
+
+    Args:
+        h: The parity check matrix, a numpy (or GF2) array or a scipy sparse matrix.
+
+    Returns:
+        The row indices and the column indices of the nonzero entries, ordered by row and then by
+        column.
+    """
+    if isinstance(h, np.ndarray):
+        rows, cols = np.nonzero(h)
+        return rows, cols
+    csr = h.tocsr(copy=True)
+    csr.sum_duplicates()
+    csr.eliminate_zeros()
+    rows = np.repeat(np.arange(csr.shape[0]), np.diff(csr.indptr))
+    return rows, csr.indices.astype(np.intp)
@@ -1,6 +1,7 @@
 from galois import GF2
 import numpy as np
-from planqtn.parity_check import conjoin, self_trace, tensor_product
+import scipy.sparse
+from planqtn.parity_check import conjoin, nonzero_entries, self_trace, tensor_product
 from planqtn.symplectic import sprint
 from planqtn.tensor_network import StabilizerCodeTensorEnumerator
 
@@ -388,3 +389,24 @@ def test_self_trace_edge_case_with_repeated_pivot_row_removal():
         ),
         res,
     )
+
+
+def test_nonzero_entries_of_dense_and_sparse_matrices():
+    h = GF2(
+        [
+            [0, 1, 1, 0],
+            [0, 0, 0, 0],
+            [1, 0, 0, 1],
+        ]
+    )
+    # unsorted, with a duplicate and an explicit zero
+    coo = scipy.sparse.coo_array(
+        ([1, 1, 1, 1, 1, 0], ([2, 0, 0, 2, 0, 1], [3, 2, 1, 0, 2, 1])), shape=(3, 4)
+    )
+
+    for matrix in [h, np.array(h), scipy.sparse.csr_array(h), coo]:
+        rows, cols = nonzero_entries(matrix)
+        assert rows.tolist() == [0, 0, 2, 2]
+        assert cols.tolist() == [1, 2, 0, 3]
+    # the matrix itself is left as it was
+    assert coo.nnz == 6
@@ -1,9 +1,9 @@
 """Minimal polynomial representations for the weight enumerator polynomials."""
 
-from typing import Dict, Tuple, Union, Any, Generator, Optional
+from typing import TYPE_CHECKING, Dict, Tuple, Union, Any, Generator, Optional
 
-from sympy import Poly, symbols
-import sympy
+if TYPE_CHECKING:
+    import sympy
 
 
 class UnivariatePoly:
@@ -188,7 +188,7 @@ class UnivariatePoly:
         """
         self.dict = {k: v for k, v in self.dict.items() if k <= n}
 
-    def to_sympy(self, variable: sympy.Symbol) -> Poly:
+    def to_sympy(self, variable: "sympy.Symbol") -> "sympy.Poly":
         """Convert this polynomial to a sympy Poly object.
 
         Args:
@@ -197,13 +197,16 @@ class UnivariatePoly:
         Returns:
             Poly: The sympy polynomial representation.
         """
-        res = Poly(0, variable)
+        # sympy takes a third of a second to import, so it is only loaded when used
+        import sympy  # pylint: disable=import-outside-toplevel
+
+        res = sympy.Poly(0, variable)
         for k, v in self.dict.items():
-            res += Poly(f"{v} * {variable}^{k}")
+            res += sympy.Poly(f"{v} * {variable}^{k}")
         return res
 
     @staticmethod
-    def from_sympy(poly: sympy.Poly) -> "UnivariatePoly":
+    def from_sympy(poly: "sympy.Poly") -> "UnivariatePoly":
         """Convert a sympy Poly to a UnivariatePoly.
 
         For bivariate polynomials, the keys are (i, j) representing w^i * z^j
@@ -242,10 +245,12 @@ class UnivariatePoly:
         Returns:
             UnivariatePoly: The MacWilliams dual weight enumerator polynomial.
         """
-        z = symbols("z")
+        import sympy  # pylint: disable=import-outside-toplevel
+
+        z = sympy.symbols("z")
         spoly = self.to_sympy(z)
 
-        sympy_substituted = Poly(
+        sympy_substituted = sympy.Poly(
             (
                 spoly.subs({z: (1 - z) / (1 + 3 * z)})
                 * (1 + 3 * z) ** n
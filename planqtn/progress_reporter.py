@@ -5,7 +5,8 @@ The main class is `ProgressReporter` which is an abstract base class for all pro
 The main methods are:
 
 - [iterate][planqtn.progress_reporter.ProgressReporter.iterate]: Iterates over an iterable and
-    reports progress on every item.
+    reports progress on every item, or on every `stride` items in hot loops, see
+    [report_stride][planqtn.progress_reporter.report_stride].
 - [enter_phase][planqtn.progress_reporter.ProgressReporter.enter_phase]: Starts a new phase.
 - [exit_phase][planqtn.progress_reporter.ProgressReporter.exit_phase]: Ends the current phase.
 
@@ -32,6 +33,19 @@ import attr
 from tqdm import tqdm
 
 
+def report_stride(total_size: int, max_updates: int = 1000) -> int:
+    """Stride for hot loops that keeps the number of progress updates bounded.
+
+    Args:
+        total_size: Total number of items in the loop.
+        max_updates: Maximum number of progress updates for the loop.
+
+    Returns:
+        The number of items between progress updates, at least 1.
+    """
+    return max(1, total_size // max_updates)
+
+
 @attr.s
 class IterationState:
     """State tracking information for a single iteration phase.
@@ -226,8 +240,18 @@ class ProgressReporter(abc.ABC):
         if self.sub_reporter is not None:
             self.sub_reporter.log_result(serializable_result)
 
+    def on_progress(self, num_items: int) -> None:
+        """Hook called with the number of newly processed items of the innermost iteration.
+
+        It is called every `stride` items and once more at the end of the iteration with the
+        remainder. The default implementation does nothing.
+
+        Args:
+            num_items: The number of items processed since the previous call.
+        """
+
     def iterate(
-        self, iterable: Iterable, desc: str, total_size: int
+        self, iterable: Iterable, desc: str, total_size: int, stride: int = 1
     ) -> Generator[Any, None, None]:
         """Start a new iteration phase with progress reporting.
 
@@ -235,25 +259,43 @@ class ProgressReporter(abc.ABC):
         progress and reporting it at regular intervals. The iteration state is
         maintained on a stack to support nested iterations.
 
+        In hot loops the per item bookkeeping is measurable, there `stride` can be set to only
+        count items and update the iteration states every `stride` items, see
+        [report_stride][planqtn.progress_reporter.report_stride]. The final report is the same
+        regardless of the stride.
+
         Args:
             iterable: The iterable to iterate over.
             desc: Description of the iteration phase.
             total_size: Total number of items to process.
+            stride: Number of items between progress updates.
 
         Yields:
             Items from the iterable.
+
+        Raises:
+            ValueError: If the stride is not positive.
         """
+        if stride < 1:
+            raise ValueError(f"Stride must be positive, got {stride}.")
         bottom_iterator_state = IterationState(
             desc, start_time=time.time(), total_size=total_size
         )
         self.iterator_stack.append(bottom_iterator_state)
 
         if self.sub_reporter is not None:
-            iterable = self.sub_reporter.iterate(iterable, desc, total_size)
+            iterable = self.sub_reporter.iterate(iterable, desc, total_size, stride)
         time_last_report = time.time()
+        num_items = 0
+        next_update = stride
         for item in iterable:
             yield item
-            bottom_iterator_state.update()
+            num_items += 1
+            if num_items < next_update:
+                continue
+            next_update += stride
+            self.on_progress(num_items - bottom_iterator_state.current_item)
+            bottom_iterator_state.update(num_items)
             if time.time() - time_last_report >= self.iteration_report_frequency:
                 time_last_report = time.time()
 
@@ -272,6 +314,9 @@ class ProgressReporter(abc.ABC):
             #     f"{type(self)}: iteration_state {bottom_iterator_state} iterated! {item}"
             # )
 
+        if num_items > bottom_iterator_state.current_item:
+            self.on_progress(num_items - bottom_iterator_state.current_item)
+            bottom_iterator_state.current_item = num_items
         bottom_iterator_state.end()
         self.log_result(
             {"iteration": bottom_iterator_state, "level": len(self.iterator_stack)}
@@ -338,19 +383,29 @@ class TqdmProgressReporter(ProgressReporter):
         super().__init__(sub_reporter)
         self.file = file
         self.mininterval = mininterval
+        self._bars: list[tqdm] = []
+
+    def on_progress(self, num_items: int) -> None:
+        """Advance the progress bar of the innermost iteration.
+
+        Args:
+            num_items: The number of items processed since the previous call.
+        """
+        self._bars[-1].update(num_items)
 
     def iterate(
-        self, iterable: Iterable, desc: str, total_size: int
+        self, iterable: Iterable, desc: str, total_size: int, stride: int = 1
     ) -> Generator[Any, None, None]:
         """Iterate with `tqdm` progress bar display.
 
-        Overrides the parent iterate method to wrap the iteration with a `tqdm`
-        progress bar that provides visual feedback in the terminal.
+        Overrides the parent iterate method to display a `tqdm` progress bar that provides visual
+        feedback in the terminal. The bar is advanced every `stride` items.
 
         Args:
             iterable: The iterable to iterate over.
             desc: Description for the progress bar.
             total_size: Total number of items to process.
+            stride: Number of items between progress updates.
 
         Yields:
             Items from the iterable.
@@ -358,7 +413,6 @@ class TqdmProgressReporter(ProgressReporter):
         t = tqdm(
             desc=desc,
             total=total_size,
-            iterable=super().iterate(iterable, desc, total_size),
             file=self.file,
             # leave=False,
             mininterval=(
@@ -367,8 +421,12 @@ class TqdmProgressReporter(ProgressReporter):
                 else 2 if total_size > 1e5 else 0.1
             ),
         )
-        yield from t
-        t.close()
+        self._bars.append(t)
+        try:
+            yield from super().iterate(iterable, desc, total_size, stride)
+        finally:
+            self._bars.pop()
+            t.close()
 
     def handle_result(self, result: Dict[str, Any]) -> None:
         """Handle progress result (no-op for `tqdm` reporter).
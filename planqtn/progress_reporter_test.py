@@ -4,6 +4,7 @@ from typing import Any, Dict
 from planqtn.progress_reporter import (
     ProgressReporter,
     TqdmProgressReporter,
+    report_stride,
 )
 
 
@@ -221,3 +222,36 @@ def test_tqdm_progress_reporter_as_sub_reporter():
     assert "#####" in tqdm_output
     assert "3/3" in tqdm_output
     assert "it/s" in tqdm_output
+
+
+def test_progress_reporter_stride():
+    pr = ConcatenatingProgressReporter()
+    res = [i for i in pr.iterate(range(10), "strided", 10, stride=4)]
+    assert res == list(range(10))
+
+    assert [h["iteration"]["current_item"] for h in pr.history] == [4, 8, 10]
+    assert pr.history[-1]["iteration"]["end_time"] is not None
+    assert pr.history[-1]["iteration"]["avg_time_per_item"] is not None
+    assert pr.iterator_stack == []
+
+
+def test_tqdm_progress_reporter_stride_as_sub_reporter():
+    output = StringIO()
+
+    pr = TqdmProgressReporter(file=output, mininterval=0)
+    pr2 = ConcatenatingProgressReporter(pr)
+    res = [i for i in pr2.iterate(range(7), "test desc", 7, stride=3)]
+    assert res == list(range(7))
+    assert [h["iteration"]["current_item"] for h in pr2.history] == [3, 6, 7]
+
+    tqdm_output = output.getvalue()
+    assert "3/7" in tqdm_output
+    assert "7/7" in tqdm_output
+    assert "100%" in tqdm_output
+
+
+def test_report_stride():
+    assert report_stride(0) == 1
+    assert report_stride(999) == 1
+    assert report_stride(2**20) == 1048
+    assert report_stride(100, max_updates=10) == 10
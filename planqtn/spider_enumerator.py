@@ -0,0 +1,184 @@
+"""Closed form tensor enumerators for spider legos.
+
+The repetition codes ([`Legos.z_rep_code`][planqtn.Legos.z_rep_code] and
+[`Legos.x_rep_code`][planqtn.Legos.x_rep_code]), the X and Z stoppers, the identity and the
+Hadamard tensor are all Z-spiders in the ZX-calculus sense, up to Hadamards on some of their legs.
+Their stabilizer groups are known, so their tensor enumerators can be written down directly
+instead of enumerating all `2^r` stabilizers of their parity check matrices.
+
+The main functions are:
+
+- `spider_hadamard_legs`: Recognizes a Z-spider up to Hadamards from its parity check matrix.
+- `spider_tensor_enumerator`: The closed form tensor enumerator of a recognized spider.
+"""
+
+from itertools import product
+from math import comb
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from galois import GF2
+
+from planqtn.legos import LegoAnnotation, LegoType
+from planqtn.linalg import rank
+from planqtn.poly import UnivariatePoly
+from planqtn.tensor import TensorEnumerator
+
+# the legs with Hadamards of each spider lego type, None means all legs
+_ANNOTATED_HADAMARD_LEGS: Dict[LegoType, Optional[Sequence[int]]] = {
+    LegoType.ZREP: (),
+    LegoType.STOPPER_X: (),
+    LegoType.ID: (),
+    LegoType.XREP: None,
+    LegoType.STOPPER_Z: None,
+    LegoType.H: (1,),
+}
+
+
+def _is_z_spider(x: np.ndarray, z: np.ndarray) -> bool:
+    """Check whether the rows of a symplectic matrix are Z-spider stabilizers.
+
+    The stabilizers of the Z-spider on n legs are X on all legs or on none of them, times a Z
+    operator of even weight.
+
+    Args:
+        x: The X part of the matrix.
+        z: The Z part of the matrix.
+
+    Returns:
+        True if all rows are Z-spider stabilizers.
+    """
+    x_constant = np.all(x == x[:, :1], axis=1)
+    z_even = np.sum(z, axis=1) % 2 == 0
+    return bool(np.all(x_constant & z_even))
+
+
+def spider_hadamard_legs(
+    h: GF2, annotation: Optional[LegoAnnotation] = None
+) -> Optional[np.ndarray]:
+    """Recognize a Z-spider up to Hadamards on some of its legs.
+
+    The annotation of the lego, when present, proposes the legs with Hadamards, otherwise the
+    Z-spider, the X-spider and for two legs the Hadamard tensor are tried. A candidate is only
+    accepted if it generates exactly the stabilizer group of `h`, as annotations can outlive the
+    matrix they were made for, e.g. after tracing with a stopper.
+
+    Args:
+        h: The parity check matrix of the lego.
+        annotation: The annotation of the lego.
+
+    Returns:
+        The boolean mask of the legs with Hadamards, or None if `h` is not a spider.
+    """
+    mx = np.atleast_2d(h.view(np.ndarray)).astype(np.uint8)
+    n = mx.shape[1] // 2
+    if n == 0 or mx.shape[0] < n:
+        return None
+
+    candidates: List[np.ndarray] = []
+    if annotation is not None and annotation.type in _ANNOTATED_HADAMARD_LEGS:
+        legs = _ANNOTATED_HADAMARD_LEGS[annotation.type]
+        mask = np.ones(n, dtype=bool) if legs is None else np.zeros(n, dtype=bool)
+        if legs is not None and all(leg < n for leg in legs):
+            mask[list(legs)] = True
+        candidates.append(mask)
+    candidates += [np.zeros(n, dtype=bool), np.ones(n, dtype=bool)]
+    if n == 2:
+        candidates.append(np.array([False, True]))
+
+    for mask in candidates:
+        x = np.where(mask, mx[:, n:], mx[:, :n])
+        z = np.where(mask, mx[:, :n], mx[:, n:])
+        if _is_z_spider(x, z):
+            return mask if rank(h if h.ndim == 2 else GF2([h])) == n else None
+    return None
+
+
+def _closed_legs_polys(
+    coset_x: np.ndarray, coset_z: np.ndarray, truncate_length: Optional[int]
+) -> List[List[UnivariatePoly]]:
+    """The weight enumerators of the closed legs of a Z-spider.
+
+    Args:
+        coset_x: The X part of the coset on the closed legs, without Hadamards.
+        coset_z: The Z part of the coset on the closed legs, without Hadamards.
+        truncate_length: Maximum weight to keep.
+
+    Returns:
+        The enumerator of the stabilizers restricted to the closed legs, indexed by whether they
+        have X on all legs and by the parity of their Z part.
+    """
+    polys: List[List[UnivariatePoly]] = []
+    for a in (0, 1):
+        # legs where the X part is flipped by the coset always have weight 1, the rest only
+        # have weight if their Z part is flipped by the coset
+        always = int(np.sum(coset_x != a))
+        free = len(coset_x) - always
+        free_parity = int(np.sum(coset_z[coset_x == a])) % 2
+        by_parity = [UnivariatePoly(), UnivariatePoly()]
+        for k in range(free + 1):
+            w = always + k
+            if truncate_length is not None and w > truncate_length:
+                break
+            if always > 0:
+                count = comb(free, k) * 2 ** (always - 1)
+                for parity in (0, 1):
+                    by_parity[parity].add_inplace(UnivariatePoly({w: count}))
+            else:
+                parity = (free_parity + k) % 2
+                by_parity[parity].add_inplace(UnivariatePoly({w: comb(free, k)}))
+        polys.append(by_parity)
+    return polys
+
+
+def spider_tensor_enumerator(
+    hadamard_legs: np.ndarray,
+    coset: GF2,
+    open_cols: Sequence[int],
+    truncate_length: Optional[int] = None,
+    verbose: bool = False,
+) -> Union[TensorEnumerator, UnivariatePoly]:
+    """Compute the tensor enumerator of a Z-spider up to Hadamards in closed form.
+
+    This gives the same result as brute force enumeration of the stabilizers, in time linear in
+    the number of legs plus the size of the resulting tensor.
+
+    Args:
+        hadamard_legs: The boolean mask of the legs with Hadamards, see `spider_hadamard_legs`.
+        coset: The coset on the legs, a GF2 vector with the X part first, then the Z part.
+        open_cols: The indices of the open legs, in the order of the tensor keys.
+        truncate_length: Maximum weight to keep.
+        verbose: Whether to print verbose output.
+
+    Returns:
+        The scalar weight enumerator if there are no open legs, otherwise the tensor enumerator.
+    """
+    n = len(hadamard_legs)
+    bits = coset.view(np.ndarray).astype(np.uint8)
+    coset_x = np.where(hadamard_legs, bits[n:], bits[:n])
+    coset_z = np.where(hadamard_legs, bits[:n], bits[n:])
+    closed = np.ones(n, dtype=bool)
+    closed[list(open_cols)] = False
+    polys = _closed_legs_polys(coset_x[closed], coset_z[closed], truncate_length)
+
+    if len(open_cols) == 0:
+        wep = UnivariatePoly()
+        for a in (0, 1):
+            wep.add_inplace(polys[a][0])
+        return wep.normalize(verbose=verbose)
+
+    tensor: TensorEnumerator = {}
+    open_hadamards = [bool(hadamard_legs[c]) for c in open_cols]
+    for a in (0, 1):
+        for z_open in product((0, 1), repeat=len(open_cols)):
+            # the Z part of the stabilizer has even weight over all legs
+            poly = polys[a][sum(z_open) % 2]
+            if len(poly.dict) == 0:
+                continue
+            tensor[
+                tuple(
+                    z + 2 * a if had else a + 2 * z
+                    for z, had in zip(z_open, open_hadamards)
+                )
+            ] = UnivariatePoly(poly)
+    return tensor
@@ -0,0 +1,86 @@
+from galois import GF2
+import numpy as np
+import pytest
+
+from planqtn.legos import LegoAnnotation, LegoType, Legos
+from planqtn.stabilizer_tensor_enumerator import StabilizerCodeTensorEnumerator
+from planqtn.spider_enumerator import spider_hadamard_legs
+
+
+@pytest.mark.parametrize(
+    "h,expected_hadamard_legs",
+    [
+        (Legos.z_rep_code(1), [False]),
+        (Legos.z_rep_code(4), [False] * 4),
+        (Legos.x_rep_code(3), [True] * 3),
+        (Legos.stopper_x, [False]),
+        (Legos.stopper_z, [True]),
+        (Legos.identity, [False, False]),
+        (Legos.h, [False, True]),
+        (Legos.stopper_i, None),
+        (Legos.stopper_y, None),
+        (Legos.encoding_tensor_512, None),
+        # a single Z check is not the full stabilizer group of the spider
+        (GF2([[0, 0, 1, 1]]), None),
+    ],
+)
+def test_spider_hadamard_legs(h, expected_hadamard_legs):
+    hadamard_legs = spider_hadamard_legs(h)
+    if expected_hadamard_legs is None:
+        assert hadamard_legs is None
+    else:
+        assert hadamard_legs.tolist() == expected_hadamard_legs
+
+
+def test_spider_hadamard_legs_checks_annotation_against_matrix():
+    te = StabilizerCodeTensorEnumerator(
+        Legos.z_rep_code(3), annotation=LegoAnnotation(type=LegoType.ZREP)
+    ).trace_with_stopper(Legos.stopper_z, 0)
+    assert te.annotation.type == LegoType.ZREP
+    assert spider_hadamard_legs(te.h, te.annotation) is None
+
+    # annotated as X-spider, but it is a Z-spider
+    assert (
+        spider_hadamard_legs(
+            Legos.z_rep_code(3), LegoAnnotation(type=LegoType.XREP)
+        ).tolist()
+        == [False] * 3
+    )
+
+
+@pytest.mark.parametrize(
+    "h",
+    [
+        Legos.z_rep_code(5),
+        Legos.x_rep_code(4),
+        Legos.identity,
+        Legos.h,
+        Legos.stopper_x,
+        Legos.stopper_z,
+    ],
+)
+@pytest.mark.parametrize("open_cols", [[], [0], [1, 0], [2, 0, 1]])
+@pytest.mark.parametrize("truncate_length", [None, 1, 2])
+def test_spider_tensor_enumerator_matches_brute_force(h, open_cols, truncate_length):
+    n = h.shape[1] // 2
+    open_cols = [c for c in open_cols if c < n]
+    rng = np.random.default_rng(n * 100 + len(open_cols))
+    for coset in [GF2.Zeros(2 * n), GF2(rng.integers(0, 2, 2 * n))]:
+        te = StabilizerCodeTensorEnumerator(h, tensor_id="s").with_coset_flipped_legs(
+            [
+                (("s", i), GF2([coset[i], coset[i + n]]))
+                for i in range(n)
+                if coset[i] or coset[i + n]
+            ]
+        )
+        open_legs = [("s", c) for c in open_cols]
+        expected = te._brute_force_stabilizer_enumerator_from_parity(
+            open_legs=open_legs, truncate_length=truncate_length
+        )
+        actual = te.stabilizer_enumerator_polynomial(
+            open_legs=open_legs, truncate_length=truncate_length
+        )
+        if open_cols:
+            assert dict(actual) == dict(expected)
+        else:
+            assert actual == expected
@@ -0,0 +1,250 @@
+"""Spilling tensor enumerators to local disk.
+
+Intermediate tensor enumerators of a contraction that don't fit in the memory budget are written
+to files and memory-mapped back when they are merged, see the `memory_limit` argument of
+[`stabilizer_enumerator_polynomial`][planqtn.TensorNetwork.stabilizer_enumerator_polynomial].
+
+A spill file is laid out as
+
+- the magic bytes `PQTNPTE1` and the length of the header as a little-endian uint64,
+- the JSON header with the tracable legs, node ids and the shapes of the blocks, padded to a
+  multiple of 8 bytes,
+- the keys block: one row of uint64 words per key, each word packing 32 Paulis in base 4 with the
+  first leg in the most significant digit. The rows are sorted, so the keys are in lexicographic
+  order,
+- the coefficients block: one row per key with a coefficient per weight, each coefficient split
+  into little-endian uint64 limbs.
+
+Both blocks are read with `np.memmap`, so a merge can go through a spilled tensor grouped by its
+join legs without reading all of it into memory, see `TensorEnumeratorFile.join_groups`.
+"""
+
+import json
+import os
+import struct
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from planqtn.poly import UnivariatePoly
+from planqtn.tensor import TensorEnumerator, TensorEnumeratorKey, TensorId, TensorLeg
+
+MAGIC = b"PQTNPTE1"
+PAULIS_PER_WORD = 32
+LIMB_BITS = 64
+# number of rows read at a time when iterating over a whole file
+CHUNK_ROWS = 4096
+
+# the Paulis on the join legs and the (kept key, polynomial) pairs sharing them
+JoinGroup = Tuple[TensorEnumeratorKey, List[Tuple[TensorEnumeratorKey, UnivariatePoly]]]
+
+
+def _to_tuples(value: Any) -> Any:
+    # JSON turns the tuples of tensor ids and legs into lists
+    if isinstance(value, list):
+        return tuple(_to_tuples(v) for v in value)
+    return value
+
+
+def _encode_keys(keys: np.ndarray) -> np.ndarray:
+    num_keys, num_legs = keys.shape
+    words = np.zeros((num_keys, -(-num_legs // PAULIS_PER_WORD)), dtype=np.uint64)
+    for leg in range(num_legs):
+        shift = np.uint64(2 * (PAULIS_PER_WORD - 1 - leg % PAULIS_PER_WORD))
+        words[:, leg // PAULIS_PER_WORD] |= keys[:, leg].astype(np.uint64) << shift
+    return words
+
+
+def _decode_legs(words: np.ndarray, legs: Sequence[int]) -> np.ndarray:
+    digits = np.zeros((words.shape[0], len(legs)), dtype=np.uint8)
+    for column, leg in enumerate(legs):
+        shift = np.uint64(2 * (PAULIS_PER_WORD - 1 - leg % PAULIS_PER_WORD))
+        digits[:, column] = (words[:, leg // PAULIS_PER_WORD] >> shift) & np.uint64(3)
+    return digits
+
+
+def write_tensor_enumerator(
+    path: str,
+    tensor: TensorEnumerator,
+    tracable_legs: Sequence[TensorLeg],
+    node_ids: Sequence[TensorId],
+    truncate_length: Optional[int] = None,
+) -> None:
+    """Writes a tensor enumerator to a spill file.
+
+    Args:
+        path: The path of the spill file.
+        tensor: The tensor enumerator, keyed by the Paulis on `tracable_legs`.
+        tracable_legs: The legs of the keys of the tensor enumerator.
+        node_ids: The ids of the nodes contracted into the tensor enumerator.
+        truncate_length: The truncation length the tensor enumerator was calculated with.
+
+    Raises:
+        ValueError: If a coefficient is negative, stabilizer counts never are.
+    """
+    num_legs = len(tracable_legs)
+    keys = np.array(list(tensor.keys()), dtype=np.uint8).reshape(len(tensor), num_legs)
+    words = _encode_keys(keys)
+    order = np.lexsort(words.T[::-1]) if num_legs > 0 else np.arange(len(tensor))
+    polys = list(tensor.values())
+
+    coefficients = [c for poly in polys for c in poly.dict.values()]
+    if any(c < 0 for c in coefficients):
+        raise ValueError("Can't spill a tensor enumerator with negative coefficients.")
+    max_bits = max((int(c).bit_length() for c in coefficients), default=0)
+    num_limbs = max(1, -(-max_bits // LIMB_BITS))
+    num_weights = max((max(poly.dict, default=0) for poly in polys), default=0) + 1
+
+    limbs = np.zeros((len(tensor), num_weights, num_limbs), dtype=np.uint64)
+    for row, index in enumerate(order.tolist()):
+        for weight, coefficient in polys[index].dict.items():
+            c = int(coefficient)
+            for limb in range(num_limbs):
+                limbs[row, weight, limb] = c & (2**LIMB_BITS - 1)
+                c >>= LIMB_BITS
+
+    header = json.dumps(
+        {
+            "tracable_legs": list(tracable_legs),
+            "node_ids": list(node_ids),
+            "truncate_length": truncate_length,
+            "num_keys": len(tensor),
+            "num_legs": num_legs,
+            "num_words": words.shape[1],
+            "num_weights": num_weights,
+            "num_limbs": num_limbs,
+        }
+    ).encode()
+    header += b" " * (-len(header) % 8)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(np.ascontiguousarray(words[order]).tobytes())
+        f.write(limbs.tobytes())
+
+
+class TensorEnumeratorFile:
+    """A tensor enumerator in a spill file, memory-mapped instead of read into memory.
+
+    Attributes:
+        path: The path of the spill file.
+        tracable_legs: The legs of the keys of the tensor enumerator.
+        node_ids: The ids of the nodes contracted into the tensor enumerator.
+        truncate_length: The truncation length the tensor enumerator was calculated with.
+        keys: The `(num_keys, num_words)` block of the sorted, base 4 encoded keys.
+        coefficients: The `(num_keys, num_weights, num_limbs)` block of the coefficients.
+    """
+
+    def __init__(self, path: str):
+        """Opens a spill file written by `write_tensor_enumerator`.
+
+        Args:
+            path: The path of the spill file.
+
+        Raises:
+            ValueError: If the file is not a spill file.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a tensor enumerator spill file.")
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length))
+        self.tracable_legs: Tuple[TensorLeg, ...] = _to_tuples(header["tracable_legs"])
+        self.node_ids: List[TensorId] = list(_to_tuples(header["node_ids"]))
+        self.truncate_length: Optional[int] = header["truncate_length"]
+
+        offset = len(MAGIC) + 8 + header_length
+        num_keys = header["num_keys"]
+        self.keys = self._memmap(offset, (num_keys, header["num_words"]))
+        self.coefficients = self._memmap(
+            offset + self.keys.nbytes,
+            (num_keys, header["num_weights"], header["num_limbs"]),
+        )
+
+    def _memmap(self, offset: int, shape: Tuple[int, ...]) -> np.ndarray:
+        if 0 in shape:
+            # empty blocks can't be memory-mapped
+            return np.zeros(shape, dtype=np.uint64)
+        return np.memmap(
+            self.path, dtype=np.uint64, mode="r", offset=offset, shape=shape
+        )
+
+    def __len__(self) -> int:
+        return int(self.keys.shape[0])
+
+    def _entries(
+        self, rows: np.ndarray, legs: Sequence[int]
+    ) -> List[Tuple[TensorEnumeratorKey, UnivariatePoly]]:
+        keys = _decode_legs(self.keys[rows], legs).tolist()
+        limbs = self.coefficients[rows]
+        if limbs.shape[2] == 1:
+            coefficients = limbs[:, :, 0].tolist()
+        else:
+            coefficients = [
+                [
+                    sum(int(limb) << (LIMB_BITS * i) for i, limb in enumerate(c))
+                    for c in row
+                ]
+                for row in limbs
+            ]
+        return [
+            (tuple(key), UnivariatePoly({w: c for w, c in enumerate(row) if c != 0}))
+            for key, row in zip(keys, coefficients)
+        ]
+
+    def items(self) -> Iterator[Tuple[TensorEnumeratorKey, UnivariatePoly]]:
+        """Iterates over the entries of the tensor enumerator in key order.
+
+        Yields:
+            The (key, polynomial) pairs.
+        """
+        all_legs = range(len(self.tracable_legs))
+        for start in range(0, len(self), CHUNK_ROWS):
+            rows = np.arange(start, min(start + CHUNK_ROWS, len(self)))
+            yield from self._entries(rows, all_legs)
+
+    def tensor(self) -> TensorEnumerator:
+        """Reads the whole tensor enumerator into memory.
+
+        Returns:
+            The tensor enumerator.
+        """
+        return dict(self.items())
+
+    def join_groups(
+        self, join_indices: Sequence[int], kept_indices: Sequence[int]
+    ) -> Iterator[JoinGroup]:
+        """Iterates over the entries grouped by their Paulis on the join legs.
+
+        The groups come in the lexicographic order of the Paulis on the join legs and only one
+        group is read into memory at a time. If the join legs are the first legs of the keys, the
+        rows are in this order already, otherwise they are sorted by the join legs first.
+
+        Args:
+            join_indices: The indices of the join legs in the keys.
+            kept_indices: The indices of the legs kept in the keys of the groups.
+
+        Yields:
+            The Paulis on the join legs and the (kept key, polynomial) pairs of the group.
+        """
+        join_digits = _decode_legs(self.keys, join_indices)
+        if list(join_indices) == list(range(len(join_indices))):
+            order = np.arange(len(self))
+        else:
+            order = np.lexsort(join_digits.T[::-1])
+            join_digits = join_digits[order]
+        boundaries = np.flatnonzero(np.any(join_digits[1:] != join_digits[:-1], axis=1))
+        starts = [0] + (boundaries + 1).tolist()
+        ends = starts[1:] + [len(order)]
+        for start, end in zip(starts, ends):
+            if start < end:
+                yield tuple(join_digits[start].tolist()), self._entries(
+                    order[start:end], kept_indices
+                )
+
+    def remove(self) -> None:
+        """Removes the spill file."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from planqtn.poly import UnivariatePoly
+from planqtn.spill import TensorEnumeratorFile, write_tensor_enumerator
+
+TRACABLE_LEGS = ((("a", 1, 2), 0), (3, 1), (3, 2))
+
+
+def test_spill_file_round_trip(tmp_path):
+    tensor = {
+        (0, 3, 1): UnivariatePoly({0: 1, 2: 5}),
+        (2, 1, 0): UnivariatePoly({4: 3}),
+        (1, 1, 3): UnivariatePoly(),
+    }
+    path = str(tmp_path / "pte")
+    write_tensor_enumerator(path, tensor, TRACABLE_LEGS, [("a", 1, 2), 3], 4)
+
+    spilled = TensorEnumeratorFile(path)
+    assert spilled.tracable_legs == TRACABLE_LEGS
+    assert spilled.node_ids == [("a", 1, 2), 3]
+    assert spilled.truncate_length == 4
+    assert isinstance(spilled.keys, np.memmap)
+    assert len(spilled) == 3
+    # the keys are sorted
+    assert [key for key, _ in spilled.items()] == sorted(tensor)
+    assert spilled.tensor() == tensor
+
+    spilled.remove()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_file_long_keys_and_big_coefficients(tmp_path):
+    legs = [(0, leg) for leg in range(70)]
+    tensor = {
+        tuple((i * leg) % 4 for leg in range(70)): UnivariatePoly({0: 1, 70: 2**80 + i})
+        for i in range(4)
+    }
+    path = str(tmp_path / "pte")
+    write_tensor_enumerator(path, tensor, legs, [0])
+
+    spilled = TensorEnumeratorFile(path)
+    assert spilled.keys.shape == (4, 3)
+    assert spilled.coefficients.shape == (4, 71, 2)
+    assert spilled.tensor() == tensor
+
+
+def test_spill_file_scalar_and_empty_tensors(tmp_path):
+    write_tensor_enumerator(
+        str(tmp_path / "scalar"), {(): UnivariatePoly({0: 1, 4: 6})}, [], [0]
+    )
+    assert TensorEnumeratorFile(str(tmp_path / "scalar")).tensor() == {
+        (): UnivariatePoly({0: 1, 4: 6})
+    }
+    write_tensor_enumerator(str(tmp_path / "empty"), {}, TRACABLE_LEGS, [0])
+    assert TensorEnumeratorFile(str(tmp_path / "empty")).tensor() == {}
+
+
+def test_spill_file_join_groups(tmp_path):
+    tensor = {
+        (a, b, c): UnivariatePoly({a + b + c: 1})
+        for a in range(4)
+        for b in range(4)
+        for c in range(2)
+    }
+    path = str(tmp_path / "pte")
+    write_tensor_enumerator(path, tensor, TRACABLE_LEGS, [0])
+    spilled = TensorEnumeratorFile(path)
+
+    for join_indices, kept_indices in [([0], [1, 2]), ([2, 1], [0]), ([], [0, 1, 2])]:
+        groups = list(spilled.join_groups(join_indices, kept_indices))
+        join_keys = [join_key for join_key, _ in groups]
+        assert join_keys == sorted({tuple(k[i] for i in join_indices) for k in tensor})
+        for join_key, group in groups:
+            assert dict(group) == {
+                tuple(k[i] for i in kept_indices): v
+                for k, v in tensor.items()
+                if tuple(k[i] for i in join_indices) == join_key
+            }
+
+
+def test_spill_file_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_spill_file"
+    path.write_bytes(b"hello world")
+    with pytest.raises(ValueError, match="not a tensor enumerator spill file"):
+        TensorEnumeratorFile(str(path))
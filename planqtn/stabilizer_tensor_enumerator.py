@@ -13,21 +13,38 @@ The main methods are:
 """
 
 from collections import defaultdict
-from typing import Any, Iterable, List, Optional, Sequence, Tuple, Union, Dict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    Dict,
+)
 
 import numpy as np
-import sympy
 
 from galois import GF2
 from planqtn.legos import LegoAnnotation
 from planqtn.linalg import gauss, rank
 from planqtn.parity_check import conjoin, self_trace, tensor_product
-from planqtn.progress_reporter import DummyProgressReporter, ProgressReporter
+from planqtn.progress_reporter import (
+    DummyProgressReporter,
+    ProgressReporter,
+    report_stride,
+)
 from planqtn.poly import UnivariatePoly
+from planqtn.spider_enumerator import spider_hadamard_legs, spider_tensor_enumerator
 from planqtn.symplectic import omega, sslice, weight, sympl_to_pauli_repr
 from planqtn.tracable import Tracable
 from planqtn.tensor import TensorId, TensorLeg, TensorEnumerator
 
+if TYPE_CHECKING:
+    import sympy
+
 
 def _index_leg(tensor_id: TensorId, leg: int | TensorLeg) -> TensorLeg:
     return (tensor_id, leg) if isinstance(leg, int) else leg
@@ -102,6 +119,7 @@ class _TensorElementCollector:
             iterable=self.matching_stabilizers,
             desc="Collecting stabilizers",
             total_size=len(self.matching_stabilizers),
+            stride=report_stride(len(self.matching_stabilizers)),
         ):
             stab_weight = weight(s + self.coset, skip_indices=self.open_cols)
             # print(f"tensor {s + self.coset} => {stab_weight}")
@@ -168,7 +186,7 @@ class StabilizerCodeTensorEnumerator(Tracable):
             len(self.legs) == self.n
         ), f"Number of legs {len(self.legs)} != qubit count {self.n} for h: {self.h}"
         # a dict is a wonky tensor - TODO: rephrase this to proper tensor
-        self._stabilizer_enums: Dict[sympy.Tuple, UnivariatePoly] = {}
+        self._stabilizer_enums: Dict["sympy.Tuple", UnivariatePoly] = {}
 
         self.coset_flipped_legs = []
         if coset_flipped_legs is not None:
@@ -377,6 +395,23 @@ class StabilizerCodeTensorEnumerator(Tracable):
             node_ids=self.node_ids + other.node_ids,
         )
 
+    def coset_vector(self) -> GF2:
+        """The coset flipped legs as a symplectic vector over the columns of the tensor.
+
+        Returns:
+            The coset as a GF2 vector of length `2 * n`, X part first, then Z part.
+        """
+        coset: GF2 = GF2.Zeros(2 * self.n)
+        if self.coset_flipped_legs is not None:
+            for leg, pauli in self.coset_flipped_legs:
+                assert leg in self.legs, f"Leg in coset not found: {leg}"
+                assert len(pauli) == 2 and isinstance(
+                    pauli, GF2
+                ), f"Invalid pauli in coset: {pauli} on leg {leg}"
+                coset[self.legs.index(leg)] = pauli[0]
+                coset[self.legs.index(leg) + self.n] = pauli[1]
+        return coset
+
     def _brute_force_stabilizer_enumerator_from_parity(
         self,
         open_legs: Sequence[TensorLeg] = (),
@@ -395,15 +430,7 @@ class StabilizerCodeTensorEnumerator(Tracable):
 
         open_cols = [self.legs.index(leg) for leg in open_legs]
 
-        coset = GF2.Zeros(2 * self.n)
-        if self.coset_flipped_legs is not None:
-            for leg, pauli in self.coset_flipped_legs:
-                assert leg in self.legs, f"Leg in coset not found: {leg}"
-                assert len(pauli) == 2 and isinstance(
-                    pauli, GF2
-                ), f"Invalid pauli in coset: {pauli} on leg {leg}"
-                coset[self.legs.index(leg)] = pauli[0]
-                coset[self.legs.index(leg) + self.n] = pauli[1]
+        coset = self.coset_vector()
 
         collector = (
             _SimpleStabilizerCollector(
@@ -433,6 +460,7 @@ class StabilizerCodeTensorEnumerator(Tracable):
                 f"{self.tensor_id} - {r} generators"
             ),
             total_size=2**r,
+            stride=report_stride(2**r),
         ):
             picked_generators = GF2(list(np.binary_repr(i, width=r)), dtype=int)
             if r == 0:
@@ -456,7 +484,9 @@ class StabilizerCodeTensorEnumerator(Tracable):
         """Compute the stabilizer enumerator polynomial.
 
         Note that this is a brute force method, and is not efficient for large codes, use it with
-        the [planqtn.progress_reporter.TqdmProgressReporter][] to get time estimates.
+        the [planqtn.progress_reporter.TqdmProgressReporter][] to get time estimates. Repetition
+        codes, X and Z stoppers, the identity and the Hadamard tensor are recognized and their
+        enumerators are computed in closed form instead.
         If open_legs is empty, returns the scalar stabilizer enumerator polynomial.
         If open_legs is not empty, returns a sparse tensor with non-zero values on
         the open legs.
@@ -470,6 +500,17 @@ class StabilizerCodeTensorEnumerator(Tracable):
         Returns:
             wep: The stabilizer weight enumerator polynomial.
         """
+        hadamard_legs = spider_hadamard_legs(self.h, self.annotation)
+        indexed_open_legs = _index_legs(self.tensor_id, open_legs)
+        if hadamard_legs is not None and not self._validate_legs(indexed_open_legs):
+            return spider_tensor_enumerator(
+                hadamard_legs,
+                self.coset_vector(),
+                [self.legs.index(leg) for leg in indexed_open_legs],
+                truncate_length=truncate_length,
+                verbose=verbose,
+            )
+
         wep = self._brute_force_stabilizer_enumerator_from_parity(
             open_legs=open_legs,
             verbose=verbose,
@@ -13,14 +13,24 @@ The main methods are:
     tensor network into a single stabilizer code tensor.
 """
 
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from copy import deepcopy
+import contextlib
+import gc
+import itertools
+import os
+import tempfile
 import math
+import threading
+import time
 from typing import (
+    TYPE_CHECKING,
     Any,
     Callable,
     Dict,
+    FrozenSet,
     Iterable,
+    Iterator,
     List,
     Optional,
     Sequence,
@@ -33,11 +43,17 @@ from typing import (
 import numpy as np
 from galois import GF2
 
-import cotengra as ctg
-from cotengra.scoring import ensure_basic_quantities_are_computed
-from cotengra.presets import AutoOptimizer
-
 from planqtn.contraction_visitors.contraction_visitor import ContractionVisitor
+from planqtn.contraction_visitors.upper_bound_cost_visitor import UpperBoundCostVisitor
+from planqtn.contraction_visitors.profiler import ContractionProfiler
+from planqtn.cost_estimate import (
+    ContractionCostEstimate,
+    CostCalibration,
+    MergeCalibration,
+    MergePredictionVisitor,
+    PeakMemoryVisitor,
+    tensor_bytes,
+)
 from planqtn.contraction_visitors.max_size_cost_visitor import MaxTensorSizeCostVisitor
 from planqtn.contraction_visitors.stabilizer_flops_cost_fn import (
     StabilizerCodeFlopsCostVisitor,
@@ -46,8 +62,10 @@ from planqtn.pauli import Pauli
 from planqtn.progress_reporter import (
     DummyProgressReporter,
     ProgressReporter,
+    report_stride,
 )
 from planqtn.poly import UnivariatePoly
+from planqtn.spill import JoinGroup, TensorEnumeratorFile, write_tensor_enumerator
 from planqtn.stabilizer_tensor_enumerator import (
     StabilizerCodeTensorEnumerator,
     _index_legs,
@@ -55,9 +73,52 @@ from planqtn.stabilizer_tensor_enumerator import (
 from planqtn.tensor import TensorId, TensorLeg, TensorEnumerator, TensorEnumeratorKey
 from planqtn.tracable import Tracable, Trace
 
+if TYPE_CHECKING:
+    import cotengra as ctg
+
 T = TypeVar("T", bound=Tracable)
 
 
+class _SubtreeCache(Generic[T]):
+    """Merged objects of subtrees that are shared between contractions of the same tree.
+
+    A subtree is clean if none of its nodes are in `dirty_nodes`, only clean subtrees are looked
+    up or stored. If `keep` is set, only the subtrees in it are stored.
+    """
+
+    def __init__(self, keep: Optional[Set[FrozenSet[TensorId]]] = None):
+        self.keep = keep
+        self.dirty_nodes: Set[TensorId] = set()
+        self.results: Dict[FrozenSet[TensorId], T] = {}
+
+    def lookup(self, node_ids: Set[TensorId]) -> Optional[T]:
+        """Returns the cached object for the subtree.
+
+        Args:
+            node_ids: The node ids of the subtree.
+
+        Returns:
+            The cached object or None if the subtree is dirty or not cached.
+        """
+        if not self.dirty_nodes.isdisjoint(node_ids):
+            return None
+        return self.results.get(frozenset(node_ids))
+
+    def store(self, node_ids: Set[TensorId], merged: T) -> None:
+        """Stores the merged object for the subtree if it is clean and worth keeping.
+
+        Args:
+            node_ids: The node ids of the subtree.
+            merged: The merged object of the subtree.
+        """
+        key = frozenset(node_ids)
+        if not self.dirty_nodes.isdisjoint(key):
+            return
+        if self.keep is not None and key not in self.keep:
+            return
+        self.results[key] = merged
+
+
 # pylint: disable=too-few-public-methods
 class Contraction(Generic[T]):
     """A contraction of a tensor network.
@@ -71,7 +132,7 @@ class Contraction(Generic[T]):
         self,
         tn: "TensorNetwork",
         initialize_node: Callable[[StabilizerCodeTensorEnumerator], T],
-        cotengra_tree: Optional[ctg.ContractionTree] = None,
+        cotengra_tree: Optional["ctg.ContractionTree"] = None,
     ):
         self.tn = tn
         self.initialize_node = initialize_node
@@ -81,28 +142,64 @@ class Contraction(Generic[T]):
         # for node_id, node in self.nodes.items():
         #     print(node_id, node, node.open_legs)
 
-        self.pte_list: List[Tuple[T, Set[TensorId]]] = [
-            (initialize_node(node), {node_id}) for node_id, node in self.nodes.items()
-        ]
-        self.node_to_pte = {
-            list(node_ids)[0]: i for i, (_, node_ids) in enumerate(self.pte_list)
-        }
+        self.pte_list: List[Tuple[T, Set[TensorId]]] = []
+        self.node_to_pte: Dict[TensorId, int] = {}
+        self.reset()
         self.free_legs, self.leg_indices, self.index_to_legs = self._collect_legs()
 
         self.inputs, self.output, self.size_dict, self.input_names = (
             self._prep_cotengra_inputs()
         )
 
-        self._cot_tree: Optional[ctg.ContractionTree] = cotengra_tree
+        self._cot_tree: Optional["ctg.ContractionTree"] = cotengra_tree
 
-    def _get_lists_of_traces_to_contract(
+    def reset(
+        self,
+        initialize_node: Optional[Callable[[StabilizerCodeTensorEnumerator], T]] = None,
+    ) -> None:
+        """Reset the contraction to the initial state with one object per node.
+
+        The contraction tree (if already found) is kept, so the same contraction order can be
+        replayed on the freshly initialized nodes.
+
+        Args:
+            initialize_node: Optional new function to create the initial object for each node.
+                If not given, the one passed to the constructor is used.
+        """
+        if initialize_node is not None:
+            self.initialize_node = initialize_node
+        self.pte_list = []
+        # the start and the duration of the creation of each leaf, for the visitors
+        self.leaf_timings: Dict[TensorId, Tuple[float, float]] = {}
+        for node_id, node in self.nodes.items():
+            start = time.perf_counter()
+            self.pte_list.append((self.initialize_node(node), {node_id}))
+            self.leaf_timings[node_id] = (start, time.perf_counter() - start)
+        self.node_to_pte = {
+            list(node_ids)[0]: i for i, (_, node_ids) in enumerate(self.pte_list)
+        }
+
+    def contraction_tree(
         self,
         use_cotengra: bool = True,
         progress_reporter: ProgressReporter = DummyProgressReporter(),
         verbose: bool = False,
         cotengra_opts: Optional[Any] = None,
         search_params: Optional[Any] = None,
-    ) -> List[Tuple[List[Trace], TensorId, TensorId]]:
+    ) -> "ctg.ContractionTree":
+        """Returns the contraction tree, finding it first if it is not set yet.
+
+        Args:
+            use_cotengra: Whether to use cotengra to find an optimized contraction order,
+                otherwise the order of the traces is used.
+            progress_reporter: A progress reporter to report progress during the search.
+            verbose: Whether to print verbose output.
+            cotengra_opts: Optional dictionary of options to pass to Cotengra.
+            search_params: Optional dictionary of search parameters for Cotengra.
+
+        Returns:
+            The cotengra contraction tree over the nodes of the tensor network.
+        """
         if self._cot_tree is None:
             if use_cotengra and len(self.nodes) > 0 and len(self.traces) > 0:
                 with progress_reporter.enter_phase("cotengra contraction"):
@@ -114,6 +211,40 @@ class Contraction(Generic[T]):
                     )
             else:
                 self._cot_tree = self._cotengra_tree_from_traces(self.traces)
+        return self._cot_tree
+
+    def subtrees(self) -> List[Tuple[FrozenSet[TensorId], ...]]:
+        """Returns the node ids of the subtrees merged in each step of the contraction tree.
+
+        Returns:
+            A list of (merged, left, right) node id sets in contraction order.
+
+        Raises:
+            ValueError: If the contraction tree is not set yet.
+        """
+        if self._cot_tree is None:
+            raise ValueError("The contraction tree is not set yet.")
+
+        def node_ids(leaves: frozenset) -> FrozenSet[TensorId]:
+            return frozenset(self.input_names[leaf_idx] for leaf_idx in leaves)
+
+        return [
+            (node_ids(parent), node_ids(l), node_ids(r))
+            for parent, l, r in self._cot_tree.traverse()
+        ]
+
+    def _get_lists_of_traces_to_contract(
+        self,
+        use_cotengra: bool = True,
+        progress_reporter: ProgressReporter = DummyProgressReporter(),
+        verbose: bool = False,
+        cotengra_opts: Optional[Any] = None,
+        search_params: Optional[Any] = None,
+    ) -> List[Tuple[List[Trace], TensorId, TensorId]]:
+        self.contraction_tree(
+            use_cotengra, progress_reporter, verbose, cotengra_opts, search_params
+        )
+        assert self._cot_tree is not None
 
         def legs_to_contract(
             l: frozenset, r: frozenset
@@ -143,6 +274,7 @@ class Contraction(Generic[T]):
         verbose: bool = False,
         cotengra_opts: Any = None,
         search_params: Any = None,
+        subtree_cache: Optional["_SubtreeCache[T]"] = None,
     ) -> T:
         """Execute the contraction algorithm.
 
@@ -158,6 +290,9 @@ class Contraction(Generic[T]):
             verbose: Whether to print verbose output during contraction.
             cotengra_opts: Optional dictionary of options to pass to Cotengra.
             search_params: Optional dictionary of search parameters for Cotengra.
+            subtree_cache: Optional cache of merged objects from previous contractions along the
+                same contraction tree. The largest clean subtrees in the cache are taken from it,
+                none of the merges inside them are done again (or passed to the visitors).
         Returns:
             The contracted [`Tracable`][`planqtn.tracable.Tracable`] object.
         """
@@ -166,6 +301,12 @@ class Contraction(Generic[T]):
             progress_reporter is not None
         ), "Progress reporter must be provided, it is None"
 
+        for visitor in visitors or []:
+            for node_id, (start, seconds) in self.leaf_timings.items():
+                visitor.on_leaf(
+                    node_id, self.pte_list[self.node_to_pte[node_id]][0], start, seconds
+                )
+
         if len(self.traces) == 0 and len(self.nodes) == 1:
             return self.pte_list[0][0]
         if open_legs is None:
@@ -180,6 +321,8 @@ class Contraction(Generic[T]):
         )
         assert self._cot_tree is not None
         tree_len = self._cot_tree.N
+        if subtree_cache is not None:
+            self._restore_cached_subtrees(subtree_cache)
 
         for traces, left_set, right_set in progress_reporter.iterate(
             all_lists_of_traces, f"Tracing {tree_len} nodes", tree_len
@@ -187,6 +330,9 @@ class Contraction(Generic[T]):
             if len(traces) == 0:
                 pte1_idx = self.node_to_pte[left_set]
                 pte2_idx = self.node_to_pte[right_set]
+                if pte1_idx == pte2_idx:
+                    # inside a subtree restored from the cache
+                    continue
 
                 join_legs1: List[TensorLeg] = []
                 join_legs2: List[TensorLeg] = []
@@ -194,6 +340,9 @@ class Contraction(Generic[T]):
                 pte2, nodes2 = self.pte_list[pte2_idx]
                 merged_nodes = nodes1.union(nodes2)
 
+                for visitor in visitors or []:
+                    visitor.on_merge_start(pte1, pte2, join_legs1, join_legs2, True)
+
                 new_pte = pte1.tensor_with(pte2, progress_reporter, verbose)
                 tensor_with = True
 
@@ -202,6 +351,9 @@ class Contraction(Generic[T]):
                     self.node_to_pte[node_idx1] for node_idx1, _, _, _ in traces
                 }.union({self.node_to_pte[node_idx2] for _, node_idx2, _, _ in traces})
 
+                if len(pte_ids) == 1:
+                    # inside a subtree restored from the cache
+                    continue
                 assert len(pte_ids) == 2, f"Expected 2 PTEs, got {len(pte_ids)}"
                 pte1_idx, pte2_idx = pte_ids
                 join_legs1 = []
@@ -238,6 +390,9 @@ class Contraction(Generic[T]):
                 if verbose:
                     print(f"Merging PTEs containing {nodes1} and {nodes2}")
 
+                for visitor in visitors or []:
+                    visitor.on_merge_start(pte1, pte2, join_legs1, join_legs2, False)
+
                 new_pte = pte1.merge_with(
                     pte2,
                     tuple(join_legs1),
@@ -247,6 +402,9 @@ class Contraction(Generic[T]):
                 )
                 tensor_with = False
 
+            if subtree_cache is not None:
+                subtree_cache.store(merged_nodes, new_pte)
+
             for node_idx in new_pte.node_ids:
                 self.node_to_pte[node_idx] = pte1_idx
 
@@ -270,6 +428,8 @@ class Contraction(Generic[T]):
         if len(self.pte_list) > 1:
             for other in self.pte_list[1:]:
                 curr_tensor = self.pte_list[0][0]
+                for visitor in visitors or []:
+                    visitor.on_merge_start(curr_tensor, other[0], [], [], True)
                 self.pte_list[0] = (
                     curr_tensor.tensor_with(other[0], progress_reporter, verbose),
                     self.pte_list[0][1].union(other[1]),
@@ -288,6 +448,33 @@ class Contraction(Generic[T]):
 
         return self.pte_list[0][0]
 
+    def _restore_cached_subtrees(self, subtree_cache: "_SubtreeCache[T]") -> None:
+        # the largest cached subtrees replace their leaves, so that none of the merges inside
+        # them are done again
+        restored: List[Tuple[T, Set[TensorId]]] = []
+        covered: Set[TensorId] = set()
+        for merged, _, _ in sorted(
+            self.subtrees(), key=lambda subtree: len(subtree[0]), reverse=True
+        ):
+            if not covered.isdisjoint(merged):
+                continue
+            cached = subtree_cache.lookup(set(merged))
+            if cached is not None:
+                restored.append((cached, set(merged)))
+                covered.update(merged)
+        if not restored:
+            return
+        self.pte_list = [
+            (pte, node_ids)
+            for pte, node_ids in self.pte_list
+            if node_ids.isdisjoint(covered)
+        ] + restored
+        self.node_to_pte = {
+            node_id: i
+            for i, (_, node_ids) in enumerate(self.pte_list)
+            for node_id in node_ids
+        }
+
     def _collect_legs(
         self,
     ) -> Tuple[
@@ -340,7 +527,11 @@ class Contraction(Generic[T]):
         progress_reporter: ProgressReporter = DummyProgressReporter(),
         cotengra_opts: Any = None,
         search_params: Any = None,
-    ) -> ctg.ContractionTree:
+    ) -> "ctg.ContractionTree":
+        # cotengra is only imported when a contraction order is needed, it is slow to import
+        # pylint: disable=import-outside-toplevel
+        import cotengra as ctg
+        from cotengra.presets import AutoOptimizer
 
         contraction_for_conjoin = Contraction(
             self.tn,
@@ -365,6 +556,10 @@ class Contraction(Generic[T]):
         minimize = contengra_params.get("minimize")
         if minimize == "custom_flops":
             contengra_params["minimize"] = stabilizer_flops_fn
+        elif isinstance(minimize, CostCalibration):
+            contengra_params["minimize"] = self._make_flops_cost_fn(
+                contraction_for_conjoin, minimize
+            )
         elif minimize == "custom_max_size":
             stabilizer_max_size_fn = self._make_max_size_cost_fn(
                 contraction_for_conjoin
@@ -419,7 +614,7 @@ class Contraction(Generic[T]):
 
     def _traces_from_cotengra_tree(
         self,
-        tree: ctg.ContractionTree,
+        tree: "ctg.ContractionTree",
         index_to_legs: Dict[str, List[Tuple[TensorId, TensorLeg]]],
         inputs: List[Tuple[str, ...]],
     ) -> List[Trace]:
@@ -459,7 +654,11 @@ class Contraction(Generic[T]):
     def _make_flops_cost_fn(
         self,
         contraction_for_conjoin: "Contraction",
+        calibration: Optional[CostCalibration] = None,
     ) -> Callable[[Dict], float]:
+        # pylint: disable=import-outside-toplevel
+        from cotengra.scoring import ensure_basic_quantities_are_computed
+
         def stabilizer_cost_fn(trial_dict: Dict[str, Any]) -> float:
             ensure_basic_quantities_are_computed(trial_dict)
             # pylint: disable=W0212
@@ -467,7 +666,11 @@ class Contraction(Generic[T]):
 
             old_pte_list = list(contraction_for_conjoin.pte_list)
             old_node_to_pte = dict(contraction_for_conjoin.node_to_pte)
-            stabilizer_cost_visitor = StabilizerCodeFlopsCostVisitor()
+            stabilizer_cost_visitor = (
+                StabilizerCodeFlopsCostVisitor()
+                if calibration is None
+                else calibration.flops_cost_visitor()
+            )
             contraction_for_conjoin.contract(
                 visitors=[stabilizer_cost_visitor],
                 cotengra=False,
@@ -485,6 +688,9 @@ class Contraction(Generic[T]):
         self,
         contraction_for_conjoin: "Contraction",
     ) -> Callable[[Dict], float]:
+        # pylint: disable=import-outside-toplevel
+        from cotengra.scoring import ensure_basic_quantities_are_computed
+
         def max_size_cost_fn(trial_dict: Dict[str, Any]) -> float:
             ensure_basic_quantities_are_computed(trial_dict)
             # pylint: disable=W0212
@@ -509,7 +715,8 @@ class Contraction(Generic[T]):
     def _cotengra_tree_from_traces(
         self,
         traces: List[Trace],
-    ) -> ctg.ContractionTree:
+    ) -> "ctg.ContractionTree":
+        import cotengra as ctg  # pylint: disable=import-outside-toplevel
 
         path = []
         terms = [{str(node_idx)} for node_idx in self.input_names]
@@ -542,6 +749,65 @@ class Contraction(Generic[T]):
         )
 
 
+@contextlib.contextmanager
+def _gc_paused() -> Iterator[None]:
+    """Pauses the cyclic garbage collector, e.g. while building a large tensor network.
+
+    Building a network from a large code allocates hundreds of thousands of long-lived objects,
+    and the collections they trigger keep walking all of them again. Can also decorate a function.
+
+    Yields:
+        Nothing, the collector is paused within the block.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class _NodeDict(Dict[TensorId, StabilizerCodeTensorEnumerator]):
+    """Nodes of a tensor network that count the structural changes made to them.
+
+    Replacing a node with one that has the same legs (e.g. when setting a coset) is not a
+    structural change and does not bump the version.
+    """
+
+    version: int = 0
+
+    def __setitem__(self, key: TensorId, value: StabilizerCodeTensorEnumerator) -> None:
+        old = self.get(key)
+        super().__setitem__(key, value)
+        if old is None or old.legs != value.legs:
+            self.version += 1
+
+    def __delitem__(self, key: TensorId) -> None:
+        super().__delitem__(key)
+        self.version += 1
+
+    def pop(self, *args: Any, **kwargs: Any) -> Any:
+        self.version += 1
+        return super().pop(*args, **kwargs)
+
+    def popitem(self) -> Tuple[TensorId, StabilizerCodeTensorEnumerator]:
+        self.version += 1
+        return super().popitem()
+
+    def clear(self) -> None:
+        self.version += 1
+        super().clear()
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self.version += 1
+        super().update(*args, **kwargs)
+
+    def setdefault(self, *args: Any, **kwargs: Any) -> Any:
+        self.version += 1
+        return super().setdefault(*args, **kwargs)
+
+
 class TensorNetwork:
     """A tensor network for contracting stabilizer code tensor enumerators."""
 
@@ -581,7 +847,7 @@ class TensorNetwork:
                         f"Nodes dict passed in with inconsitent indexing, "
                         f"{k} != {v.tensor_id} for {v}."
                     )
-            self.nodes: Dict[TensorId, StabilizerCodeTensorEnumerator] = nodes
+            self.nodes = nodes
         else:
             nodes_dict = {node.tensor_id: node for node in nodes}
             if len(nodes_dict) < len(list(nodes)):
@@ -593,6 +859,21 @@ class TensorNetwork:
         self._coset: Optional[GF2] = None
         self.truncate_length: Optional[int] = truncate_length
 
+    @property
+    def nodes(self) -> Dict[TensorId, StabilizerCodeTensorEnumerator]:
+        """The nodes of the tensor network keyed by their tensor ID.
+
+        Returns:
+            The nodes of the tensor network.
+        """
+        return self._nodes
+
+    @nodes.setter
+    def nodes(self, nodes: Dict[TensorId, StabilizerCodeTensorEnumerator]) -> None:
+        self._nodes = _NodeDict(nodes)
+        self._qubit_table: Optional[Tuple[Tuple[TensorId, TensorLeg], ...]] = None
+        self._qubit_table_version = -1
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, TensorNetwork):
             return False
@@ -678,6 +959,34 @@ class TensorNetwork:
             f"qubit_to_node_and_leg() is not implemented for {type(self)}!"
         )
 
+    def qubit_table(self) -> Tuple[Tuple[TensorId, TensorLeg], ...]:
+        """Get the dense qubit to node and leg lookup table of the tensor network.
+
+        The table holds the result of
+        [`qubit_to_node_and_leg`][planqtn.TensorNetwork.qubit_to_node_and_leg] for every qubit.
+        It is built once and cached, and it is rebuilt automatically after nodes are added,
+        removed or replaced by nodes with different legs, or after new traces are added.
+
+        Returns:
+            The node ID and leg of each qubit, indexed by the qubit.
+        """
+        if (
+            self._qubit_table is None
+            or self._qubit_table_version != self._nodes.version
+            or len(self._qubit_table) != self.n_qubits()
+        ):
+            self._qubit_table = tuple(self._build_qubit_table())
+            self._qubit_table_version = self._nodes.version
+        return self._qubit_table
+
+    def _build_qubit_table(self) -> List[Tuple[TensorId, TensorLeg]]:
+        """Build the qubit to node and leg table, subclasses can override this with a single pass.
+
+        Returns:
+            The node ID and leg of each qubit, indexed by the qubit.
+        """
+        return [self.qubit_to_node_and_leg(q) for q in range(self.n_qubits())]
+
     def n_qubits(self) -> int:
         """Get the total number of qubits in the tensor network.
 
@@ -719,48 +1028,67 @@ class TensorNetwork:
 
         Raises:
             ValueError: If the coset error has the wrong number of qubits.
-        """
+        """  # noqa: DAR402
         self._reset_wep()
 
-        self._coset = GF2.Zeros(2 * self.n_qubits())
+        self._coset = self._coset_from_error(coset_error)
 
-        if isinstance(coset_error, tuple):
-            for i in coset_error[0]:
-                self._coset[i] = 1
-            for i in coset_error[1]:
-                self._coset[i + self.n_qubits()] = 1
-        elif isinstance(coset_error, GF2):
-            self._coset = coset_error
+        qubit_table = self.qubit_table()
 
-        n = len(self._coset) // 2
-        if n != self.n_qubits():
-            raise ValueError(
-                f"Can't set coset with {n} qubits for a {self.n_qubits()} qubit code."
-            )
+        for node_idx in {node_idx for node_idx, _ in qubit_table}:
+            if self.nodes[node_idx].coset_flipped_legs:
+                self.nodes[node_idx] = self.nodes[node_idx].with_coset_flipped_legs([])
+
+        node_legs_to_flip = self._coset_flipped_legs(self._coset, qubit_table)
 
-        z_errors = np.argwhere(self._coset[n:] == 1).flatten()
-        x_errors = np.argwhere(self._coset[:n] == 1).flatten()
+        for node_idx, coset_flipped_legs in node_legs_to_flip.items():
+            self.nodes[node_idx] = self.nodes[node_idx].with_coset_flipped_legs(
+                coset_flipped_legs
+            )
 
-        node_legs_to_flip = defaultdict(list)
+    def _coset_from_error(self, coset_error: GF2 | Tuple[List[int], List[int]]) -> GF2:
+        n = self.n_qubits()
+        coset: GF2 = GF2.Zeros(2 * n)
 
-        for q in range(n):
-            is_z = q in z_errors
-            is_x = q in x_errors
-            node_idx, leg = self.qubit_to_node_and_leg(q)
+        if isinstance(coset_error, tuple):
+            coset[np.asarray(list(coset_error[0]), dtype=int)] = 1
+            coset[np.asarray(list(coset_error[1]), dtype=int) + n] = 1
+        elif isinstance(coset_error, GF2):
+            coset = coset_error
 
-            self.nodes[node_idx].coset_flipped_legs = []
-            if not is_z and not is_x:
-                continue
-            # print(f"q{q} -> {node_idx, leg}")
-            node_legs_to_flip[node_idx].append((leg, GF2([is_x, is_z])))
+        if len(coset) // 2 != n:
+            raise ValueError(
+                f"Can't set coset with {len(coset) // 2} qubits for a {n} qubit code."
+            )
+        return coset
 
-        for node_idx, coset_flipped_legs in node_legs_to_flip.items():
+    @staticmethod
+    def _coset_flipped_legs(
+        coset: GF2, qubit_table: Sequence[Tuple[TensorId, TensorLeg]]
+    ) -> Dict[TensorId, List[Tuple[TensorLeg, GF2]]]:
+        """Group the non-identity Paulis of a coset by the node they act on.
 
-            # print(node_idx, f" will have flipped {coset_flipped_legs}")
+        Args:
+            coset: The coset error as a GF2 vector, X part first, then Z part.
+            qubit_table: The node ID and leg of each qubit, see
+                [`qubit_table`][planqtn.TensorNetwork.qubit_table].
 
-            self.nodes[node_idx] = self.nodes[node_idx].with_coset_flipped_legs(
-                coset_flipped_legs
-            )
+        Returns:
+            The flipped legs of each node with at least one non-identity Pauli.
+        """
+        n = len(coset) // 2
+        bits = coset.view(np.ndarray).astype(np.uint8)
+        # Pauli encoding: x + 2z, see planqtn.pauli.Pauli
+        paulis = bits[:n] + 2 * bits[n:]
+        flipped = np.flatnonzero(paulis)
+
+        node_legs_to_flip: Dict[TensorId, List[Tuple[TensorLeg, GF2]]] = defaultdict(
+            list
+        )
+        for q, pauli in zip(flipped.tolist(), paulis[flipped].tolist()):
+            node_idx, leg = qubit_table[q]
+            node_legs_to_flip[node_idx].append((leg, Pauli(pauli).to_gf2()))
+        return node_legs_to_flip
 
     def self_trace(
         self,
@@ -796,6 +1124,7 @@ class TensorNetwork:
         self._traces.append(
             (node_idx1, node_idx2, join_legs1_indexed, join_legs2_indexed)
         )
+        self._qubit_table = None
         # print(
         #     "adding trace: ",
         #     node_idx1,
@@ -826,6 +1155,45 @@ class TensorNetwork:
             join_legs2_indexed,
         )
 
+    def add_traces(self, traces: Iterable[Trace]) -> None:
+        """Add many trace operations to the tensor network at once.
+
+        Same as calling [`self_trace`][planqtn.TensorNetwork.self_trace] for each trace, but the
+        open legs of each node are checked and updated only once, which matters for networks
+        built from large codes.
+
+        Args:
+            traces: The traces as (node_idx1, node_idx2, join_legs1, join_legs2) tuples.
+
+        Raises:
+            ValueError: If the weight enumerator has already been computed.
+        """
+        if self._wep is not None:
+            raise ValueError(
+                "Tensor network weight enumerator is already traced no new tracing schedule is "
+                "allowed."
+            )
+        traced_legs: Dict[TensorId, List[TensorLeg]] = defaultdict(list)
+        for node_idx1, node_idx2, join_legs1, join_legs2 in traces:
+            join_legs1_indexed = _index_legs(node_idx1, join_legs1)
+            join_legs2_indexed = _index_legs(node_idx2, join_legs2)
+            self._traces.append(
+                (node_idx1, node_idx2, join_legs1_indexed, join_legs2_indexed)
+            )
+            traced_legs[node_idx1] += join_legs1_indexed
+            traced_legs[node_idx2] += join_legs2_indexed
+        self._qubit_table = None
+
+        for node_idx, legs in traced_legs.items():
+            node = self.nodes[node_idx]
+            assert len(set(legs)) == len(legs) and set(node.open_legs).isdisjoint(
+                legs
+            ), (
+                f"Legs in {legs} are traced twice or already open for node {node_idx} "
+                f"with open legs {node.open_legs}"
+            )
+            node.open_legs = node.open_legs + tuple(legs)
+
     def traces_to_dot(self) -> None:
         """Print the tensor network traces in DOT format.
 
@@ -887,6 +1255,127 @@ class TensorNetwork:
             search_params=search_params,
         )
 
+    def estimate_contraction_cost(
+        self,
+        open_legs: Sequence[TensorLeg] = (),
+        cotengra: bool = True,
+        cotengra_opts: Optional[Dict[Any, Any]] = None,
+        search_params: Optional[Dict[Any, Any]] = None,
+    ) -> ContractionCostEstimate:
+        """Estimates the cost of the weight enumerator calculation before running it.
+
+        Finds the contraction order and conjoins the parity check matrices along it, collecting the
+        stabilizer flops cost, the upper bound cost, the size of the largest intermediate tensor
+        and the peak memory of the tensor enumerators. This is polynomial in the size of the
+        network, so it can be used to size or reject a calculation upfront.
+
+        Note that cotengra's search is randomized, so the order found by
+        [`stabilizer_enumerator_polynomial`][planqtn.TensorNetwork.stabilizer_enumerator_polynomial]
+        might differ from the estimated one.
+
+        Args:
+            open_legs: The legs that are left open in the calculation.
+            cotengra: If True, estimate the contraction order found by cotengra, otherwise the
+                order the traces were constructed.
+            cotengra_opts: Optional dictionary of options to pass to Cotengra.
+            search_params: Optional dictionary of search parameters for Cotengra.
+
+        Returns:
+            The estimated cost of the calculation.
+        """
+        open_legs = tuple(open_legs)
+        contraction = Contraction(self, _with_open_legs(open_legs))
+        flops_visitor = StabilizerCodeFlopsCostVisitor()
+        upper_bound_visitor = UpperBoundCostVisitor()
+        max_size_visitor = MaxTensorSizeCostVisitor()
+        leaves = [node for node, _ in contraction.pte_list]
+        memory_visitor = PeakMemoryVisitor(leaves, self.truncate_length)
+        contraction.contract(
+            visitors=[
+                flops_visitor,
+                upper_bound_visitor,
+                max_size_visitor,
+                memory_visitor,
+            ],
+            open_legs=open_legs,
+            cotengra=cotengra,
+            cotengra_opts=cotengra_opts,
+            search_params=search_params,
+        )
+        return ContractionCostEstimate(
+            flops=flops_visitor.total_cost,
+            upper_bound=upper_bound_visitor.total_cost,
+            max_tensor_entries=max(
+                [max_size_visitor.max_size] + [2 ** leaf.rank() for leaf in leaves]
+            ),
+            peak_memory_bytes=memory_visitor.peak_bytes,
+        )
+
+    def calibrate_contraction_cost(
+        self,
+        open_legs: Sequence[TensorLeg] = (),
+        cotengra: bool = True,
+        cotengra_opts: Optional[Dict[Any, Any]] = None,
+        search_params: Optional[Dict[Any, Any]] = None,
+    ) -> CostCalibration:
+        """Compares the predicted cost of the merges with a real weight enumerator calculation.
+
+        Finds the contraction order, then conjoins the parity check matrices and contracts the
+        tensor enumerators along the same tree, recording the predicted and the actual keys of
+        each merge, the predicted and actual pairs of keys compared, and the time each merge took.
+        The flops cost model is fitted to the times, see
+        [`CostCalibration`][planqtn.cost_estimate.CostCalibration]. The result can be passed as
+        `minimize` in `cotengra_opts` to order the contractions by their predicted time.
+
+        This runs the full weight enumerator calculation, calibrate on networks that are typical
+        for the workload but quick to calculate.
+
+        Args:
+            open_legs: The legs that are left open in the calculation.
+            cotengra: If True, calibrate on the order found by cotengra, otherwise the order the
+                traces were constructed.
+            cotengra_opts: Optional dictionary of options to pass to Cotengra.
+            search_params: Optional dictionary of search parameters for Cotengra.
+
+        Returns:
+            The calibration, with the predicted and measured costs of each merge.
+        """
+        open_legs = tuple(open_legs)
+        conjoin = Contraction(self, _with_open_legs(open_legs))
+        tree = conjoin.contraction_tree(
+            cotengra, cotengra_opts=cotengra_opts, search_params=search_params
+        )
+        predictions = MergePredictionVisitor()
+        conjoin.contract(visitors=[predictions], open_legs=open_legs)
+
+        profiler = ContractionProfiler()
+        Contraction[_PartiallyTracedEnumerator](
+            self,
+            lambda node: _PartiallyTracedEnumerator.from_stabilizer_code_tensor_enumerator(
+                node, self.truncate_length, open_legs=open_legs
+            ),
+            cotengra_tree=tree,
+        ).contract(visitors=[profiler], open_legs=open_legs)
+
+        merges = []
+        for merge in profiler.merges:
+            node_ids = frozenset(merge.node_ids1 + merge.node_ids2)
+            predicted_keys, predicted_pairs, predicted_matches = (
+                predictions.predictions[node_ids]
+            )
+            merges.append(
+                MergeCalibration(
+                    node_ids=node_ids,
+                    predicted_keys=predicted_keys,
+                    predicted_pairs=predicted_pairs,
+                    predicted_matches=predicted_matches,
+                    keys=merge.keys_out,
+                    pairs=merge.keys1 * merge.keys2,
+                    seconds=merge.seconds,
+                )
+            )
+        return CostCalibration.fit(merges)
+
     def stabilizer_enumerator_polynomial(
         self,
         open_legs: Sequence[TensorLeg] = (),
@@ -895,12 +1384,22 @@ class TensorNetwork:
         cotengra: bool = True,
         cotengra_opts: Any = None,
         search_params: Any = None,
+        memory_limit: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        visitors: Optional[
+            Sequence[ContractionVisitor["_PartiallyTracedEnumerator"]]
+        ] = None,
     ) -> TensorEnumerator | UnivariatePoly:
         """Returns the reduced stabilizer enumerator polynomial for the tensor network.
 
         If open_legs is not empty, then the returned tensor enumerator polynomial is a dictionary of
         tensor keys to UnivariatePoly objects.
 
+        If `memory_limit` is set, cotengra looks for the contraction order with the smallest
+        intermediate tensors (unless `cotengra_opts` sets `minimize`), and the intermediate tensors
+        that don't fit in the limit are spilled to memory-mapped files until they are merged.
+        The limit is not strict: the tensors of the current merge are always in memory.
+
         Args:
             open_legs: The legs that are open in the tensor network. If empty, the result is a
                        scalar weightenumerator polynomial of type `UnivariatePoly`,otherwise it is a
@@ -912,6 +1411,16 @@ class TensorNetwork:
                               `ProgressReporter` subclass.
             cotengra: If True, use cotengra to contract the tensor network, otherwise use the order
                       the traces were constructed.
+            cotengra_opts: Optional dictionary of options to pass to Cotengra.
+            search_params: Optional dictionary of search parameters for Cotengra.
+            memory_limit: Optional budget in bytes for the tensor enumerators alive during the
+                          contraction, see `planqtn.cost_estimate.tensor_bytes`.
+            spill_dir: The directory for the spill files, defaults to the system's temporary
+                       directory.
+            visitors: Optional contraction visitors to call during the contraction of the tensor
+                      enumerators, e.g. to profile the merges with a
+                      `planqtn.contraction_visitors.profiler.ContractionProfiler`.
+                      They are not called if the result is already calculated.
 
         Returns:
             TensorEnumerator: The reduced stabilizer enumerator polynomial for the tensor network.
@@ -919,6 +1428,9 @@ class TensorNetwork:
         if self._wep is not None:
             return self._wep
 
+        if memory_limit is not None and cotengra:
+            cotengra_opts = {"minimize": "custom_max_size", **(cotengra_opts or {})}
+
         #  if verbose:
         #                 print(f"PTE nodes: {pte.nodes if pte is not None else None}")
         #                 print(
@@ -952,14 +1464,32 @@ class TensorNetwork:
             ),
         )
 
-        final_tensor = contraction.contract(
-            cotengra=cotengra,
-            progress_reporter=progress_reporter,
-            open_legs=open_legs,
-            verbose=verbose,
-            cotengra_opts=cotengra_opts,
-            search_params=search_params,
-        )
+        with contextlib.ExitStack() as stack:
+            # the given visitors see the merged tensors before they are spilled
+            all_visitors: List[ContractionVisitor[_PartiallyTracedEnumerator]] = list(
+                visitors or []
+            )
+            if memory_limit is not None:
+                all_visitors.append(
+                    _SpillingVisitor(
+                        [pte for pte, _ in contraction.pte_list],
+                        memory_limit,
+                        stack.enter_context(
+                            tempfile.TemporaryDirectory(
+                                prefix="planqtn_spill_", dir=spill_dir
+                            )
+                        ),
+                    )
+                )
+            final_tensor = contraction.contract(
+                visitors=all_visitors,
+                cotengra=cotengra,
+                progress_reporter=progress_reporter,
+                open_legs=open_legs,
+                verbose=verbose,
+                cotengra_opts=cotengra_opts,
+                search_params=search_params,
+            )
 
         # # parity_check_enums = {}
 
@@ -1009,6 +1539,126 @@ class TensorNetwork:
         #             pte2, verbose=verbose, progress_reporter=progress_reporter
         #         )
 
+        self._wep = self._final_wep(final_tensor, open_legs, verbose, progress_reporter)
+        return self._wep
+
+    def coset_enumerators(
+        self,
+        coset_errors: Iterable[GF2 | Tuple[List[int], List[int]]],
+        open_legs: Sequence[TensorLeg] = (),
+        verbose: bool = False,
+        progress_reporter: ProgressReporter = DummyProgressReporter(),
+        cotengra: bool = True,
+        cotengra_opts: Any = None,
+        search_params: Any = None,
+        visitors: Optional[
+            Sequence[ContractionVisitor["_PartiallyTracedEnumerator"]]
+        ] = None,
+    ) -> List[TensorEnumerator | UnivariatePoly]:
+        """Returns the coset weight enumerator polynomials for a batch of coset errors.
+
+        This is equivalent to calling [`set_coset`][planqtn.TensorNetwork.set_coset] and
+        [`stabilizer_enumerator_polynomial`][planqtn.TensorNetwork.stabilizer_enumerator_polynomial]
+        for each coset error, but the contraction tree is only found once, and the intermediate
+        tensors of subtrees without any flipped legs are calculated only once for the whole batch.
+        Only the paths from the nodes with flipped legs to the root are recomputed for each coset.
+        The coset currently set on the tensor network is not used and not changed.
+
+        Args:
+            coset_errors: The coset errors, in any of the formats accepted by
+                [`set_coset`][planqtn.TensorNetwork.set_coset].
+            open_legs: The legs that are open in the tensor network, if not empty, the results are
+                tensor enumerators instead of scalar polynomials.
+            verbose: If True, print verbose output.
+            progress_reporter: The progress reporter to use.
+            cotengra: If True, use cotengra to find the contraction tree, otherwise use the order
+                the traces were constructed.
+            cotengra_opts: Optional dictionary of options to pass to Cotengra.
+            search_params: Optional dictionary of search parameters for Cotengra.
+            visitors: Optional contraction visitors to call during the contraction of the tensor
+                enumerators of each coset. The merges of the subtrees taken from earlier cosets
+                are not passed to them.
+
+        Returns:
+            The coset weight enumerators, in the order of the coset errors.
+        """
+        qubit_table = self.qubit_table()
+        coset_flips = [
+            self._coset_flipped_legs(self._coset_from_error(coset_error), qubit_table)
+            for coset_error in coset_errors
+        ]
+
+        clean_leaves: Dict[TensorId, _PartiallyTracedEnumerator] = {}
+
+        def leaf(
+            node: StabilizerCodeTensorEnumerator,
+            flipped_legs: Optional[List[Tuple[TensorLeg, GF2]]] = None,
+        ) -> _PartiallyTracedEnumerator:
+            if flipped_legs is None and node.tensor_id in clean_leaves:
+                return clean_leaves[node.tensor_id]
+            pte = _PartiallyTracedEnumerator.from_stabilizer_code_tensor_enumerator(
+                node.with_coset_flipped_legs(flipped_legs or []),
+                self.truncate_length,
+                verbose,
+                progress_reporter,
+                open_legs,
+            )
+            if flipped_legs is None:
+                clean_leaves[node.tensor_id] = pte
+            return pte
+
+        def coset_leaves(
+            flips: Dict[TensorId, List[Tuple[TensorLeg, GF2]]],
+        ) -> Callable[[StabilizerCodeTensorEnumerator], _PartiallyTracedEnumerator]:
+            return lambda node: leaf(node, flips.get(node.tensor_id))
+
+        contraction = Contraction[_PartiallyTracedEnumerator](self, leaf)
+        contraction.contraction_tree(
+            cotengra, progress_reporter, verbose, cotengra_opts, search_params
+        )
+
+        # we only keep the clean subtrees that are right below a dirty one (or the root) for at
+        # least one of the cosets, these are the largest clean subtrees, the ones inside them are
+        # never looked up
+        subtrees = contraction.subtrees()
+        keep: Set[FrozenSet[TensorId]] = set()
+        for flips in coset_flips:
+            for merged, left, right in subtrees:
+                if merged.isdisjoint(flips):
+                    if merged == subtrees[-1][0]:
+                        keep.add(merged)
+                    continue
+                keep.update(child for child in (left, right) if child.isdisjoint(flips))
+        subtree_cache = _SubtreeCache[_PartiallyTracedEnumerator](keep)
+
+        weps: List[TensorEnumerator | UnivariatePoly] = []
+        for flips in progress_reporter.iterate(
+            coset_flips,
+            f"Coset enumerators for {len(coset_flips)} cosets",
+            len(coset_flips),
+        ):
+            subtree_cache.dirty_nodes = set(flips)
+            contraction.reset(coset_leaves(flips))
+            final_tensor = contraction.contract(
+                cotengra=cotengra,
+                progress_reporter=progress_reporter,
+                open_legs=open_legs,
+                verbose=verbose,
+                subtree_cache=subtree_cache,
+                visitors=visitors,
+            )
+            weps.append(
+                self._final_wep(final_tensor, open_legs, verbose, progress_reporter)
+            )
+        return weps
+
+    def _final_wep(
+        self,
+        final_tensor: "_PartiallyTracedEnumerator",
+        open_legs: Sequence[TensorLeg],
+        verbose: bool = False,
+        progress_reporter: ProgressReporter = DummyProgressReporter(),
+    ) -> TensorEnumerator | UnivariatePoly:
         if len(final_tensor.tensor) > 1:
             if verbose:
                 print(f"final PTE is a tensor: {final_tensor}")
@@ -1024,19 +1674,18 @@ class TensorNetwork:
                             print(Pauli.to_str(*k), end=" ")
                             print(v)
 
-            self._wep = final_tensor.ordered_key_tensor(
+            return final_tensor.ordered_key_tensor(
                 open_legs,
                 progress_reporter=progress_reporter,
                 verbose=verbose,
             )
-        else:
-            self._wep = final_tensor.tensor[()]
-            if verbose:
-                print(f"final scalar wep: {self._wep}")
-            self._wep = self._wep.normalize(verbose=verbose)
-            if verbose:
-                print(f"final normalized scalar wep: {self._wep}")
-        return self._wep
+        wep = final_tensor.tensor[()]
+        if verbose:
+            print(f"final scalar wep: {wep}")
+        wep = wep.normalize(verbose=verbose)
+        if verbose:
+            print(f"final normalized scalar wep: {wep}")
+        return wep
 
     def stabilizer_enumerator(
         self,
@@ -1075,6 +1724,111 @@ class TensorNetwork:
         self._reset_wep()
 
 
+def _with_open_legs(
+    open_legs: Tuple[TensorLeg, ...],
+) -> Callable[[StabilizerCodeTensorEnumerator], StabilizerCodeTensorEnumerator]:
+    def with_open_legs(
+        node: StabilizerCodeTensorEnumerator,
+    ) -> StabilizerCodeTensorEnumerator:
+        # like the leaves of the weight enumerator calculation, keyed by the open legs too
+        res = node.copy()
+        res.open_legs = node.open_legs + tuple(
+            leg for leg in node.legs if leg not in node.open_legs and leg in open_legs
+        )
+        return res
+
+    return with_open_legs
+
+
+class _LeafEnumeratorCache:
+    """LRU cache of the brute force tensor enumerators of leaf nodes.
+
+    The tensor of a leaf only depends on the parity check matrix of the node, the positions
+    of its open columns, the coset on its columns and the truncation length. The legs only
+    label the positions, so identical legos in a network share a single brute force
+    enumeration.
+
+    The cache is shared by the whole process, lookups and updates are guarded by a lock so that
+    it can be used from several threads. The cached tensors are never changed, they are copied
+    outside of the lock.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._tensors: OrderedDict[Tuple[Any, ...], TensorEnumerator] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        node: StabilizerCodeTensorEnumerator,
+        open_legs: Sequence[TensorLeg],
+        truncate_length: Optional[int],
+    ) -> Tuple[Any, ...]:
+        """Canonical key of a leaf, independent of the labels of its legs.
+
+        Args:
+            node: The leaf node.
+            open_legs: The legs of the node that are left open, in tensor key order.
+            truncate_length: The truncation length of the enumerator.
+
+        Returns:
+            The cache key of the leaf.
+        """
+        h = node.h.view(np.ndarray).astype(np.uint8)
+        coset = node.coset_vector().view(np.ndarray).astype(np.uint8)
+        return (
+            h.shape,
+            h.tobytes(),
+            tuple(node.legs.index(leg) for leg in open_legs),
+            coset.tobytes(),
+            truncate_length,
+        )
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[TensorEnumerator]:
+        """Look up a copy of a cached leaf tensor.
+
+        Args:
+            key: The key of the leaf, see `key`.
+
+        Returns:
+            A copy of the cached tensor or None if it is not cached.
+        """
+        with self._lock:
+            tensor = self._tensors.get(key)
+            if tensor is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._tensors.move_to_end(key)
+        return {k: UnivariatePoly(v) for k, v in tensor.items()}
+
+    def put(self, key: Tuple[Any, ...], tensor: TensorEnumerator) -> None:
+        """Store a copy of a leaf tensor, evicting the least recently used one if full.
+
+        Args:
+            key: The key of the leaf, see `key`.
+            tensor: The tensor of the leaf.
+        """
+        copy = {k: UnivariatePoly(v) for k, v in tensor.items()}
+        with self._lock:
+            self._tensors[key] = copy
+            self._tensors.move_to_end(key)
+            while len(self._tensors) > self.maxsize:
+                self._tensors.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached tensors and reset the statistics."""
+        with self._lock:
+            self._tensors.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_LEAF_ENUMERATOR_CACHE = _LeafEnumeratorCache()
+
+
 class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
     def __init__(
         self,
@@ -1085,7 +1839,8 @@ class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
     ):
         self._node_ids: List[TensorId] = _node_ids
         self.tracable_legs: Tuple[TensorLeg, ...] = tracable_legs
-        self.tensor: Dict[TensorEnumeratorKey, UnivariatePoly] = tensor
+        self._tensor: Optional[TensorEnumerator] = tensor
+        self._spill_file: Optional[TensorEnumeratorFile] = None
 
         tensor_key_length = (
             len(list(self.tensor.keys())[0]) if len(self.tensor) > 0 else 0
@@ -1099,6 +1854,77 @@ class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
     def node_ids(self) -> List[TensorId]:
         return self._node_ids
 
+    @property
+    def tensor(self) -> TensorEnumerator:
+        """The tensor enumerator, read back from disk if it was spilled."""
+        if self._tensor is None:
+            assert self._spill_file is not None
+            self._tensor = self._spill_file.tensor()
+            self.remove_spill_file()
+        return self._tensor
+
+    @property
+    def is_spilled(self) -> bool:
+        """Whether the tensor enumerator is on disk instead of in memory."""
+        return self._tensor is None
+
+    def spill(self, path: str) -> None:
+        """Writes the tensor enumerator to disk and frees it from memory.
+
+        Merges go through the spill file without reading it into memory, other operations read
+        the tensor back the next time it is accessed.
+
+        Args:
+            path: The path of the spill file.
+        """
+        write_tensor_enumerator(
+            path, self.tensor, self.tracable_legs, self.node_ids, self.truncate_length
+        )
+        self._spill_file = TensorEnumeratorFile(path)
+        self._tensor = None
+
+    def remove_spill_file(self) -> None:
+        """Removes the spill file, a spilled tensor can't be used after this."""
+        if self._spill_file is not None:
+            self._spill_file.remove()
+            self._spill_file = None
+
+    def num_entries(self) -> int:
+        """Returns the number of keys of the tensor enumerator, without reading it back.
+
+        Returns:
+            The number of keys.
+        """
+        if self._spill_file is not None:
+            return len(self._spill_file)
+        return len(self.tensor)
+
+    def join_groups(
+        self, join_indices: Sequence[int], kept_indices: Sequence[int]
+    ) -> Iterator[JoinGroup]:
+        """Iterates over the entries grouped by their Paulis on the join legs.
+
+        See `planqtn.spill.TensorEnumeratorFile.join_groups`, spilled tensors are not read back.
+
+        Args:
+            join_indices: The indices of the join legs in the keys.
+            kept_indices: The indices of the legs kept in the keys of the groups.
+
+        Yields:
+            The Paulis on the join legs and the (kept key, polynomial) pairs of the group.
+        """
+        if self._spill_file is not None:
+            yield from self._spill_file.join_groups(join_indices, kept_indices)
+            return
+
+        def join_key(item: Tuple[TensorEnumeratorKey, UnivariatePoly]) -> Tuple:
+            return tuple(item[0][i] for i in join_indices)
+
+        for key, entries in itertools.groupby(
+            sorted(self.tensor.items(), key=join_key), key=join_key
+        ):
+            yield key, [(tuple(k[i] for i in kept_indices), v) for k, v in entries]
+
     @property
     def open_legs(self) -> Tuple[TensorLeg, ...]:
         return self.tracable_legs
@@ -1128,14 +1954,22 @@ class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
         node_open_legs = node.open_legs + tuple(
             leg for leg in node.legs if leg not in node.open_legs and leg in open_legs
         )
-        tensor = node.stabilizer_enumerator_polynomial(
-            open_legs=node_open_legs,
-            verbose=verbose,
-            progress_reporter=progress_reporter,
-            truncate_length=truncate_length,
+        key = (
+            _LEAF_ENUMERATOR_CACHE.key(node, node_open_legs, truncate_length)
+            if all(leg in node.legs for leg in node_open_legs)
+            else None
         )
-        if isinstance(tensor, UnivariatePoly):
-            tensor = {(): tensor}
+        tensor = _LEAF_ENUMERATOR_CACHE.get(key) if key is not None else None
+        if tensor is None:
+            wep = node.stabilizer_enumerator_polynomial(
+                open_legs=node_open_legs,
+                verbose=verbose,
+                progress_reporter=progress_reporter,
+                truncate_length=truncate_length,
+            )
+            tensor = {(): wep} if isinstance(wep, UnivariatePoly) else wep
+            if key is not None:
+                _LEAF_ENUMERATOR_CACHE.put(key, tensor)
         return cls(
             _node_ids=[node.tensor_id],
             tracable_legs=node_open_legs,
@@ -1200,7 +2034,8 @@ class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
             for k, v in progress_reporter.iterate(
                 iterable=self.tensor.items(),
                 desc=f"Reindexing keys in tensor for {len(self.tensor)} elements",
-                total_size=len(list(self.tensor.items())),
+                total_size=len(self.tensor),
+                stride=report_stride(len(self.tensor)),
             )
         }
 
@@ -1238,15 +2073,17 @@ class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
             print(f"with {other}")
             for k, v in other.tensor.items():
                 print(f"{k}: {v}")
+        tensor1, tensor2 = self.tensor, other.tensor
         new_tensor: Dict[TensorEnumeratorKey, UnivariatePoly] = {}
         for k1 in progress_reporter.iterate(
             iterable=self.tensor.keys(),
             desc=f"PTE tensor product: {len(self.tensor)} x {len(other.tensor)} elements",
-            total_size=len(list(self.tensor.keys())),
+            total_size=len(self.tensor),
+            stride=report_stride(len(self.tensor)),
         ):
-            for k2 in other.tensor.keys():
+            for k2 in tensor2.keys():
                 k = tuple(k1) + tuple(k2)
-                new_tensor[k] = self.tensor[k1] * other.tensor[k2]
+                new_tensor[k] = tensor1[k1] * tensor2[k2]
                 self.truncate_if_needed(k, new_tensor)
 
         return _PartiallyTracedEnumerator(
@@ -1306,35 +2143,45 @@ class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
             i for i, leg in enumerate(other.tracable_legs) if leg in open_legs2
         ]
 
+        desc = (
+            f"PTE merge: {self.num_entries()} x {other.num_entries()} elements,"
+            f"legs: {len(self.tracable_legs)},{len(other.tracable_legs)}"
+        )
         if verbose:
-            print(
-                f"PTE merge: {len(self.tensor)} x {len(other.tensor)} elements,"
-                f"legs: {len(self.tracable_legs)},{len(other.tracable_legs)}"
+            print(desc)
+
+        if self.is_spilled or other.is_spilled:
+            self._merge_join_groups(
+                other,
+                (join_indices1, kept_indices1),
+                (join_indices2, kept_indices2),
+                wep,
+                progress_reporter,
+                desc,
             )
+        else:
+            tensor1, tensor2 = self.tensor, other.tensor
+            for k1 in progress_reporter.iterate(
+                iterable=tensor1.keys(),
+                desc=desc,
+                total_size=len(self.tensor),
+                stride=report_stride(len(self.tensor)),
+            ):
+                for k2 in tensor2.keys():
+                    if not all(
+                        k1[i1] == k2[i2] for i1, i2 in zip(join_indices1, join_indices2)
+                    ):
+                        continue
+                    wep1 = tensor1[k1]
+                    wep2 = tensor2[k2]
 
-        for k1 in progress_reporter.iterate(
-            iterable=self.tensor.keys(),
-            desc=(
-                f"PTE merge: {len(self.tensor)} x {len(other.tensor)} elements,"
-                f"legs: {len(self.tracable_legs)},{len(other.tracable_legs)}"
-            ),
-            total_size=len(list(self.tensor.keys())),
-        ):
-            for k2 in other.tensor.keys():
-                if not all(
-                    k1[i1] == k2[i2] for i1, i2 in zip(join_indices1, join_indices2)
-                ):
-                    continue
-                wep1 = self.tensor[k1]
-                wep2 = other.tensor[k2]
-
-                # we have to cut off the join legs from both keys and concatenate them
-                key = tuple(k1[i] for i in kept_indices1) + tuple(
-                    k2[i] for i in kept_indices2
-                )
+                    # we have to cut off the join legs from both keys and concatenate them
+                    key = tuple(k1[i] for i in kept_indices1) + tuple(
+                        k2[i] for i in kept_indices2
+                    )
 
-                wep[key].add_inplace(wep1 * wep2)
-                self.truncate_if_needed(key, wep)
+                    wep[key].add_inplace(wep1 * wep2)
+                    self.truncate_if_needed(key, wep)
 
         tracable_legs: List[TensorLeg] = [
             (idx, leg) if isinstance(leg, int) else leg for idx, leg in open_legs1
@@ -1350,6 +2197,34 @@ class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
             truncate_length=self.truncate_length,
         )
 
+    def _merge_join_groups(
+        self,
+        other: "_PartiallyTracedEnumerator",
+        indices1: Tuple[Sequence[int], Sequence[int]],
+        indices2: Tuple[Sequence[int], Sequence[int]],
+        wep: Dict[TensorEnumeratorKey, UnivariatePoly],
+        progress_reporter: ProgressReporter,
+        desc: str,
+    ) -> None:
+        # a sort-merge join of the entries grouped by their Paulis on the join legs, this way
+        # only one group of a spilled tensor is in memory at a time
+        groups2 = other.join_groups(*indices2)
+        join_key2, group2 = next(groups2, (None, []))
+        for join_key1, group1 in progress_reporter.iterate(
+            iterable=self.join_groups(*indices1),
+            desc=desc,
+            total_size=min(self.num_entries(), 4 ** len(indices1[0])),
+        ):
+            while join_key2 is not None and join_key2 < join_key1:
+                join_key2, group2 = next(groups2, (None, []))
+            if join_key2 != join_key1:
+                continue
+            for k1, wep1 in group1:
+                for k2, wep2 in group2:
+                    key = k1 + k2
+                    wep[key].add_inplace(wep1 * wep2)
+                    self.truncate_if_needed(key, wep)
+
     def truncate_if_needed(
         self, key: TensorEnumeratorKey, wep: Dict[TensorEnumeratorKey, UnivariatePoly]
     ) -> None:
@@ -1367,3 +2242,53 @@ class _PartiallyTracedEnumerator(Tracable["_PartiallyTracedEnumerator"]):
                 del wep[key]
             else:
                 wep[key].truncate_inplace(self.truncate_length)
+
+
+# pylint: disable=too-few-public-methods
+class _SpillingVisitor(ContractionVisitor[_PartiallyTracedEnumerator]):
+    """Keeps the live intermediate tensors of a contraction within a memory budget.
+
+    After each merge, the coldest intermediate tensors, the ones created first, are spilled to
+    disk until the live tensors fit in the budget again. A spilled tensor is merged through its
+    spill file, which is removed after the merge. The leaves and the result of the last merge
+    always stay in memory.
+    """
+
+    def __init__(
+        self,
+        leaves: List[_PartiallyTracedEnumerator],
+        memory_limit: int,
+        spill_dir: str,
+    ) -> None:
+        super().__init__()
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.leaf_bytes: Dict[_PartiallyTracedEnumerator, int] = {
+            leaf: tensor_bytes(leaf.tensor) for leaf in leaves
+        }
+        # intermediate tensors in memory, from the coldest to the hottest
+        self.in_memory: "OrderedDict[_PartiallyTracedEnumerator, int]" = OrderedDict()
+        self.live_bytes = sum(self.leaf_bytes.values())
+        self.spilled = 0
+
+    def on_merge(
+        self,
+        pte1: _PartiallyTracedEnumerator,
+        pte2: _PartiallyTracedEnumerator,
+        join_legs1: List[TensorLeg],
+        join_legs2: List[TensorLeg],
+        new_pte: _PartiallyTracedEnumerator,
+        tensor_with: bool = False,
+    ) -> None:
+        for pte in (pte1, pte2):
+            self.live_bytes -= self.leaf_bytes.pop(pte, 0) + self.in_memory.pop(pte, 0)
+            pte.remove_spill_file()
+        new_bytes = tensor_bytes(new_pte.tensor)
+        self.in_memory[new_pte] = new_bytes
+        self.live_bytes += new_bytes
+
+        while self.live_bytes > self.memory_limit and len(self.in_memory) > 1:
+            cold_pte, cold_bytes = self.in_memory.popitem(last=False)
+            cold_pte.spill(os.path.join(self.spill_dir, f"pte_{self.spilled}"))
+            self.spilled += 1
+            self.live_bytes -= cold_bytes
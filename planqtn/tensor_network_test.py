@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 import numpy as np
 import pytest
@@ -9,10 +10,13 @@ from planqtn.pauli import Pauli
 from planqtn.progress_reporter import TqdmProgressReporter
 from planqtn.symplectic import sslice, weight
 from planqtn.tensor_network import (
+    _LEAF_ENUMERATOR_CACHE,
     Contraction,
     UnivariatePoly,
     StabilizerCodeTensorEnumerator,
     TensorNetwork,
+    _LeafEnumeratorCache,
+    _PartiallyTracedEnumerator,
 )
 
 from planqtn.pauli import Pauli
@@ -1170,3 +1174,159 @@ def test_single_node_with_open_legs_t6():
         (3, 1): UnivariatePoly({2: 1, 3: 2, 4: 1}),
         (3, 3): UnivariatePoly({2: 2, 3: 2}),
     }
+
+
+def test_leaf_enumerator_cache_shares_identical_legos():
+    # pylint: disable=import-outside-toplevel
+    from planqtn.networks.rotated_surface_code import RotatedSurfaceCodeTN
+
+    _LEAF_ENUMERATOR_CACHE.clear()
+    _LEAF_ENUMERATOR_CACHE.maxsize = 0
+    try:
+        expected = RotatedSurfaceCodeTN(d=5).stabilizer_enumerator_polynomial(
+            cotengra=False
+        )
+    finally:
+        _LEAF_ENUMERATOR_CACHE.maxsize = 1024
+    assert _LEAF_ENUMERATOR_CACHE.hits == 0
+
+    _LEAF_ENUMERATOR_CACHE.clear()
+    wep = RotatedSurfaceCodeTN(d=5).stabilizer_enumerator_polynomial(cotengra=False)
+    assert wep == expected
+
+    # the 9 bulk nodes of the d=5 rotated surface code are identical legos
+    assert _LEAF_ENUMERATOR_CACHE.hits == 8
+    assert _LEAF_ENUMERATOR_CACHE.misses == 17
+
+
+def test_leaf_enumerator_cache_is_thread_safe():
+    # a small cache, so that the threads keep evicting each other's tensors
+    cache = _LeafEnumeratorCache(maxsize=4)
+    tensor = {(0,): UnivariatePoly({0: 1})}
+
+    def use_cache(thread: int) -> None:
+        for i in range(2000):
+            key = ((thread + i) % 8,)
+            if cache.get(key) is None:
+                cache.put(key, tensor)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(use_cache, range(8)))
+
+    assert cache.hits + cache.misses == 8 * 2000
+    assert len(cache._tensors) <= 4
+
+
+def test_leaf_enumerator_cache_relabels_legs_and_separates_cosets():
+    _LEAF_ENUMERATOR_CACHE.clear()
+    h = Legos.enconding_tensor_603
+    weps = [
+        TensorNetwork(
+            nodes=[StabilizerCodeTensorEnumerator(tensor_id=tensor_id, h=h)]
+        ).stabilizer_enumerator_polynomial(open_legs=[(tensor_id, 1), (tensor_id, 0)])
+        for tensor_id in ["a", "b"]
+    ]
+    assert weps[0] == weps[1]
+    assert weps[0][(0, 1)] == UnivariatePoly({2: 1, 3: 2, 4: 1})
+    assert weps[0][(2, 3)] == UnivariatePoly({2: 1, 3: 2, 4: 1})
+    assert (_LEAF_ENUMERATOR_CACHE.hits, _LEAF_ENUMERATOR_CACHE.misses) == (1, 1)
+
+    te = StabilizerCodeTensorEnumerator(
+        tensor_id="c", h=h, coset_flipped_legs=[(("c", 0), GF2([1, 0]))]
+    )
+    tn = TensorNetwork(nodes=[te])
+    actual = tn.stabilizer_enumerator_polynomial(open_legs=[("c", 1), ("c", 0)])
+    expected = te.stabilizer_enumerator_polynomial(open_legs=[("c", 0), ("c", 1)])
+    assert actual == {(k[1], k[0]): v for k, v in expected.items()}
+    assert _LEAF_ENUMERATOR_CACHE.misses == 2
+
+
+def test_memory_limit_spills_cold_tensors(tmp_path, monkeypatch):
+    from planqtn.networks.rotated_surface_code import RotatedSurfaceCodeTN
+
+    open_legs = [((0, 0), 4), ((2, 2), 4)]
+    expected = RotatedSurfaceCodeTN(d=3).stabilizer_enumerator_polynomial(
+        open_legs=open_legs, cotengra=False
+    )
+
+    spilled = []
+    spill = _PartiallyTracedEnumerator.spill
+
+    def counting_spill(pte, path):
+        spilled.append(path)
+        spill(pte, path)
+
+    monkeypatch.setattr(_PartiallyTracedEnumerator, "spill", counting_spill)
+    actual = RotatedSurfaceCodeTN(d=3).stabilizer_enumerator_polynomial(
+        open_legs=open_legs, memory_limit=1, spill_dir=str(tmp_path)
+    )
+    assert actual == expected
+    # a contraction tree with more than one branch has cold intermediate tensors
+    assert len(spilled) > 0
+    # the spill files are removed with the spill directory
+    assert list(tmp_path.iterdir()) == []
+
+    spilled.clear()
+    actual = RotatedSurfaceCodeTN(d=3).stabilizer_enumerator_polynomial(
+        open_legs=open_legs, memory_limit=2**30
+    )
+    assert actual == expected
+    assert not spilled
+
+
+@pytest.mark.parametrize("spilled", [(True, False), (False, True), (True, True)])
+def test_merge_with_spilled_operands(tmp_path, spilled):
+    def ptes():
+        return [
+            _PartiallyTracedEnumerator.from_stabilizer_code_tensor_enumerator(
+                StabilizerCodeTensorEnumerator(
+                    h=Legos.encoding_tensor_512, tensor_id=tensor_id
+                ),
+                truncate_length=None,
+                open_legs=[(tensor_id, leg) for leg in range(4)],
+            )
+            for tensor_id in ["1", "2"]
+        ]
+
+    join_legs1, join_legs2 = (("1", 2), ("1", 0)), (("2", 1), ("2", 3))
+    pte1, pte2 = ptes()
+    expected = pte1.merge_with(pte2, join_legs1, join_legs2)
+
+    pte1, pte2 = ptes()
+    for pte, spill in zip([pte1, pte2], spilled):
+        if spill:
+            pte.spill(str(tmp_path / pte.node_ids[0]))
+            assert pte.is_spilled
+    actual = pte1.merge_with(pte2, join_legs1, join_legs2)
+
+    assert actual.tracable_legs == expected.tracable_legs
+    assert actual.tensor == expected.tensor
+    # merges go through the spill files
+    assert pte1.is_spilled == spilled[0] and pte2.is_spilled == spilled[1]
+
+
+def test_add_traces_is_self_trace_in_bulk():
+    def network():
+        return TensorNetwork(
+            [
+                StabilizerCodeTensorEnumerator(Legos.encoding_tensor_512, tensor_id=i)
+                for i in range(3)
+            ]
+        )
+
+    traces = [(0, 1, [1, 2], [(1, 1), 2]), (1, 2, [3], [0])]
+    one_by_one = network()
+    for trace in traces:
+        one_by_one.self_trace(*trace)
+    bulk = network()
+    bulk.add_traces(traces)
+
+    assert bulk._traces == one_by_one._traces
+    assert [node.open_legs for node in bulk.nodes.values()] == [
+        node.open_legs for node in one_by_one.nodes.values()
+    ]
+    with pytest.raises(AssertionError, match="traced twice or already open"):
+        network().add_traces([(0, 2, [1], [1]), (0, 1, [1], [2])])
+    assert bulk.stabilizer_enumerator_polynomial() == (
+        one_by_one.stabilizer_enumerator_polynomial()
+    )
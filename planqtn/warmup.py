@@ -0,0 +1,106 @@
+"""Warming up a process before its first calculation.
+
+The first calculation in a fresh process pays one-time costs on top of the work itself:
+
+- galois compiles its kernels with numba, some when galois is imported and some on their first
+  call. The ones galois marks as cacheable are written to the numba cache directory (set with
+  `NUMBA_CACHE_DIR`, the `__pycache__` next to galois by default) and later processes load them
+  from there. Without a cache, importing galois takes about a second longer.
+- cotengra, and cmaes for its hyperoptimizer, are imported on the first contraction order search.
+  cmaes alone takes most of a second to import.
+
+[`warmup`][planqtn.warmup.warmup] runs small calculations through the code paths of
+[`planqtn.linalg`][planqtn.linalg], `planqtn.parity_check` and the enumerators to pay these costs up
+front. It is run when the job and API container images are built, so that they ship with a filled
+numba cache and the bytecode of the imported modules, and it can be run when a server starts:
+
+```
+python -m planqtn.warmup
+```
+"""
+
+import time
+from typing import Callable, Dict
+
+from galois import GF2
+
+from planqtn.legos import Legos
+from planqtn.linalg import gauss, invert, rank, right_kernel
+from planqtn.parity_check import conjoin, self_trace, tensor_product
+from planqtn.stabilizer_tensor_enumerator import StabilizerCodeTensorEnumerator
+from planqtn.tensor_network import TensorNetwork
+
+
+def _linalg() -> None:
+    h = Legos.steane_code_813_encoding_tensor
+    gauss(h)
+    gauss(h, noswaps=True, col_subset=[0, 1, 8, 9])
+    rank(h)
+    right_kernel(h)
+    invert(GF2([[1, 1], [0, 1]]))
+
+
+def _parity_check() -> None:
+    h = conjoin(Legos.stab_code_parity_422, Legos.stab_code_parity_422, 0, 0)
+    self_trace(h, 0, 3)
+    tensor_product(Legos.encoding_tensor_512, Legos.stopper_x)
+
+
+def _enumerators() -> None:
+    node = StabilizerCodeTensorEnumerator(Legos.encoding_tensor_512, tensor_id=0)
+    node.stabilizer_enumerator_polynomial()
+    node.stabilizer_enumerator_polynomial(open_legs=[(0, 0), (0, 1)])
+    StabilizerCodeTensorEnumerator(
+        Legos.z_rep_code(4), tensor_id=1
+    ).stabilizer_enumerator_polynomial(open_legs=[(1, 0)])
+
+
+def _network(cotengra: bool) -> Callable[[], None]:
+    def contract() -> None:
+        tn = TensorNetwork(
+            [
+                StabilizerCodeTensorEnumerator(Legos.encoding_tensor_512, tensor_id=i)
+                for i in range(3)
+            ]
+        )
+        tn.self_trace(0, 1, [0], [0])
+        tn.self_trace(1, 2, [1], [1])
+        tn.stabilizer_enumerator_polynomial(
+            cotengra=cotengra, cotengra_opts={"max_repeats": 2}
+        )
+
+    return contract
+
+
+def warmup(verbose: bool = False) -> Dict[str, float]:
+    """Pays the one-time costs of the first calculations in a process.
+
+    Compiles (or loads from the numba cache) the galois kernels and imports the lazily imported
+    dependencies used by the linear algebra, parity check and enumerator code paths, with small
+    inputs that take a few milliseconds once warm.
+
+    Args:
+        verbose: Whether to print how long each step took.
+
+    Returns:
+        The seconds each step took, by the name of the step.
+    """
+    steps = {
+        "linalg": _linalg,
+        "parity_check": _parity_check,
+        "enumerators": _enumerators,
+        "contraction": _network(cotengra=False),
+        "cotengra": _network(cotengra=True),
+    }
+    timings = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+        if verbose:
+            print(f"warmup {name}: {timings[name]:.3f}s")
+    return timings
+
+
+if __name__ == "__main__":
+    warmup(verbose=True)
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+from planqtn.warmup import warmup
+
+
+def test_warmup():
+    timings = warmup()
+
+    assert list(timings) == [
+        "linalg",
+        "parity_check",
+        "enumerators",
+        "contraction",
+        "cotengra",
+    ]
+    assert all(t >= 0 for t in timings.values())
+
+
+def test_warmup_entry_point():
+    out = subprocess.run(
+        [sys.executable, "-m", "planqtn.warmup"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert "warmup cotengra" in out